@@ -0,0 +1,148 @@
+"""
+Bulk scoring benchmark and parity check: ml/vectorized.py vs looping the
+scalar functions in ml/prediction.py and ml/earnings.py.
+
+Generates random channels (zero views, missing sentiment and publish
+dates included), checks every vectorised value equals the scalar one, then
+times the vectorised path against looping the scalar functions.
+
+Run from fastapi-server/:
+    python -m benchmarks.bench_bulk_scoring [videos] [repeats]
+"""
+
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from ml.earnings import calculate_cpm_estimate, calculate_earnings_data
+from ml.prediction import calculate_virality_score, generate_forecast
+from ml.vectorized import score_columns
+
+
+def make_videos(n: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    videos = []
+    for i in range(n):
+        views = 0 if i % 97 == 0 else int(10 ** rng.uniform(1, 9))
+        total = rng.choice([0, rng.randint(1, 5000)])
+        positive = rng.randint(0, total)
+        published = None if i % 5 == 0 else (
+            now - timedelta(days=rng.uniform(0, 3000))
+        ).isoformat().replace("+00:00", "Z")
+        videos.append({
+            "stats": {
+                "viewCount": str(views),
+                "likeCount": str(int(views * rng.uniform(0, 0.2))),
+                "commentCount": str(int(views * rng.uniform(0, 0.02))),
+                "publishedAt": published,
+            },
+            "sentiment": {
+                "positive": positive,
+                "negative": rng.randint(0, total - positive),
+                "total": total,
+            } if total else None,
+        })
+    return videos
+
+
+def to_columns(videos: list[dict]) -> dict:
+    sentiments = [v["sentiment"] or {} for v in videos]
+    return {
+        "views": [int(v["stats"]["viewCount"]) for v in videos],
+        "likes": [int(v["stats"]["likeCount"]) for v in videos],
+        "comments": [int(v["stats"]["commentCount"]) for v in videos],
+        "positive": [s.get("positive", 0) for s in sentiments],
+        "negative": [s.get("negative", 0) for s in sentiments],
+        "sentiment_total": [s.get("total", 0) for s in sentiments],
+        "published_at": [v["stats"]["publishedAt"] for v in videos],
+    }
+
+
+def score_scalar(videos: list[dict]) -> list[tuple]:
+    rows = []
+    for v in videos:
+        earnings = calculate_earnings_data(v["stats"], v["sentiment"])
+        forecast = generate_forecast(v["stats"])
+        rows.append((
+            calculate_virality_score(v["stats"], v["sentiment"]),
+            calculate_cpm_estimate(v["stats"], v["sentiment"]),
+            earnings["estimated_rpm"],
+            earnings["total_earnings"],
+            earnings["forecast"]["daily"],
+            earnings["forecast"]["weekly"],
+            earnings["forecast"]["monthly"],
+            forecast["views_7d"],
+            forecast["likes_30d"],
+            forecast["growth_trend"],
+        ))
+    return rows
+
+
+def score_scalar_core(videos: list[dict]) -> None:
+    """The scalar work score_columns replaces, without the random history charts."""
+    for v in videos:
+        calculate_virality_score(v["stats"], v["sentiment"])
+        calculate_cpm_estimate(v["stats"], v["sentiment"])
+        generate_forecast(v["stats"])
+
+
+def score_vectorized(columns: dict) -> list[tuple]:
+    data = score_columns(**columns)
+    return list(zip(
+        data["virality_score"],
+        data["estimated_cpm"],
+        data["estimated_rpm"],
+        data["total_earnings"],
+        data["earnings_forecast"]["daily"],
+        data["earnings_forecast"]["weekly"],
+        data["earnings_forecast"]["monthly"],
+        data["forecast"]["views_7d"],
+        data["forecast"]["likes_30d"],
+        data["forecast"]["growth_trend"],
+    ))
+
+
+def best_of(repeats: int, fn, *args) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    videos = make_videos(n)
+    columns = to_columns(videos)
+    # Publish dates are parsed per video in both paths
+    no_dates = {**columns, "published_at": None}
+    undated = [{**v, "stats": {**v["stats"], "publishedAt": None}} for v in videos]
+
+    mismatches = [
+        i for i, (a, b) in enumerate(zip(score_scalar(videos), score_vectorized(columns)))
+        if a != b
+    ]
+    print(f"parity: {n - len(mismatches)}/{n} videos identical")
+    for i in mismatches[:5]:
+        print(f"  video {i}: scalar {score_scalar(videos[i:i + 1])[0]}")
+        print(f"  {'':>{len(str(i)) + 6}} vector {score_vectorized({k: v[i:i + 1] for k, v in columns.items()})[0]}")
+
+    scalar = best_of(repeats, score_scalar_core, undated)
+    for label, cols in (("no dates", no_dates), ("with dates", columns)):
+        vector = best_of(repeats, lambda: score_columns(**cols))
+        print(f"{label:>10}: scalar loop {scalar * 1000:8.1f} ms  "
+              f"vectorised {vector * 1000:7.1f} ms  ({scalar / vector:.1f}x)")
+    print(f"(scalar loop: virality + CPM + forecast per video; full "
+          f"calculate_earnings_data also builds history charts: "
+          f"{best_of(1, score_scalar, videos) * 1000:.0f} ms)")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
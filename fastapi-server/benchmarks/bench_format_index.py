@@ -0,0 +1,190 @@
+"""
+Format index benchmark and parity check.
+
+Builds synthetic YouTube-like format lists (worst to best, as yt-dlp
+sorts them) with random gaps — missing AVC tiers, no m4a audio, muxed-only
+videos — and checks that:
+  - FormatIndex produces the same options and dropdown values as the old
+    per-call list_formats code
+  - every precomputed pairing is what yt-dlp's own selector picks for the
+    quality and default chains in downloader._format_selection
+
+Then times a /api/formats response: rebuilding everything per call vs
+querying the cached index (with and without filters).
+
+Run from fastapi-server/:
+    python -m benchmarks.bench_format_index [videos] [repeats]
+"""
+
+import random
+import sys
+import time
+
+import yt_dlp
+
+from download.downloader import _format_selection
+from download.format_index import FormatIndex
+from download.schemas import FormatOption
+
+
+HEIGHTS = (144, 240, 360, 480, 720, 1080, 1440, 2160)
+VIDEO_CODECS = (("avc1.4d401e", "mp4"), ("vp9", "webm"), ("av01.0.05M.08", "mp4"))
+
+
+def _format_bitrate(bitrate):
+    if not bitrate:
+        return None
+    if bitrate >= 1_000_000:
+        return f"{bitrate / 1_000_000:.1f} Mbps"
+    if bitrate >= 1_000:
+        return f"{bitrate / 1_000:.0f} kbps"
+    return f"{bitrate} bps"
+
+
+def _extract_quality(resolution, note):
+    import re
+
+    if resolution:
+        return resolution
+    if note:
+        m = re.search(r'(\d+p?)', note, re.IGNORECASE)
+        if m:
+            val = m.group(1)
+            return val.lower() if val.lower().endswith('p') else f"{val}p"
+    return None
+
+
+def legacy_list(info: dict) -> tuple[list[dict], dict]:
+    """The per-call option building list_formats did before the index."""
+    video_formats = [
+        f for f in info.get("formats", [])
+        if f.get("vcodec") and f["vcodec"] != "none" and f.get("ext")
+    ]
+    options = []
+    for f in video_formats:
+        height = f.get("height")
+        resolution = f"{height}p" if height else None
+        tbr, vbr = f.get("tbr"), f.get("vbr")
+        options.append(FormatOption(
+            format_id=f.get("format_id", ""),
+            ext=f.get("ext", ""),
+            resolution=resolution,
+            quality=_extract_quality(resolution, f.get("format_note")),
+            bitrate=int(tbr * 1000) if tbr else (int(vbr * 1000) if vbr else None),
+            fps=f.get("fps"),
+            note=f.get("format_note"),
+            filesize=f.get("filesize") or f.get("filesize_approx"),
+            hasAudio=bool(f.get("acodec") and f["acodec"] != "none"),
+        ))
+    available = {
+        "formats": sorted(set(o.ext for o in options if o.ext)),
+        "qualities": sorted(set(o.quality for o in options if o.quality),
+                            key=lambda q: int(q.replace('p', '') or '0'), reverse=True),
+        "bitrates": [b for b in (_format_bitrate(b) for b in sorted(
+            set(o.bitrate for o in options if o.bitrate is not None), reverse=True)) if b],
+    }
+    return [o.model_dump() for o in options], available
+
+
+def make_info(rng: random.Random, n: int) -> dict:
+    formats = [{"format_id": f"sb{i}", "ext": "mhtml", "vcodec": "none", "acodec": "none",
+                "format_note": "storyboard"} for i in range(2)]
+
+    audio = []
+    if rng.random() < 0.85:
+        audio += [{"ext": "m4a", "acodec": "mp4a.40.5", "tbr": 49.0},
+                  {"ext": "m4a", "acodec": "mp4a.40.2", "tbr": 129.5}]
+    if rng.random() < 0.9:
+        audio += [{"ext": "webm", "acodec": "opus", "tbr": 55.0},
+                  {"ext": "webm", "acodec": "opus", "tbr": 140.2}]
+    audio.sort(key=lambda a: a["tbr"])
+    for i, a in enumerate(audio):
+        formats.append({"format_id": f"a{i}", "vcodec": "none", "format_note": "audio", **a})
+
+    if rng.random() < 0.8:
+        formats.append({"format_id": "18", "ext": "mp4", "vcodec": "avc1.42001E",
+                        "acodec": "mp4a.40.2", "height": 360, "fps": 30, "tbr": 600.1,
+                        "format_note": "360p"})
+
+    top = rng.choice(HEIGHTS[2:])
+    for height in HEIGHTS:
+        if height > top or rng.random() < 0.15:
+            continue
+        for codec, ext in VIDEO_CODECS:
+            if rng.random() < 0.25:
+                continue
+            formats.append({
+                "format_id": f"{n}-{height}-{ext}-{codec[:3]}",
+                "ext": ext, "vcodec": codec, "acodec": "none", "height": height,
+                "fps": 60 if height >= 720 and rng.random() < 0.5 else 30,
+                "tbr": round(height * rng.uniform(2.0, 6.0), 3),
+                "filesize": rng.randint(1, 500) * 1_000_000 if rng.random() < 0.7 else None,
+                "format_note": f"{height}p",
+            })
+    for f in formats:
+        f["url"] = f"https://example.invalid/{f['format_id']}"
+    return {"id": f"video{n}", "title": f"Video {n}", "formats": formats}
+
+
+def ytdlp_pick(ydl, info: dict, spec: str):
+    selector = ydl.build_format_selector(spec)
+    ctx = {
+        "formats": info["formats"],
+        "has_merged_format": any(f.get("vcodec") != "none" and f.get("acodec") != "none"
+                                 for f in info["formats"]),
+        "incomplete_formats": False,
+    }
+    picked = next(iter(selector(ctx)), None)
+    return picked["format_id"] if picked else None
+
+
+def check_parity(infos: list[dict]) -> int:
+    ydl = yt_dlp.YoutubeDL({"quiet": True})
+    checked = 0
+    for info in infos:
+        index = FormatIndex(info)
+        options, available = legacy_list(info)
+        assert index.options == options, info["id"]
+        assert index.available_options == available, info["id"]
+
+        requests = [None] + [f"{h}p" for h in HEIGHTS] + ["100p", "1000p"]
+        for quality in requests:
+            spec = _format_selection(quality=quality)[1]
+            expected = ytdlp_pick(ydl, info, spec)
+            pairing = index.pairing_for(quality)
+            if pairing is None:
+                # Left to yt-dlp: only when the chain ends at plain "best"
+                assert expected == ytdlp_pick(ydl, info, "best"), (info["id"], quality)
+            else:
+                assert pairing.selector == expected, (info["id"], quality, pairing.selector, expected)
+            checked += 1
+    return checked
+
+
+def time_per_call(fn, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def main() -> None:
+    videos = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = random.Random(22)
+    infos = [make_info(rng, n) for n in range(videos)]
+
+    checked = check_parity(infos)
+    print(f"parity: {videos} videos, {checked} selector chains match yt-dlp")
+
+    info = max(infos, key=lambda i: len(i["formats"]))
+    index = FormatIndex(info)
+    print(f"\ntiming on the largest list ({len(info['formats'])} formats), µs per response:")
+    print(f"  legacy rebuild          {time_per_call(lambda: legacy_list(info), repeats):8.1f}")
+    print(f"  index build (miss)      {time_per_call(lambda: FormatIndex(info), repeats):8.1f}")
+    print(f"  index query, all        {time_per_call(lambda: (index.query(), index.best_pairings()), repeats):8.1f}")
+    print(f"  index query, filtered   {time_per_call(lambda: (index.query('mp4', None, 1080, None, 'bitrate'), index.best_pairings()), repeats):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Historical growth benchmark and parity check for estimate_historical_growth.
+
+Compares the bisect-based version in ml/prediction.py with the previous
+per-point rescan (kept below as `legacy_growth`) on generated comment
+sets: identical chart data, then timings, plus the cost of daily points.
+
+Run from fastapi-server/:
+    python -m benchmarks.bench_growth [comments] [days]
+"""
+
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from ml.prediction import calculate_linear_regression, estimate_historical_growth
+
+
+def legacy_growth(stats: dict, comments: Optional[list], published_at: Optional[str],
+                  daily: bool = False) -> list[dict]:
+    """estimate_historical_growth before the bisect rewrite (`daily` added for timing)."""
+    total_views = int(stats.get('viewCount', 0))
+    if not published_at:
+        return []
+
+    start_date = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
+    now = datetime.now(start_date.tzinfo)
+    total_days = (now - start_date).days
+
+    if total_days <= 0:
+        return []
+
+    comment_dates: list[int] = []
+    for c in (comments or []):
+        try:
+            date_str = c.get('publishedAt')
+            if date_str:
+                date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+                comment_dates.append((date - start_date).days)
+        except Exception:
+            continue
+
+    comment_dates.sort()
+
+    if not comment_dates:
+        data_points = []
+        for d in range(0, total_days + 1, max(1, total_days // 10)):
+            data_points.append({
+                "date": (start_date + timedelta(days=d)).strftime('%Y-%m-%d'),
+                "views": int((total_views / total_days) * d),
+                "day": d
+            })
+    else:
+        data_points = []
+        total_comments = len(comment_dates)
+        for d in range(0, total_days + 1, 1 if daily else max(1, total_days // 15)):
+            organic_part = (d / total_days) * 0.2
+            comments_before = len([cd for cd in comment_dates if cd <= d])
+            viral_part = (comments_before / total_comments) * 0.8
+            data_points.append({
+                "date": (start_date + timedelta(days=d)).strftime('%Y-%m-%d'),
+                "views": int(total_views * (organic_part + viral_part)),
+                "day": d
+            })
+
+    points = [[p['day'], p['views']] for p in data_points]
+    regression = calculate_linear_regression(points)
+    if regression:
+        slope, intercept = regression
+        for p in data_points:
+            p['regression'] = max(0, int(slope * p['day'] + intercept))
+    else:
+        for p in data_points:
+            p['regression'] = p['views']
+    return data_points
+
+
+def make_case(n: int, days: int, seed: int = 3) -> tuple[dict, list[dict], str]:
+    rng = random.Random(seed)
+    start = (datetime.now(timezone.utc) - timedelta(days=days)).replace(microsecond=0)
+    comments = []
+    for i in range(n):
+        # Front-loaded activity, a few comments before publishing, exact
+        # day boundaries, fractional seconds and some junk entries
+        offset = timedelta(seconds=int(rng.expovariate(1 / (days * 8640)) % (days * 86400)))
+        if i % 1000 == 0:
+            offset = timedelta(days=rng.randint(-2, days))
+        stamp = start + offset
+        text = stamp.strftime('%Y-%m-%dT%H:%M:%SZ')
+        if i % 7 == 0:
+            text = stamp.strftime('%Y-%m-%dT%H:%M:%S.') + f"{rng.randint(0, 999):03d}Z"
+        if i % 5000 == 1:
+            text = "not a date"
+        comments.append({"publishedAt": text} if i % 9000 != 2 else {"text": "no date"})
+    stats = {"viewCount": "48213377"}
+    return stats, comments, start.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def timed(fn, *args, **kwargs) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 900
+
+    stats, comments, published = make_case(n, days)
+    legacy_time, legacy = timed(legacy_growth, stats, comments, published)
+    new_time, new = timed(estimate_historical_growth, stats, comments, published)
+    daily_time, daily = timed(estimate_historical_growth, stats, comments, published, daily=True)
+    legacy_daily_time, legacy_daily = timed(legacy_growth, stats, comments, published, daily=True)
+    same = new == legacy and daily == legacy_daily
+
+    print(f"{n} comments over {days} days")
+    print(f"parity: {'identical' if same else 'MISMATCH'} ({len(new)} and {len(daily)} points)")
+    print(f"  legacy rescan         {legacy_time * 1000:8.1f} ms")
+    print(f"  bisect                {new_time * 1000:8.1f} ms  ({legacy_time / new_time:.1f}x)")
+    print(f"  legacy rescan, daily  {legacy_daily_time * 1000:8.1f} ms")
+    print(f"  bisect, daily         {daily_time * 1000:8.1f} ms  ({legacy_daily_time / daily_time:.1f}x)")
+    sys.exit(0 if same else 1)
+
+
+if __name__ == "__main__":
+    main()
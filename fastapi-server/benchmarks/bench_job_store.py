@@ -0,0 +1,123 @@
+"""
+Job store benchmark: status-poll reads under concurrent progress writers.
+
+Compares the striped-lock store against the previous design (every read
+and write behind one store-wide lock), both over the memory backend:
+  - get_job throughput from reader threads (what /api/download/status
+    polls pay) while writer threads push progress ticks for other jobs.
+    Under the GIL, lock-free readers also take CPU time the blocked
+    readers used to leave to writers; run with 0 readers for writes alone
+  - expiry cost: popping due jobs from the heap vs scanning every job
+
+Run from fastapi-server/:
+    python -m benchmarks.bench_job_store [jobs] [readers] [writers] [seconds]
+"""
+
+import heapq
+import random
+import sys
+import threading
+import time
+
+from download.job_backends import DownloadJob, MemoryJobBackend
+from download.job_store import DownloadJobStore
+
+
+class GlobalLockStore(DownloadJobStore):
+    """The store before striping: one lock around every operation."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._global = threading.Lock()
+
+    def update_job(self, job_id: str, **updates: object) -> None:
+        with self._global:
+            super().update_job(job_id, **updates)
+
+    def get_job(self, job_id: str):
+        with self._global:
+            return super().get_job(job_id)
+
+
+def measure(store: DownloadJobStore, jobs: int, readers: int, writers: int,
+            seconds: float) -> tuple[float, float]:
+    ids = [store.create_job() for _ in range(jobs)]
+    stop = threading.Event()
+    reads = [0] * readers
+    writes = [0] * writers
+
+    def reader(slot: int) -> None:
+        rng = random.Random(slot)
+        n = 0
+        while not stop.is_set():
+            for _ in range(100):
+                store.get_job(ids[rng.randrange(jobs)])
+            n += 100
+        reads[slot] = n
+
+    def writer(slot: int) -> None:
+        rng = random.Random(1000 + slot)
+        n = 0
+        while not stop.is_set():
+            for _ in range(100):
+                p = n % 100
+                store.update_job(ids[rng.randrange(jobs)], progress=p, stage=f"Downloading: {p}%")
+                n += 1
+        writes[slot] = n
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return sum(reads) / seconds, sum(writes) / seconds
+
+
+def measure_expiry(jobs: int) -> tuple[float, float]:
+    """Seconds to expire the oldest 1% of `jobs`: heap pops vs a full scan."""
+    store = DownloadJobStore()
+    now = time.time()
+    for i in range(jobs):
+        # The oldest 1% are past their TTL
+        created_at = now - store.TTL - 1 if i < jobs // 100 else now
+        job = DownloadJob(id=f"job-{i}", created_at=created_at)
+        store.backend.insert(job)
+        store._expiry.append((created_at + store.TTL, job.id))
+    heapq.heapify(store._expiry)
+
+    scan_backend = MemoryJobBackend()
+    for job_id in list(store.backend._jobs):
+        scan_backend.insert(store.get_job(job_id))
+
+    start = time.perf_counter()
+    store._expire_due()
+    heap_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scan_backend.purge(time.time() - store.TTL)
+    scan_time = time.perf_counter() - start
+    return heap_time, scan_time
+
+
+def main() -> None:
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    writers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    seconds = float(sys.argv[4]) if len(sys.argv) > 4 else 2.0
+
+    print(f"{jobs} jobs, {readers} readers, {writers} writers, {seconds:.0f}s each")
+    for name, store in (("global lock", GlobalLockStore()), ("striped", DownloadJobStore())):
+        reads, writes = measure(store, jobs, readers, writers, seconds)
+        print(f"{name:>12}: {reads:12,.0f} reads/s  {writes:10,.0f} writes/s  "
+              f"{reads + writes:12,.0f} ops/s")
+
+    heap_time, scan_time = measure_expiry(jobs * 20)
+    print(f"expire 1% of {jobs * 20} jobs: heap {heap_time * 1000:.2f} ms, "
+          f"full scan {scan_time * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Parallel fragment download benchmark.
+
+Serves a fake DASH manifest and its fragments from a local HTTP server
+that throttles every connection to RATE bytes/s, like the per-connection
+limit on our googlevideo links, then downloads it with each yt-dlp backend
+at several DOWNLOAD_CONCURRENT_FRAGMENTS values.  Arguments come from the
+real _build_download_args/_transfer_args, and progress goes through the
+same on_event path as run_download, so the report also shows whether the
+overall progress reached 100% without going backwards.  Counts above the
+fetch budget (download/budget.py caps them) are skipped; set
+DOWNLOAD_FETCH_CONNECTIONS to try more.
+
+If aria2c is on PATH, a throttled progressive (Range-capable) file is also
+downloaded with and without DOWNLOAD_EXTERNAL_DOWNLOADER=aria2c.
+
+Run from fastapi-server/:
+    python -m benchmarks.bench_parallel_fragments [fragments] [fragment_kib] [rate_kib]
+"""
+
+import http.server
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_ytdlp_backends import drop_impersonation
+from config import settings
+from download.backends import EVENT_DOWNLOAD, InProcessBackend, SubprocessBackend
+from download.budget import resource_budget
+from download.downloader import _build_download_args, _transfer_args
+
+
+MPD = """<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" profiles="urn:mpeg:dash:profile:isoff-on-demand:2011"
+     mediaPresentationDuration="PT{duration}S" minBufferTime="PT2S">
+  <Period>
+    <AdaptationSet mimeType="video/mp4" segmentAlignment="true">
+      <Representation id="v1" codecs="avc1.4d401f" bandwidth="{bandwidth}" width="1280" height="720">
+        <SegmentTemplate timescale="1" duration="1" startNumber="1"
+                         initialization="init.mp4" media="seg-$Number$.m4s"/>
+      </Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>
+"""
+
+
+class _ThrottledHandler(http.server.BaseHTTPRequestHandler):
+    """Serves /manifest.mpd, its fragments and /progressive.mp4 at `rate` bytes/s."""
+
+    fragments = 0
+    fragment_size = 0
+    rate = 0
+    payload = b""
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        path = self.path.split("?")[0]
+        if path == "/manifest.mpd":
+            body = MPD.format(duration=self.fragments,
+                              bandwidth=self.fragment_size * 8).encode()
+            return self._send(body, "application/dash+xml", throttle=False)
+        if path == "/init.mp4":
+            return self._send(self.payload[:1024], "video/mp4", throttle=False)
+        m = re.match(r"/seg-(\d+)\.m4s$", path)
+        if m and 1 <= int(m.group(1)) <= self.fragments:
+            return self._send(self.payload[:self.fragment_size], "video/mp4")
+        if path == "/progressive.mp4":
+            return self._send(self.payload[:self.fragments * self.fragment_size], "video/mp4")
+        self.send_error(404)
+
+    def do_HEAD(self) -> None:
+        if self.path.split("?")[0] != "/progressive.mp4":
+            return self.send_error(404)
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(self.fragments * self.fragment_size))
+        self.end_headers()
+
+    def _send(self, body: bytes, content_type: str, throttle: bool = True) -> None:
+        start, end = 0, len(body) - 1
+        m = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if m:
+            start = int(m.group(1))
+            end = min(end, int(m.group(2))) if m.group(2) else end
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+
+        chunk = 16 * 1024
+        began = time.perf_counter()
+        try:
+            for offset in range(start, end + 1, chunk):
+                piece = body[offset:min(offset + chunk, end + 1)]
+                self.wfile.write(piece)
+                if throttle:
+                    sent = offset + len(piece) - start
+                    delay = sent / self.rate - (time.perf_counter() - began)
+                    if delay > 0:
+                        time.sleep(delay)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class _QuietServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address) -> None:
+        pass
+
+
+def serve(fragments: int, fragment_size: int, rate: int) -> str:
+    handler = type("Handler", (_ThrottledHandler,), {
+        "fragments": fragments,
+        "fragment_size": fragment_size,
+        "rate": rate,
+        "payload": os.urandom(fragments * fragment_size),
+    })
+    server = _QuietServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def run(backend, url: str, info: dict, out_dir: str) -> tuple[float, float, bool]:
+    """One download; returns (seconds, final overall %, progress monotonic)."""
+    output_path = os.path.join(out_dir, f"{backend.name}_{time.time_ns()}.mp4")
+    format_id = info["formats"][-1]["format_id"]
+    args = _build_download_args(output_path, format_id=format_id) + ["--fixup", "never"]
+    args += _transfer_args(info, format_id)
+
+    seen: list[float] = []
+
+    def on_event(kind, pct) -> None:
+        if kind == EVENT_DOWNLOAD:
+            seen.append(pct)
+
+    start = time.perf_counter()
+    backend.download(url, info, args, on_event)
+    elapsed = time.perf_counter() - start
+    for fname in os.listdir(out_dir):
+        os.remove(os.path.join(out_dir, fname))
+    monotonic = all(b >= a - 1e-9 for a, b in zip(seen, seen[1:]))
+    return elapsed, (seen[-1] if seen else float("nan")), monotonic
+
+
+def report(label: str, size: int, result: tuple[float, float, bool]) -> None:
+    elapsed, last, monotonic = result
+    print(f"  {label:<28} {elapsed:6.2f} s  {size / elapsed / 1024 / 1024:7.2f} MiB/s  "
+          f"progress end {last:5.1f}%{'' if monotonic else '  (went backwards)'}")
+
+
+def main() -> None:
+    fragments = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    fragment_size = (int(sys.argv[2]) if len(sys.argv) > 2 else 256) * 1024
+    rate = (int(sys.argv[3]) if len(sys.argv) > 3 else 1024) * 1024
+    size = fragments * fragment_size
+
+    base = serve(fragments, fragment_size, rate)
+    drop_impersonation()
+    settings.DOWNLOAD_PARALLEL_MIN_BYTES = 0
+    print(f"{fragments} x {fragment_size // 1024} KiB fragments, "
+          f"{rate // 1024} KiB/s per connection, "
+          f"fetch budget {resource_budget.fetch.capacity} connections")
+
+    backends = [InProcessBackend(), SubprocessBackend()]
+    with tempfile.TemporaryDirectory() as out_dir:
+        for backend in backends:
+            info = backend.extract_info(f"{base}/manifest.mpd")
+            if backend.name == "inprocess":
+                protocol = info["formats"][-1].get("protocol")
+                print(f"DASH manifest ({protocol}):")
+            for n in (1, 4, 8):
+                if n > resource_budget.fetch.capacity:
+                    continue
+                settings.DOWNLOAD_CONCURRENT_FRAGMENTS = n
+                report(f"{backend.name}, {n} fragment(s)", size, run(backend, base, info, out_dir))
+
+        if shutil.which("aria2c"):
+            print("progressive file:")
+            settings.DOWNLOAD_CONCURRENT_FRAGMENTS = 1
+            for backend in backends:
+                info = backend.extract_info(f"{base}/progressive.mp4")
+                for external in ("", "aria2c"):
+                    settings.DOWNLOAD_EXTERNAL_DOWNLOADER = external
+                    report(f"{backend.name}, {external or 'native'}", size,
+                           run(backend, base, info, out_dir))
+        else:
+            print("aria2c not on PATH: skipping the external downloader comparison")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Polarity scorer accuracy check and throughput benchmark.
+
+Scores `generate_mock_comments` output plus randomly generated comments
+(lexicon words mixed with negations, modifiers, punctuation and
+emoticons) with both `TextBlob(text).sentiment` and `ml.polarity`, fails
+if any score differs by more than TOLERANCE, then compares throughput.
+
+Run from fastapi-server/:
+    python -m benchmarks.bench_polarity [count]
+"""
+
+import random
+import sys
+import time
+
+from textblob import TextBlob
+
+from ml.polarity import _split_punctuation, load_lexicon, score_batch
+from utils.mock_data import generate_mock_comments
+
+
+TOLERANCE = 1e-9
+
+NOISE = [
+    "not", "no", "never", "very", "really", "extremely", "!", "!!!", "...",
+    ":)", ": )", ":-(", "(!)", "( ! )", "don't", "it's", "U.S.", "Mr.", "e.g.",
+    '"great"', "'good'", "x:)", "<3", "XD", "\n\n", ",", "the", "nice.", "bad!",
+    "(good)", "#1", "@user", "well...",
+]
+
+
+def random_comments(count: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    vocab = list(load_lexicon()) + NOISE * 20
+    return [
+        " ".join(rng.choice(vocab) for _ in range(rng.randint(1, 15)))
+        for _ in range(count)
+    ]
+
+
+def check_accuracy(comments: list[str]) -> None:
+    worst = 0.0
+    for text, (polarity, subjectivity) in zip(comments, score_batch(comments)):
+        expected = TextBlob(text).sentiment
+        worst = max(worst, abs(expected.polarity - polarity), abs(expected.subjectivity - subjectivity))
+        if worst > TOLERANCE:
+            raise SystemExit(f"accuracy FAILED on {text!r}: {tuple(expected)} vs {(polarity, subjectivity)}")
+    print(f"accuracy ok on {len(comments)} comments (max abs diff {worst:.2e})")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    comments = generate_mock_comments(count)
+
+    check_accuracy(comments + random_comments(count))
+
+    start = time.perf_counter()
+    for text in comments:
+        TextBlob(text).sentiment
+    ref = time.perf_counter() - start
+
+    _split_punctuation.cache_clear()  # time a cold token cache
+    start = time.perf_counter()
+    score_batch(comments)
+    new = time.perf_counter() - start
+
+    print(f"TextBlob:    {ref * 1000:8.1f} ms  ({count / ref:9.0f} comments/s)")
+    print(f"score_batch: {new * 1000:8.1f} ms  ({count / new:9.0f} comments/s)")
+    print(f"speed-up:    {ref / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Sentiment engine parity check and benchmark.
+
+Compares the compiled `analyze_comment` path against the original
+per-check implementation (TextBlob object + detect_* helpers + re.sub
+tokenizer) on `generate_mock_comments` output, then times both.
+
+Run from fastapi-server/:
+    python -m benchmarks.bench_sentiment [count]
+"""
+
+import re
+import sys
+import time
+from collections import Counter
+
+from textblob import TextBlob
+
+from ml.sentiment import (
+    STOP_WORDS,
+    analyze_sentiment_and_topics,
+    detect_emotions,
+    detect_sarcasm,
+    detect_spam,
+)
+from utils.mock_data import generate_mock_comments
+
+
+EDGE_CASES = [
+    "Oh great, another amazing tutorial... yeah right",
+    "FIRST!!!",
+    "first",
+    "CHECK OUT MY CHANNEL FOR FREE VBUCKS",
+    "yesad and thanksgiving horror",
+    "I cant wait, looking forward to part 2 lol",
+    "nooooooooo why",
+    "Who else is watching in 2026?",
+    "",
+]
+
+
+def reference_analysis(comments: list[str]) -> dict:
+    """The pre-compilation hot loop, kept verbatim as the parity baseline."""
+    results = analyze_sentiment_and_topics([])
+    results["total"] = len(comments)
+    total_polarity = 0.0
+    words: list[str] = []
+
+    for comment in comments:
+        comment_lower = comment.lower()
+        analysis = TextBlob(comment)
+        polarity = analysis.sentiment.polarity
+        subjectivity = analysis.sentiment.subjectivity
+        total_polarity += polarity
+
+        if polarity > 0.05:
+            results["positive"] += 1
+        elif polarity < -0.05:
+            results["negative"] += 1
+        else:
+            results["neutral"] += 1
+
+        for emotion, count in detect_emotions(comment_lower).items():
+            results["emotions"][emotion] += count
+
+        if detect_spam(comment, comment_lower):
+            results["spam_count"] += 1
+            if len(results["spam_comments"]) < 5:
+                results["spam_comments"].append(comment[:100])
+
+        if detect_sarcasm(comment_lower, polarity, subjectivity):
+            results["sarcasm_detected"] += 1
+
+        clean_text = re.sub(r'[^a-zA-Z\s]', '', comment_lower)
+        words.extend([w for w in clean_text.split() if w not in STOP_WORDS and len(w) > 3])
+
+    results["average_polarity"] = total_polarity / len(comments)
+    counts = Counter(words)
+    results["topics"] = [{"name": name, "count": count} for name, count in counts.most_common(10)]
+    return results
+
+
+def check_parity(comments: list[str]) -> None:
+    expected = reference_analysis(comments)
+    actual = analyze_sentiment_and_topics(comments)
+    mismatched = [k for k in expected if expected[k] != actual[k]]
+    if mismatched:
+        raise SystemExit(f"parity FAILED on {mismatched}")
+    print(f"parity ok on {len(comments)} comments")
+
+
+def timed(fn, comments: list[str]) -> float:
+    start = time.perf_counter()
+    fn(comments)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    comments = generate_mock_comments(count)
+
+    check_parity(comments + EDGE_CASES)
+
+    # Warm up both paths (lexicon load, regex compile)
+    reference_analysis(comments[:50])
+    analyze_sentiment_and_topics(comments[:50])
+
+    ref = timed(reference_analysis, comments)
+    new = timed(analyze_sentiment_and_topics, comments)
+    print(f"reference: {ref * 1000:8.1f} ms  ({ref / count * 1e6:6.1f} us/comment)")
+    print(f"compiled:  {new * 1000:8.1f} ms  ({new / count * 1e6:6.1f} us/comment)")
+    print(f"speed-up:  {ref / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Topic extraction benchmark: exact word list + Counter vs TopicSketch.
+
+Generates comments whose words follow a Zipf distribution over a large
+vocabulary, then compares peak memory (tracemalloc), time, top-10 overlap
+and count error of the old "append every token, Counter, most_common(10)"
+approach against SentimentAccumulator's sliced Counter + TopicSketch.
+
+Run from fastapi-server/:
+    python -m benchmarks.bench_topics [comments] [capacity]
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+from ml.topics import TopicSketch
+
+
+VOCAB_SIZE = 200_000
+WORDS_PER_COMMENT = 12
+FLUSH_EVERY = 1000
+
+
+def zipf_comments(count: int, seed: int = 11) -> list[list[str]]:
+    rng = random.Random(seed)
+    vocab = [f"word{i}" for i in range(VOCAB_SIZE)]
+    weights = [1 / (rank + 1) for rank in range(VOCAB_SIZE)]
+    flat = rng.choices(vocab, weights=weights, k=count * WORDS_PER_COMMENT)
+    return [flat[i:i + WORDS_PER_COMMENT] for i in range(0, len(flat), WORDS_PER_COMMENT)]
+
+
+def exact_topics(comments: list[list[str]]) -> list[tuple[str, int]]:
+    words: list[str] = []
+    for tokens in comments:
+        words.extend(tokens)
+    return Counter(words).most_common(10)
+
+
+def sketch_topics(comments: list[list[str]], capacity: int) -> tuple[list[tuple[str, int]], int]:
+    sketch = TopicSketch(capacity)
+    counts: Counter = Counter()
+    for n, tokens in enumerate(comments, 1):
+        counts.update(tokens)
+        if n % FLUSH_EVERY == 0:
+            sketch.update(counts)
+            counts = Counter()
+    sketch.update(counts)
+    return sketch.most_common(10), sketch.error_bound
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    capacity = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    comments = zipf_comments(count)
+    n_words = count * WORDS_PER_COMMENT
+
+    exact, exact_t, exact_mem = measure(exact_topics, comments)
+    (approx, bound), sketch_t, sketch_mem = measure(sketch_topics, comments, capacity)
+
+    true_counts = dict(Counter(w for tokens in comments for w in tokens))
+    overlap = len({w for w, _ in exact} & {w for w, _ in approx})
+    worst = max(true_counts[w] - c for w, c in approx)
+
+    print(f"{count} comments, {n_words} words, capacity {capacity}")
+    print(f"exact Counter: {exact_t * 1000:8.1f} ms  peak {exact_mem / 1e6:7.1f} MB")
+    print(f"TopicSketch:   {sketch_t * 1000:8.1f} ms  peak {sketch_mem / 1e6:7.1f} MB")
+    print(f"top-10 overlap: {overlap}/10, same order: {[w for w, _ in exact] == [w for w, _ in approx]}")
+    print(f"max count error in top-10: {worst} (guaranteed <= {bound}, "
+          f"<= N/(capacity+1) = {n_words // (capacity + 1)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+yt-dlp backend benchmark: in-process YoutubeDL vs `python -m yt_dlp`.
+
+Measures, for each backend:
+  - metadata latency (what /api/formats pays on a cache miss)
+  - download time-to-first-progress and total time
+
+Without a URL it serves a generated file from a local HTTP server, which
+isolates the per-call overhead (interpreter boot, extractor import, JSON
+over a pipe) from network time.  Impersonation isn't needed for the local
+server, so it's dropped there when curl_cffi isn't installed.
+
+Run from fastapi-server/:
+    python -m benchmarks.bench_ytdlp_backends [url] [repeats]
+"""
+
+import functools
+import http.server
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from download import backends
+from download.backends import EVENT_DOWNLOAD, InProcessBackend, SubprocessBackend
+from download.downloader import _build_download_args
+
+
+FILE_SIZE = 16 * 1024 * 1024
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+
+class _QuietServer(http.server.ThreadingHTTPServer):
+    def handle_error(self, request, client_address) -> None:
+        # The generic extractor hangs up after sniffing the first bytes
+        pass
+
+
+def serve_local_file(directory: str) -> str:
+    path = os.path.join(directory, "sample.mp4")
+    with open(path, "wb") as fh:
+        fh.write(os.urandom(FILE_SIZE))
+    handler = functools.partial(_QuietHandler, directory=directory)
+    server = _QuietServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/sample.mp4"
+
+
+def drop_impersonation() -> None:
+    try:
+        import curl_cffi  # noqa: F401
+    except ImportError:
+        i = backends.BASE_ARGS.index("--impersonate")
+        del backends.BASE_ARGS[i:i + 2]
+        print("curl_cffi not installed: benchmarking without --impersonate")
+
+
+def time_extract(backend, url: str, repeats: int) -> list[float]:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        backend.extract_info(url)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def time_download(backend, url: str, info: dict, out_dir: str) -> tuple[float, float]:
+    output_path = os.path.join(out_dir, f"{backend.name}_{time.time_ns()}.mp4")
+    first: list[float] = []
+    start = time.perf_counter()
+
+    def on_event(kind, pct) -> None:
+        if kind == EVENT_DOWNLOAD and not first:
+            first.append(time.perf_counter() - start)
+
+    backend.download(url, info, _build_download_args(output_path), on_event)
+    total = time.perf_counter() - start
+    for fname in os.listdir(out_dir):
+        if fname.startswith(backend.name):
+            os.remove(os.path.join(out_dir, fname))
+    return (first[0] if first else float("nan")), total
+
+
+def main() -> None:
+    url = sys.argv[1] if len(sys.argv) > 1 else None
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if url is None:
+            url = serve_local_file(tmp)
+            drop_impersonation()
+        out_dir = os.path.join(tmp, "out")
+        os.mkdir(out_dir)
+
+        start = time.perf_counter()
+        inprocess = InProcessBackend()
+        inprocess.warm()
+        print(f"in-process import + warm-up: {(time.perf_counter() - start) * 1000:.0f} ms (once per server)")
+
+        for backend in (SubprocessBackend(), inprocess):
+            samples = time_extract(backend, url, repeats)
+            info = backend.extract_info(url)
+            ttfp, total = time_download(backend, url, info, out_dir)
+            print(
+                f"{backend.name:>10}: metadata median {statistics.median(samples) * 1000:7.1f} ms "
+                f"(min {min(samples) * 1000:.1f})  "
+                f"download first progress {ttfp * 1000:7.1f} ms, total {total * 1000:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
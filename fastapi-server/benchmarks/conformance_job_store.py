@@ -0,0 +1,271 @@
+"""
+Job store backend conformance checks.
+
+Runs the same cases against every DownloadJobStore backend: memory,
+SQLite (WAL, temp file) and the Redis-protocol backend, the latter against
+a small in-process RESP stand-in unless a real server URL is given.  Shared
+backends are also checked for visibility across processes.
+
+Run from fastapi-server/:
+    python -m benchmarks.conformance_job_store [redis://host:port/db]
+"""
+
+import multiprocessing
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from typing import Callable
+
+from download.job_backends import (
+    JobBackend,
+    MemoryJobBackend,
+    RedisJobBackend,
+    SQLiteJobBackend,
+)
+from download.job_store import DownloadJobStore
+
+
+# ── RESP stand-in ─────────────────────────────────────────
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    """Implements the handful of commands RedisJobBackend uses."""
+
+    def handle(self) -> None:
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            count = int(line[1:-2])
+            args = []
+            for _ in range(count):
+                size = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(size + 2)[:-2].decode("utf-8"))
+            self.wfile.write(self.server.execute(args))
+
+
+class RespStandIn(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _RespHandler)
+        self.hashes: dict[str, dict[str, str]] = {}
+        self.expiry: dict[str, float] = {}
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+    def _expire(self, key: str) -> None:
+        if key in self.expiry and self.expiry[key] <= time.time():
+            self.hashes.pop(key, None)
+            del self.expiry[key]
+
+    def execute(self, args: list[str]) -> bytes:
+        cmd, rest = args[0].upper(), args[1:]
+        with self.lock:
+            if rest:
+                self._expire(rest[0])
+            if cmd in ("PING", "AUTH", "SELECT"):
+                return b"+OK\r\n"
+            if cmd == "HSET":
+                h = self.hashes.setdefault(rest[0], {})
+                added = sum(1 for k in rest[1::2] if k not in h)
+                h.update(zip(rest[1::2], rest[2::2]))
+                return b":%d\r\n" % added
+            if cmd == "HGETALL":
+                h = self.hashes.get(rest[0], {})
+                out = [b"*%d\r\n" % (2 * len(h))]
+                for k, v in h.items():
+                    for item in (k, v):
+                        data = item.encode("utf-8")
+                        out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+                return b"".join(out)
+            if cmd == "EXISTS":
+                return b":%d\r\n" % (rest[0] in self.hashes)
+            if cmd == "DEL":
+                self.expiry.pop(rest[0], None)
+                return b":%d\r\n" % (self.hashes.pop(rest[0], None) is not None)
+            if cmd == "EXPIRE":
+                if rest[0] not in self.hashes:
+                    return b":0\r\n"
+                self.expiry[rest[0]] = time.time() + int(rest[1])
+                return b":1\r\n"
+        return b"-ERR unknown command '%s'\r\n" % cmd.encode()
+
+
+# ── Cases ─────────────────────────────────────────────────
+
+def case_create_get(store: DownloadJobStore) -> None:
+    job_id = store.create_job()
+    job = store.get_job(job_id)
+    assert job is not None and job.id == job_id
+    assert (job.status, job.progress, job.stage) == ("pending", 0, "Initializing...")
+    assert job.file_path is None and job.error is None
+    assert abs(job.created_at - time.time()) < 5
+    assert store.get_job("missing") is None
+
+
+def case_update_roundtrip(store: DownloadJobStore) -> None:
+    job_id = store.create_job()
+    store.update_job(job_id, status="completed", progress=100, stage="Ready — ✓",
+                     file_path="/tmp/a b.mp4", filename="ä.mp4", unknown_field=1)
+    job = store.get_job(job_id)
+    assert (job.status, job.progress, job.stage) == ("completed", 100, "Ready — ✓")
+    assert (job.file_path, job.filename) == ("/tmp/a b.mp4", "ä.mp4")
+    assert not hasattr(job, "unknown_field")
+    store.update_job(job_id, file_path=None)
+    assert store.get_job(job_id).file_path is None
+
+
+def case_listener_deltas(store: DownloadJobStore) -> None:
+    job_id = store.create_job()
+    seen: list[dict] = []
+    snapshot = store.add_listener(job_id, seen.append)
+    assert snapshot["id"] == job_id and snapshot["status"] == "pending"
+    store.update_job(job_id, status="processing", progress=5)
+    store.update_job(job_id, status="processing", progress=5)   # no change
+    store.update_job(job_id, progress=6)
+    assert seen == [{"status": "processing", "progress": 5}, {"progress": 6}], seen
+    store.remove_listener(job_id, seen.append)
+    store.update_job(job_id, progress=7)
+    assert len(seen) == 2
+    assert store.add_listener("missing", seen.append) is None
+    store.add_listener(job_id, seen.append)
+    store.delete_job(job_id)
+    assert seen[-1] is None, seen
+
+
+def case_missing_and_delete(store: DownloadJobStore) -> None:
+    store.update_job("missing", status="failed")
+    assert store.get_job("missing") is None
+    job_id = store.create_job()
+    store.delete_job(job_id)
+    assert store.get_job(job_id) is None
+    store.update_job(job_id, status="failed")   # must not resurrect
+    assert store.get_job(job_id) is None
+
+
+def case_concurrent_updates(store: DownloadJobStore) -> None:
+    ids = [store.create_job() for _ in range(8)]
+
+    def worker(job_id: str) -> None:
+        for p in range(1, 101):
+            store.update_job(job_id, progress=p, stage=f"Downloading: {p}%")
+
+    threads = [threading.Thread(target=worker, args=(jid,)) for jid in ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for jid in ids:
+        job = store.get_job(jid)
+        assert (job.progress, job.stage) == (100, "Downloading: 100%")
+
+
+def case_expiry(store: DownloadJobStore) -> None:
+    backend = store.backend
+    job_id = store.create_job()
+    if isinstance(backend, RedisJobBackend):
+        short = RedisJobBackend(backend_url(backend), ttl=1, prefix=backend.prefix)
+        expiring = DownloadJobStore(short)
+        jid = expiring.create_job()
+        time.sleep(1.2)
+        assert expiring.get_job(jid) is None
+        return
+    assert job_id not in backend.purge(time.time() - 60)
+    assert job_id in backend.purge(time.time() + 1)
+    assert store.get_job(job_id) is None
+
+
+CASES: list[Callable[[DownloadJobStore], None]] = [
+    case_create_get,
+    case_update_roundtrip,
+    case_listener_deltas,
+    case_missing_and_delete,
+    case_concurrent_updates,
+    case_expiry,
+]
+
+
+# ── Cross-process visibility (shared backends) ────────────
+
+def backend_url(backend: RedisJobBackend) -> str:
+    host, port, _, db = backend._address
+    return f"redis://{host}:{port}/{db}"
+
+
+def _make_backend(kind: str, location: str) -> JobBackend:
+    if kind == "sqlite":
+        return SQLiteJobBackend(location)
+    return RedisJobBackend(location, ttl=DownloadJobStore.TTL)
+
+
+def _child_update(kind: str, location: str, job_id: str) -> None:
+    store = DownloadJobStore(_make_backend(kind, location))
+    store.update_job(job_id, status="completed", progress=100, file_path="/tmp/x.mp4")
+
+
+def case_cross_process(kind: str, location: str) -> None:
+    store = DownloadJobStore(_make_backend(kind, location))
+    job_id = store.create_job()
+    proc = multiprocessing.get_context("spawn").Process(
+        target=_child_update, args=(kind, location, job_id)
+    )
+    proc.start()
+    proc.join(30)
+    assert proc.exitcode == 0
+    job = store.get_job(job_id)
+    assert (job.status, job.progress, job.file_path) == ("completed", 100, "/tmp/x.mp4")
+
+
+# ── Runner ────────────────────────────────────────────────
+
+def run(name: str, factory: Callable[[], JobBackend]) -> int:
+    failures = 0
+    for case in CASES:
+        try:
+            case(DownloadJobStore(factory()))
+            status = "ok"
+        except Exception:
+            failures += 1
+            status = "FAIL\n" + traceback.format_exc()
+        print(f"{name:>7} {case.__name__:<28} {status}")
+    return failures
+
+
+def main() -> None:
+    failures = 0
+    failures += run("memory", MemoryJobBackend)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "jobs.db")
+        failures += run("sqlite", lambda: SQLiteJobBackend(db_path))
+        try:
+            case_cross_process("sqlite", db_path)
+            print(f"{'sqlite':>7} {'case_cross_process':<28} ok")
+        except Exception:
+            failures += 1
+            print(f"{'sqlite':>7} {'case_cross_process':<28} FAIL\n{traceback.format_exc()}")
+
+    redis_url = sys.argv[1] if len(sys.argv) > 1 else RespStandIn().url
+    failures += run("redis", lambda: RedisJobBackend(redis_url, ttl=DownloadJobStore.TTL))
+    try:
+        case_cross_process("redis", redis_url)
+        print(f"{'redis':>7} {'case_cross_process':<28} ok")
+    except Exception:
+        failures += 1
+        print(f"{'redis':>7} {'case_cross_process':<28} FAIL\n{traceback.format_exc()}")
+
+    print("all backends conform" if not failures else f"{failures} failure(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
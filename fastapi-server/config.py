@@ -5,6 +5,82 @@ class Settings(BaseSettings):
     PORT: int = 5001
     CORS_ORIGIN: str = "*"
 
+    # ML process pool: worker count and comments per sentiment chunk
+    ML_POOL_SIZE: int = 2
+    SENTIMENT_CHUNK_SIZE: int = 1000
+    # Threads for in-process ML work (aggregation, predict, earnings)
+    ML_THREAD_POOL_SIZE: int = 4
+    # Comments scored per progress frame on /api/analyze-sentiment/stream
+    SENTIMENT_STREAM_BATCH_SIZE: int = 500
+    # Topic extraction: words tracked by the heavy-hitters sketch (count
+    # error <= words seen / (capacity + 1)) and optional bigram topics
+    TOPIC_SKETCH_CAPACITY: int = 5000
+    TOPIC_BIGRAMS: bool = False
+    # Per-comment score memo (entries) for incremental re-analysis
+    COMMENT_MEMO_SIZE: int = 200_000
+    # Videos accepted per /api/batch/analytics request
+    BATCH_MAX_VIDEOS: int = 200
+
+    # ML result cache: in-memory byte budget, entry TTL (seconds) and an
+    # optional SQLite file (capped at MAX_ENTRIES rows) for a tier that
+    # survives restarts
+    RESULT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    RESULT_CACHE_TTL: int = 60 * 60
+    RESULT_CACHE_SQLITE_PATH: str = ""
+    RESULT_CACHE_SQLITE_MAX_ENTRIES: int = 100_000
+
+    # Download job store: "memory" (single worker), "sqlite" (workers on one
+    # host share JOB_STORE_SQLITE_PATH) or "redis" (JOB_STORE_REDIS_URL)
+    JOB_STORE_BACKEND: str = "memory"
+    JOB_STORE_SQLITE_PATH: str = "download_jobs.db"
+    JOB_STORE_REDIS_URL: str = "redis://localhost:6379/0"
+
+    # Download scheduler: concurrent downloads and how many may wait
+    DOWNLOAD_CONCURRENCY: int = 2
+    DOWNLOAD_QUEUE_SIZE: int = 20
+    # Seconds /api/download/stream waits (queued or starting) for the first
+    # bytes before giving up with 504
+    DOWNLOAD_STREAM_START_TIMEOUT: int = 60
+    # Downloaded media cache: dedicated directory (default: <tmp>/yt-media-cache),
+    # disk budget in bytes, and seconds a served file is kept for resumed
+    # Range requests before it may be evicted
+    MEDIA_CACHE_DIR: str = ""
+    MEDIA_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+    MEDIA_SERVE_GRACE: int = 10 * 60
+    # Parallel transfers for downloads of at least DOWNLOAD_PARALLEL_MIN_BYTES
+    # (by the cached format sizes): fragments fetched at once for DASH/HLS
+    # formats (1 = off), and an optional external downloader such as aria2c
+    # for plain HTTPS formats, used only if it is on PATH
+    DOWNLOAD_CONCURRENT_FRAGMENTS: int = 4
+    DOWNLOAD_PARALLEL_MIN_BYTES: int = 32 * 1024 * 1024
+    DOWNLOAD_EXTERNAL_DOWNLOADER: str = ""
+    DOWNLOAD_EXTERNAL_DOWNLOADER_ARGS: str = ""
+    # Resource budgets (download/budget.py); 0 = derive from the usable CPUs
+    # (cpu count, affinity and cgroup quota): merges/transcodes at once,
+    # fragment connections at once and ffmpeg -threads per run
+    DOWNLOAD_MERGE_SLOTS: int = 0
+    DOWNLOAD_FETCH_CONNECTIONS: int = 0
+    FFMPEG_THREADS: int = 0
+    # Priority of download threads and their child processes: nice increment
+    # and ionice class (2 = best-effort, lowest level; 3 = idle; 0 = unchanged)
+    DOWNLOAD_NICE: int = 10
+    DOWNLOAD_IONICE_CLASS: int = 2
+
+    # yt-dlp backend: "inprocess" (yt_dlp.YoutubeDL in this process) or
+    # "subprocess" (python -m yt_dlp per call)
+    YTDLP_BACKEND: str = "inprocess"
+    # Seconds between background re-probes of the ffmpeg binary (0 = startup only)
+    FFMPEG_PROBE_INTERVAL: int = 10 * 60
+    # AAC re-encodes run at once in the ffmpeg transcode pool (0 = yt-dlp
+    # re-encodes inline while merging)
+    FFMPEG_TRANSCODE_WORKERS: int = 1
+
+    # yt-dlp metadata cache: max age (seconds), safety margin before the
+    # signed media URLs expire, and number of videos kept
+    METADATA_CACHE_TTL: int = 60 * 60
+    METADATA_EXPIRY_MARGIN: int = 5 * 60
+    METADATA_CACHE_SIZE: int = 64
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,282 @@
+"""
+yt-dlp backends used by the downloader.
+
+  - InProcessBackend: drives yt_dlp.YoutubeDL inside this process.  Metadata
+    extraction reuses one long-lived YoutubeDL per worker thread, and
+    downloads report progress through yt-dlp's progress/postprocessor hooks.
+  - SubprocessBackend: runs `python -m yt_dlp` per call and parses the
+    `--newline` progress lines from stdout (see download/progress.py).  Slower (an interpreter boot and
+    extractor import per call) but isolates yt-dlp from the server process.
+
+Both take the same CLI-style argument lists (BASE_ARGS plus the downloader's
+format arguments), so format selection is defined in one place; the
+in-process backend translates them with yt_dlp.parse_options.
+
+Progress is reported as `on_event(kind, pct)` with kind one of the EVENT_*
+constants below; `pct` is only set for EVENT_DOWNLOAD, and covers all the
+files of a merged download.
+
+Downloads reuse the cached info dict.  If its signed media URLs have
+expired (HTTP 403/410) both backends retry once with a fresh extraction;
+any other failure is raised as-is.
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+from typing import Callable, Optional
+
+from config import settings
+from download.progress import DownloadProgress, expected_sizes
+
+
+# ── Constants ─────────────────────────────────────────────
+
+BASE_ARGS = [
+    "--no-playlist",
+    "--js-runtimes", "node,nodejs",
+    "--impersonate", "chrome",
+    "--extractor-args", "youtube:player-client=tvhtml5,android_vr,android_embedded,ios;player_skip=web,mweb",
+    "--add-header", "Accept-Language: en-US,en;q=0.5",
+]
+
+EVENT_DOWNLOAD = "download"
+EVENT_MERGE = "merge"
+EVENT_FIXUP = "fixup"
+EVENT_CONVERT = "convert"
+
+ProgressCallback = Callable[[str, Optional[float]], None]
+
+# Error (not a retried warning) for a media URL whose signature expired
+_EXPIRED_URL_RE = re.compile(r"^ERROR:.*HTTP Error (403|410)\b", re.MULTILINE)
+_EXPIRED_URL_STATUSES = (403, 410)
+
+
+def _yt_dlp_cmd() -> list[str]:
+    """Return the yt-dlp command as a list — uses python -m yt_dlp for reliability."""
+    return [sys.executable, "-m", "yt_dlp"]
+
+
+def _progress_for(info: dict, args: list[str]) -> DownloadProgress:
+    selector = args[args.index("-f") + 1] if "-f" in args else None
+    return DownloadProgress(expected_sizes(info, selector))
+
+
+def _refetch_url(url: str, info: dict) -> str:
+    return info.get("webpage_url") or url
+
+
+# ── Subprocess backend ────────────────────────────────────
+
+class SubprocessBackend:
+    name = "subprocess"
+
+    def warm(self) -> None:
+        pass
+
+    def extract_info(self, url: str) -> dict:
+        """Run `yt-dlp --dump-single-json` for a URL."""
+        args = _yt_dlp_cmd() + BASE_ARGS + [
+            "--dump-single-json", "--skip-download", "--quiet", url
+        ]
+
+        result = subprocess.run(args, capture_output=True, text=True, timeout=60)
+
+        if result.returncode != 0:
+            err_msg = result.stderr.strip() or "unknown error"
+            print(f"DEBUG: yt-dlp metadata fetch failed for {url}. Error: {err_msg}")
+            raise RuntimeError(f"yt-dlp failed: {err_msg}")
+
+        return json.loads(result.stdout)
+
+    def download(self, url: str, info: dict, args: list[str],
+                 on_event: ProgressCallback) -> None:
+        """Download with `--load-info-json` so yt-dlp skips re-extraction."""
+        progress = _progress_for(info, args)
+        fd, info_path = tempfile.mkstemp(suffix=".info.json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(info, fh)
+            returncode, stderr_out = self._run(args + ["--load-info-json", info_path],
+                                               progress, on_event)
+        finally:
+            os.remove(info_path)
+
+        if returncode != 0 and _EXPIRED_URL_RE.search(stderr_out):
+            print(f"DEBUG: cached media URLs rejected for {url}; re-extracting")
+            returncode, stderr_out = self._run(args + [_refetch_url(url, info)],
+                                               progress, on_event)
+        if returncode != 0:
+            raise RuntimeError(
+                f"yt-dlp exited with code {returncode}. {stderr_out[-500:]}"
+            )
+
+    def _run(self, args: list[str], progress: DownloadProgress,
+             on_event: ProgressCallback) -> tuple[int, str]:
+        """Run yt-dlp, reporting progress; returns (exit code, stderr)."""
+        process = subprocess.Popen(
+            _yt_dlp_cmd() + args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+
+        if process.stdout:
+            # Text mode also splits on the \r of external downloader readouts
+            for line in process.stdout:
+                line = line.rstrip()
+                # Parse progress: [download]  12.3% of ... (frag 3/20)
+                pct = progress.feed(line)
+                if pct is not None:
+                    on_event(EVENT_DOWNLOAD, pct)
+                elif "[Merger]" in line or "Merging formats" in line:
+                    on_event(EVENT_MERGE, None)
+                elif "[Fixup" in line or "Fixing" in line:
+                    on_event(EVENT_FIXUP, None)
+                elif "[VideoConvertor]" in line:
+                    on_event(EVENT_CONVERT, None)
+
+        # Drain stderr (warnings etc.)
+        stderr_out = ""
+        if process.stderr:
+            stderr_out = process.stderr.read()
+
+        process.wait()
+        return process.returncode, stderr_out
+
+
+# ── In-process backend ────────────────────────────────────
+
+class InProcessBackend:
+    name = "inprocess"
+
+    def __init__(self) -> None:
+        import yt_dlp
+
+        self._yt_dlp = yt_dlp
+        self._base_opts = self._parse_args(BASE_ARGS)
+        self._local = threading.local()
+
+    def _parse_args(self, args: list[str]) -> dict:
+        opts = dict(self._yt_dlp.parse_options(args).ydl_opts)
+        # Raise on errors instead of the CLI's "report and exit 1"
+        opts.update(quiet=True, no_warnings=True, noprogress=True, ignoreerrors=False)
+        return opts
+
+    def _extractor(self):
+        """Long-lived YoutubeDL for metadata, one per worker thread."""
+        ydl = getattr(self._local, "ydl", None)
+        if ydl is None:
+            ydl = self._yt_dlp.YoutubeDL(self._base_opts)
+            self._local.ydl = ydl
+        return ydl
+
+    def warm(self) -> None:
+        # Load the YouTube extractor classes now rather than on the first request
+        self._extractor().get_info_extractor("Youtube")
+
+    def extract_info(self, url: str) -> dict:
+        ydl = self._extractor()
+        try:
+            info = ydl.extract_info(url, download=False)
+        except self._yt_dlp.utils.DownloadError as exc:
+            print(f"DEBUG: yt-dlp metadata fetch failed for {url}. Error: {exc}")
+            raise RuntimeError(f"yt-dlp failed: {exc}") from exc
+        # Same JSON-safe shape as --dump-single-json
+        return ydl.sanitize_info(info)
+
+    def download(self, url: str, info: dict, args: list[str],
+                 on_event: ProgressCallback) -> None:
+        progress = _progress_for(info, args)
+
+        def progress_hook(d: dict) -> None:
+            status = d.get("status")
+            if status == "finished":
+                # External downloaders only report when a file is done
+                on_event(EVENT_DOWNLOAD, progress.update(100.0, d.get("filename")))
+                return
+            if status != "downloading":
+                return
+            total = d.get("total_bytes") or d.get("total_bytes_estimate")
+            if total:
+                pct = 100.0 * d.get("downloaded_bytes", 0) / total
+            elif d.get("fragment_count"):
+                pct = 100.0 * d.get("fragment_index", 0) / d["fragment_count"]
+            else:
+                return
+            on_event(EVENT_DOWNLOAD, progress.update(pct, d.get("filename")))
+
+        def postprocessor_hook(d: dict) -> None:
+            if d.get("status") != "started":
+                return
+            pp = d.get("postprocessor", "")
+            if pp == "Merger":
+                on_event(EVENT_MERGE, None)
+            elif pp.startswith("Fixup"):
+                on_event(EVENT_FIXUP, None)
+            elif pp == "VideoConvertor":
+                on_event(EVENT_CONVERT, None)
+
+        opts = self._parse_args(args)
+        opts["progress_hooks"] = [progress_hook]
+        opts["postprocessor_hooks"] = [postprocessor_hook]
+
+        DownloadError = self._yt_dlp.utils.DownloadError
+        with self._yt_dlp.YoutubeDL(opts) as ydl:
+            try:
+                # Same as --load-info-json: reuse the info dict, and only
+                # re-extract if its media URLs have expired
+                try:
+                    ydl.process_ie_result(ydl.sanitize_info(info), download=True)
+                except self._yt_dlp.utils.ReExtractInfo:
+                    ydl.download([_refetch_url(url, info)])
+                except DownloadError as exc:
+                    if not self._url_expired(exc):
+                        raise
+                    print(f"DEBUG: cached media URLs rejected for {url}; re-extracting")
+                    ydl.download([_refetch_url(url, info)])
+            except DownloadError as exc:
+                raise RuntimeError(f"yt-dlp download failed: {exc}") from exc
+
+    @staticmethod
+    def _url_expired(exc: Exception) -> bool:
+        """Whether a DownloadError comes from a 403/410 on a media URL."""
+        cause = exc.exc_info[1] if getattr(exc, "exc_info", None) else None
+        status = getattr(cause, "status", None) or getattr(cause, "code", None)
+        return status in _EXPIRED_URL_STATUSES or bool(_EXPIRED_URL_RE.search(str(exc)))
+
+
+# ── Selection ─────────────────────────────────────────────
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The configured backend (YTDLP_BACKEND), created on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if settings.YTDLP_BACKEND == "subprocess":
+                _backend = SubprocessBackend()
+            else:
+                try:
+                    _backend = InProcessBackend()
+                except ImportError as exc:
+                    print(f"DEBUG: yt_dlp not importable ({exc}); using subprocess backend")
+                    _backend = SubprocessBackend()
+        return _backend
+
+
+def warm_backend() -> None:
+    """Import yt-dlp and load its extractors before the first request."""
+    try:
+        get_backend().warm()
+    except Exception as exc:
+        # Requests will surface the same error; don't block startup on it
+        print(f"DEBUG: yt-dlp warm-up failed: {exc}")
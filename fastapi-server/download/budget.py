@@ -0,0 +1,181 @@
+"""
+CPU and I/O budgets for downloads.
+
+One download can start yt-dlp, several fragment connections and a
+multithreaded ffmpeg merge; a few in parallel used to take every core and
+starve /api/predict.  The limits here are derived from the CPUs this
+process may actually use — os.cpu_count(), the affinity mask and the
+cgroup CPU quota, whichever is lowest — keeping one core for the API:
+
+  - ffmpeg runs get `-threads` so one merge can't fan out over every core
+  - download worker threads run at lower CPU and I/O priority (nice and
+    ionice); on Linux both are per thread and inherited by the yt-dlp and
+    ffmpeg processes they start
+  - `merge` bounds CPU-heavy work (merges, transcodes) and `fetch` bounds
+    fragment connections, independently of DOWNLOAD_CONCURRENCY
+
+Each limit can be pinned with its DOWNLOAD_* / FFMPEG_THREADS setting.
+"""
+
+import math
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from typing import Optional
+
+from config import settings
+
+
+# ── CPU detection ─────────────────────────────────────────
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as fh:
+            return fh.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_quota() -> Optional[float]:
+    """CPUs allowed by the cgroup CPU quota (v2 cpu.max or v1 CFS), if any."""
+    # cgroup v2: this process's group, then the mount root (cgroup namespaces)
+    paths = ["/sys/fs/cgroup/cpu.max"]
+    for line in (_read("/proc/self/cgroup") or "").splitlines():
+        if line.startswith("0::"):
+            paths.insert(0, f"/sys/fs/cgroup{line[3:].rstrip('/')}/cpu.max")
+    for path in paths:
+        value = _read(path)
+        if value:
+            quota, _, period = value.partition(" ")
+            if quota == "max":
+                return None
+            try:
+                return int(quota) / int(period)
+            except ValueError:
+                pass
+
+    # cgroup v1
+    quota = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+    period = _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    try:
+        if quota and period and int(quota) > 0:
+            return int(quota) / int(period)
+    except ValueError:
+        pass
+    return None
+
+
+def detect_cpus() -> dict:
+    """CPU counts from every source, and the effective (lowest) one."""
+    count = os.cpu_count() or 1
+    try:
+        affinity: Optional[int] = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        affinity = None
+    quota = cgroup_cpu_quota()
+    effective = min(v for v in (count, affinity, quota) if v)
+    return {"cpuCount": count, "affinity": affinity, "cgroupQuota": quota, "effective": effective}
+
+
+# ── Budgets ───────────────────────────────────────────────
+
+class Budget:
+    """
+    Weighted semaphore: `capacity` units shared by jobs, each holding some
+    units until it releases them.  Tracks holders for the admin endpoint.
+    """
+
+    def __init__(self, name: str, capacity: int) -> None:
+        self.name = name
+        self.capacity = max(1, capacity)
+        self._cond = threading.Condition()
+        self._holders: dict[str, int] = {}
+        self._in_use = 0
+        self._waiting = 0
+
+    def acquire(self, job_id: str, units: int = 1) -> int:
+        """Block until `units` are free (capped at capacity); returns the units held."""
+        units = max(1, min(units, self.capacity))
+        with self._cond:
+            self._waiting += 1
+            try:
+                while self._in_use + units > self.capacity:
+                    self._cond.wait()
+            finally:
+                self._waiting -= 1
+            self._in_use += units
+            self._holders[job_id] = self._holders.get(job_id, 0) + units
+        return units
+
+    def release(self, job_id: str) -> None:
+        """Release everything `job_id` holds (no-op if nothing)."""
+        with self._cond:
+            units = self._holders.pop(job_id, 0)
+            if units:
+                self._in_use -= units
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "capacity": self.capacity,
+                "inUse": self._in_use,
+                "waiting": self._waiting,
+                "holders": dict(self._holders),
+            }
+
+
+class ResourceBudget:
+    """Per-download limits derived from the usable CPUs."""
+
+    def __init__(self) -> None:
+        self.cpus = detect_cpus()
+        effective = self.cpus["effective"]
+        # Leave a core for the API and ML work when there is more than one
+        usable = max(1, math.floor(effective) - 1) if effective >= 2 else 1
+
+        merge_slots = settings.DOWNLOAD_MERGE_SLOTS or max(1, usable // 2)
+        self.ffmpeg_threads = settings.FFMPEG_THREADS or max(1, usable // merge_slots)
+        self.merge = Budget("merge", merge_slots)
+        self.fetch = Budget("fetch", settings.DOWNLOAD_FETCH_CONNECTIONS or 4 * math.ceil(effective))
+        self.nice = settings.DOWNLOAD_NICE
+        self.ionice_class = settings.DOWNLOAD_IONICE_CLASS
+        self._local = threading.local()
+
+    def lower_thread_priority(self) -> None:
+        """
+        Apply DOWNLOAD_NICE / DOWNLOAD_IONICE_CLASS to the calling thread
+        (once).  Linux only: elsewhere the calls would affect the whole process.
+        """
+        if getattr(self._local, "lowered", False) or not sys.platform.startswith("linux"):
+            return
+        self._local.lowered = True
+        tid = threading.get_native_id()
+        try:
+            if self.nice > 0:
+                os.setpriority(os.PRIO_PROCESS, tid, os.getpriority(os.PRIO_PROCESS, tid) + self.nice)
+        except OSError as exc:
+            print(f"DEBUG: could not renice download thread: {exc}")
+        if self.ionice_class in (2, 3) and shutil.which("ionice"):
+            args = ["ionice", "-c", str(self.ionice_class), "-p", str(tid)]
+            if self.ionice_class == 2:
+                args[3:3] = ["-n", "7"]
+            result = subprocess.run(args, capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"DEBUG: could not ionice download thread: {result.stderr.strip()}")
+
+    def stats(self) -> dict:
+        return {
+            "cpus": self.cpus,
+            "ffmpegThreads": self.ffmpeg_threads,
+            "nice": self.nice,
+            "ioniceClass": self.ionice_class,
+            "merge": self.merge.stats(),
+            "fetch": self.fetch.stats(),
+        }
+
+
+# Singleton
+resource_budget = ResourceBudget()
@@ -0,0 +1,149 @@
+"""
+ffmpeg capability registry.
+
+Probes the ffmpeg binary once at startup (`ffmpeg -version` and
+`ffmpeg -encoders`) and re-probes in the background every
+FFMPEG_PROBE_INTERVAL seconds, so request handlers read a snapshot instead
+of spawning a process per request.  The snapshot records whether ffmpeg
+runs, its version and its encoders, which lets download argument building
+pick codec flags up front.
+"""
+
+import re
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from config import settings
+
+
+# Encoders reported on /api/health (the full set is kept for lookups)
+REPORTED_ENCODERS = (
+    "aac", "libfdk_aac", "libopus", "opus", "libvorbis", "libmp3lame",
+    "libx264", "libx265", "libvpx-vp9", "libaom-av1", "libsvtav1",
+)
+
+# AAC encoders in order of preference
+AAC_ENCODERS = ("libfdk_aac", "aac")
+
+_ENCODER_LINE = re.compile(r"^\s*([VAS][A-Z.]{5})\s+(\S+)")
+
+
+@dataclass(frozen=True)
+class FfmpegCapabilities:
+    available: bool = False
+    version: Optional[str] = None
+    encoders: frozenset[str] = field(default_factory=frozenset)
+    checked_at: float = 0.0
+
+    def has_encoder(self, name: str) -> bool:
+        return name in self.encoders
+
+    def aac_encoder(self) -> Optional[str]:
+        """Best AAC encoder this ffmpeg build has, if any."""
+        return next((e for e in AAC_ENCODERS if e in self.encoders), None)
+
+    def to_dict(self) -> dict:
+        return {
+            "available": self.available,
+            "version": self.version,
+            "encoders": [e for e in REPORTED_ENCODERS if e in self.encoders],
+            "checkedAt": self.checked_at,
+        }
+
+
+def probe_ffmpeg() -> FfmpegCapabilities:
+    """Run ffmpeg once to read its version and encoder list."""
+    try:
+        r = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-version"],
+            capture_output=True, text=True,
+            timeout=5,
+        )
+        if r.returncode != 0:
+            return FfmpegCapabilities(checked_at=time.time())
+        first_line = r.stdout.splitlines()[0] if r.stdout else ""
+        m = re.match(r"ffmpeg version (\S+)", first_line)
+        version = m.group(1) if m else None
+
+        return FfmpegCapabilities(True, version, frozenset(_probe_encoders()), time.time())
+    except Exception:
+        return FfmpegCapabilities(checked_at=time.time())
+
+
+def _probe_encoders() -> set[str]:
+    """
+    Names from `ffmpeg -encoders`.  If the listing fails, the native "aac"
+    encoder (built into every ffmpeg since 3.0) is assumed, so Opus audio
+    is still converted for MP4 instead of being muxed as-is.
+    """
+    try:
+        r = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"],
+            capture_output=True, text=True,
+            timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"DEBUG: ffmpeg -encoders failed: {e}; assuming aac")
+        return {"aac"}
+    encoders = set()
+    for line in r.stdout.splitlines():
+        m = _ENCODER_LINE.match(line)
+        # Skip the legend (" V..... = Video") that precedes the list
+        if m and m.group(2) != "=":
+            encoders.add(m.group(2))
+    if r.returncode != 0 or not encoders:
+        print(f"DEBUG: ffmpeg -encoders failed (exit {r.returncode}); assuming aac")
+        return {"aac"}
+    return encoders
+
+
+class CapabilityRegistry:
+    """Holds the latest probe result and refreshes it on a daemon thread."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._current: Optional[FfmpegCapabilities] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self) -> FfmpegCapabilities:
+        """Current snapshot; probes synchronously only if nothing has yet."""
+        current = self._current
+        if current is None:
+            with self._lock:
+                if self._current is None:
+                    self._current = probe_ffmpeg()
+                current = self._current
+        return current
+
+    def refresh(self) -> FfmpegCapabilities:
+        caps = probe_ffmpeg()
+        previous = self._current
+        self._current = caps
+        if previous is not None and (previous.available, previous.version) != (caps.available, caps.version):
+            print(f"DEBUG: ffmpeg changed: available={caps.available} version={caps.version}")
+        return caps
+
+    def start(self) -> None:
+        """Probe now and keep refreshing every `interval` seconds."""
+        self.refresh()
+        if self._thread is None and self.interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="ffmpeg-probe", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+
+# Singleton
+ffmpeg_capabilities = CapabilityRegistry(settings.FFMPEG_PROBE_INTERVAL)
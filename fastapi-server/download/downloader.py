@@ -1,32 +1,37 @@
 """
 Pure-Python yt-dlp wrapper for format listing and video downloading.
-Based on the user's tested CLI implementation — uses subprocess for
-maximum compatibility with any yt-dlp version.
+Based on the user's tested CLI implementation — arguments are built in CLI
+form and run by the backend selected in download/backends.py (in-process
+yt_dlp.YoutubeDL by default, `python -m yt_dlp` subprocess as a fallback).
 """
 
 import os
 import re
-import json
-import subprocess
-import sys
-import tempfile
+import shutil
 import time
-from typing import Optional, Callable
-
+from typing import Optional
+
+from download.backends import (
+    BASE_ARGS,
+    EVENT_CONVERT,
+    EVENT_DOWNLOAD,
+    EVENT_FIXUP,
+    EVENT_MERGE,
+    get_backend,
+)
+from config import settings
+from download.budget import resource_budget
+from download.capabilities import ffmpeg_capabilities
+from download.format_index import FormatIndex
 from download.job_store import job_store
-from download.schemas import FormatOption
+from download.media_cache import media_cache, media_key
+from download.merge import MergePlan, plan_merge, transcode_audio
+from download.metadata import metadata_cache
+from download.progress import selection_size
 
 
 # ── Constants ─────────────────────────────────────────────
 
-BASE_ARGS = [
-    "--no-playlist",
-    "--js-runtimes", "node,nodejs",
-    "--impersonate", "chrome",
-    "--extractor-args", "youtube:player-client=tvhtml5,android_vr,android_embedded,ios;player_skip=web,mweb",
-    "--add-header", "Accept-Language: en-US,en;q=0.5",
-]
-
 # Note: We removed the SABR_BLOCKED_FORMAT_IDS as modern yt-dlp versions 
 # handle AV1/VP9 better during merging and listing.
 
@@ -46,121 +51,50 @@ def _sanitize_ext(ext: str) -> Optional[str]:
     return normalized
 
 
-def _yt_dlp_cmd() -> list[str]:
-    """Return the yt-dlp command as a list — uses python -m yt_dlp for reliability."""
-    return [sys.executable, "-m", "yt_dlp"]
-
+def check_ffmpeg() -> bool:
+    """Check if ffmpeg is available (cached probe, see download/capabilities.py)."""
+    return ffmpeg_capabilities.get().available
 
-def _format_bitrate(bitrate: Optional[int]) -> Optional[str]:
-    if not bitrate:
-        return None
-    if bitrate >= 1_000_000:
-        return f"{bitrate / 1_000_000:.1f} Mbps"
-    if bitrate >= 1_000:
-        return f"{bitrate / 1_000:.0f} kbps"
-    return f"{bitrate} bps"
 
+# ── Metadata ──────────────────────────────────────────────
 
-def _extract_quality(resolution: Optional[str], note: Optional[str]) -> Optional[str]:
-    if resolution:
-        return resolution
-    if note:
-        m = re.search(r'(\d+p?)', note, re.IGNORECASE)
-        if m:
-            val = m.group(1)
-            return val.lower() if val.lower().endswith('p') else f"{val}p"
-    return None
+def get_video_info(url: str) -> dict:
+    """Info dict for a URL, shared with concurrent callers and cached per video."""
+    return metadata_cache.get_or_fetch(url, get_backend().extract_info)
 
 
-def check_ffmpeg() -> bool:
-    """Check if ffmpeg is available."""
-    try:
-        r = subprocess.run(
-            ["ffmpeg", "-version"],
-            capture_output=True, text=True,
-            timeout=5,
-        )
-        return r.returncode == 0
-    except Exception:
-        return False
+# ── Format Listing ────────────────────────────────────────
 
+def get_format_index(url: str, info: Optional[dict] = None) -> FormatIndex:
+    """Format index for a URL, built once per cached info dict."""
+    if info is None:
+        info = get_video_info(url)
+    return metadata_cache.derive(url, info, "format_index", FormatIndex)
 
-# ── Format Listing ────────────────────────────────────────
 
-def list_formats(url: str) -> dict:
+def list_formats(url: str,
+                 ext: Optional[str] = None,
+                 min_height: Optional[int] = None,
+                 max_height: Optional[int] = None,
+                 has_audio: Optional[bool] = None,
+                 sort: Optional[str] = None,
+                 order: str = "desc") -> dict:
     """
-    Fetch available formats for a video URL using `yt-dlp --dump-single-json`.
+    Fetch available formats for a video URL (cached `yt-dlp --dump-single-json`).
     Returns a dict matching the existing client API contract:
       {formats, availableOptions, ffmpegAvailable, canMerge}
+    plus bestPairings (the formats each quality tier downloads).  The
+    filters narrow `formats`; availableOptions always covers every format.
     """
-    args = _yt_dlp_cmd() + BASE_ARGS + [
-        "--dump-single-json", "--skip-download", "--quiet", url
-    ]
-
-    result = subprocess.run(args, capture_output=True, text=True, timeout=60)
-
-    if result.returncode != 0:
-        err_msg = result.stderr.strip() or "unknown error"
-        print(f"DEBUG: yt-dlp list_formats failed for {url}. Error: {err_msg}")
-        raise RuntimeError(f"yt-dlp failed: {err_msg}")
-
-    info = json.loads(result.stdout)
-    raw_formats = info.get("formats", [])
-
-    # Filter to video formats (has a video codec, not storyboards)
-    video_formats = [
-        f for f in raw_formats
-        if f.get("vcodec") and f["vcodec"] != "none" and f.get("ext")
-    ]
-
-    options: list[FormatOption] = []
-    for f in video_formats:
-        height = f.get("height")
-        resolution = f"{height}p" if height else None
-        quality = _extract_quality(resolution, f.get("format_note"))
-
-        # Compute bitrate in bps (yt-dlp reports tbr/vbr in kbps)
-        tbr = f.get("tbr")
-        vbr = f.get("vbr")
-        bitrate = int(tbr * 1000) if tbr else (int(vbr * 1000) if vbr else None)
-
-        has_audio = bool(f.get("acodec") and f["acodec"] != "none")
-
-        options.append(FormatOption(
-            format_id=f.get("format_id", ""),
-            ext=f.get("ext", ""),
-            resolution=resolution,
-            quality=quality,
-            bitrate=bitrate,
-            fps=f.get("fps"),
-            note=f.get("format_note"),
-            filesize=f.get("filesize") or f.get("filesize_approx"),
-            hasAudio=has_audio,
-        ))
-
-    # Build unique option lists for the client filter dropdowns
-    unique_exts = sorted(set(o.ext for o in options if o.ext))
-    unique_qualities = sorted(
-        set(o.quality for o in options if o.quality),
-        key=lambda q: int(q.replace('p', '') or '0'),
-        reverse=True,
-    )
-    unique_bitrates_raw = sorted(
-        set(o.bitrate for o in options if o.bitrate is not None),
-        reverse=True,
-    )
-    unique_bitrates = [b for b in (_format_bitrate(b) for b in unique_bitrates_raw) if b]
-
+    index = get_format_index(url)
     ffmpeg_available = check_ffmpeg()
 
     return {
         "status": "success",
-        "formats": [o.model_dump() for o in options],
-        "availableOptions": {
-            "formats": unique_exts,
-            "qualities": unique_qualities,
-            "bitrates": unique_bitrates,
-        },
+        "formats": index.query(ext, min_height, max_height, has_audio,
+                               sort, descending=order == "desc"),
+        "availableOptions": index.available_options,
+        "bestPairings": index.best_pairings(),
         "ffmpegAvailable": ffmpeg_available,
         "canMerge": ffmpeg_available,
     }
@@ -168,25 +102,21 @@ def list_formats(url: str) -> dict:
 
 # ── Download ──────────────────────────────────────────────
 
-def _build_download_args(
-    url: str,
-    output_path: str,
+def _format_selection(
     format_id: Optional[str] = None,
     quality: Optional[str] = None,
     ext: Optional[str] = None,
-    bitrate: Optional[str] = None,
     merge_ext: Optional[str] = None,
 ) -> list[str]:
-    """Build yt-dlp argument list for downloading."""
-    args: list[str] = list(BASE_ARGS)
-    args += ["-o", output_path]
-
+    """yt-dlp format selector and merge container arguments for a request."""
     if format_id:
-        args += ["-f", format_id]
+        args = ["-f", format_id]
         # Always specify merge format for proper container metadata
         if merge_ext:
             args += ["--merge-output-format", merge_ext]
-    elif quality:
+        return args
+
+    if quality:
         height = quality.replace("p", "")
         # Primary: Best AVC video + M4A audio (Fast & Compatible)
         # Secondary: Best available video at height + Best audio (Quality)
@@ -197,28 +127,73 @@ def _build_download_args(
             f"/best[height<={height}]"
             f"/best"
         )
-        args += ["-f", fmt_sel]
-        args += ["--merge-output-format", ext or "mp4"]
-    else:
-        # Safe default: best H.264 mp4 — avoids SABR-blocked AV1
-        args += [
-            "-f",
-            "bestvideo[ext=mp4][vcodec^=avc]+bestaudio[ext=m4a]"
-            "/bestvideo[ext=mp4]+bestaudio[ext=m4a]"
-            "/bestvideo+bestaudio"
-            "/best",
-        ]
-        args += ["--merge-output-format", "mp4"]
+        return ["-f", fmt_sel, "--merge-output-format", ext or "mp4"]
+
+    # Safe default: best H.264 mp4 — avoids SABR-blocked AV1
+    return [
+        "-f",
+        "bestvideo[ext=mp4][vcodec^=avc]+bestaudio[ext=m4a]"
+        "/bestvideo[ext=mp4]+bestaudio[ext=m4a]"
+        "/bestvideo+bestaudio"
+        "/best",
+        "--merge-output-format", "mp4",
+    ]
 
-    args.append("--newline")
-    
-    # ── Compatibility Fix: Force AAC audio for MP4 ────────────
+
+def _build_download_args(
+    output_path: str,
+    format_id: Optional[str] = None,
+    quality: Optional[str] = None,
+    ext: Optional[str] = None,
+    bitrate: Optional[str] = None,
+    merge_ext: Optional[str] = None,
+    merge: Optional[MergePlan] = None,
+) -> list[str]:
+    """
+    Build yt-dlp argument list for downloading.  The backend supplies the
+    source itself (the cached info dict), so no URL is appended.
+    """
+    # ── Compatibility Fix: AAC audio for MP4 ──────────────────
     # Many players (Windows Media Player, etc.) don't support Opus in MP4.
-    target_ext = merge_ext or ext or "mp4"
-    if target_ext.lower() == "mp4":
-        args += ["--postprocessor-args", "Merger:-c:a aac"]
-        
-    args.append(url)
+    # The merge plan stream-copies AAC and re-encodes anything else; without
+    # a plan (no format metadata) every MP4 merge is re-encoded.
+    if merge is None:
+        merge = plan_merge(None, None, merge_ext or ext or "mp4")
+    if merge.offload:
+        # yt-dlp copies into MKV; the transcode pool produces the MP4
+        merge_ext = "mkv"
+
+    args: list[str] = list(BASE_ARGS)
+    args += ["-o", output_path]
+    args += _format_selection(format_id, quality, ext, merge_ext)
+
+    args.append("--newline")
+    args += merge.merger_args()
+
+    return args
+
+
+def _transfer_args(info: dict, format_id: Optional[str]) -> list[str]:
+    """
+    Parallel transfer arguments for large downloads.  Sizes come from the
+    cached info dict; if the selection's size is unknown it is treated as
+    large.  Fragmented (DASH/HLS) formats use yt-dlp's concurrent fragment
+    downloads, plain HTTPS ones the external downloader if configured.
+    """
+    size = selection_size(info, format_id)
+    if size is not None and size < settings.DOWNLOAD_PARALLEL_MIN_BYTES:
+        return []
+
+    args: list[str] = []
+    fragments = min(settings.DOWNLOAD_CONCURRENT_FRAGMENTS, resource_budget.fetch.capacity)
+    if fragments > 1:
+        args += ["--concurrent-fragments", str(fragments)]
+
+    external = settings.DOWNLOAD_EXTERNAL_DOWNLOADER
+    if external and shutil.which(external):
+        args += ["--downloader", f"http:{external}"]
+        if settings.DOWNLOAD_EXTERNAL_DOWNLOADER_ARGS:
+            args += ["--downloader-args", f"{external}:{settings.DOWNLOAD_EXTERNAL_DOWNLOADER_ARGS}"]
     return args
 
 
@@ -228,24 +203,21 @@ def run_download(job_id: str, url: str,
                  quality: Optional[str] = None,
                  bitrate: Optional[str] = None) -> None:
     """
-    Execute yt-dlp download in the current thread (meant to be called
-    via asyncio.to_thread from the endpoint).  Updates job_store with
+    Execute yt-dlp download in the current thread (meant to be run by
+    the download scheduler's worker threads).  Updates job_store with
     real-time progress.
+
+    Identical requests share one file through the media cache: a cached
+    file completes the job at once, and a job matching a download already
+    in progress is completed or failed by that download's job.
     """
+    leader_key: Optional[str] = None
     try:
         job_store.update_job(job_id, status="processing",
                              stage="Fetching video info...", progress=5)
 
-        # ── Fetch video metadata ──────────────────────────
-        meta_args = _yt_dlp_cmd() + BASE_ARGS + [
-            "--dump-single-json", "--skip-download", "--quiet", url
-        ]
-        meta_result = subprocess.run(meta_args, capture_output=True,
-                                     text=True, timeout=60)
-        if meta_result.returncode != 0:
-            raise RuntimeError(f"yt-dlp metadata failed: {meta_result.stderr.strip()}")
-
-        info = json.loads(meta_result.stdout)
+        # ── Fetch video metadata (shared with /api/formats) ──
+        info = get_video_info(url)
         title = _sanitize_filename(info.get("title", "video"))
         raw_formats = info.get("formats", [])
 
@@ -260,87 +232,131 @@ def run_download(job_id: str, url: str,
                 matched.get("acodec") == "none" or
                 matched.get("audio_ext") == "none"
             )
-            # If video-only, use format_id+bestaudio so yt-dlp merges them
+            # If video-only, add the best audio so yt-dlp merges them
             if is_video_only:
-                format_id = f"{format_id}+bestaudio"
+                audio_id = get_format_index(url, info).best_audio_id
+                format_id = f"{format_id}+{audio_id or 'bestaudio'}"
                 ext = "mp4"  # merged output
         elif format_ext:
             ext = _sanitize_ext(format_ext) or "mp4"
 
+        # Resolve quality/default selector chains to the formats they'd pick,
+        # so equivalent requests share a media cache key.  The default chain
+        # always merges to mp4, so only mp4 requests can take its pairing.
+        if not format_id and (quality or ext == "mp4"):
+            pairing = get_format_index(url, info).pairing_for(quality)
+            if pairing:
+                format_id = pairing.selector
+
         job_store.update_job(job_id, stage="Selecting format...", progress=10)
 
+        # ── Reuse a cached or in-progress identical download ──
+        key = media_key(url, _format_selection(format_id, quality, format_ext, ext) + [ext])
+        role, entry = media_cache.claim(key, job_id)
+        if role == "hit":
+            job_store.update_job(
+                job_id,
+                status="completed",
+                progress=100,
+                stage="Ready for download",
+                file_path=entry.path,
+                filename=entry.filename,
+            )
+            return
+        if role == "attached":
+            # The leading job reports progress and the result to this one
+            job_store.update_job(job_id, stage="Waiting for identical download...")
+            return
+        leader_key = key
+
+        def update(**fields: object) -> None:
+            for jid in (job_id, *media_cache.followers(key)):
+                job_store.update_job(jid, **fields)
+
         # ── Build output path ─────────────────────────────
-        tmp_dir = tempfile.gettempdir()
-        output_path = os.path.join(tmp_dir, f"{title}_{int(time.time())}.{ext}")
+        output_path = os.path.join(
+            media_cache.directory, f"{title}_{int(time.time())}_{job_id[:8]}.{ext}"
+        )
 
         # ── Run yt-dlp download ───────────────────────────
-        dl_args = _yt_dlp_cmd() + _build_download_args(
-            url, output_path,
+        merge = plan_merge(info, format_id, ext)
+        dl_args = _build_download_args(
+            output_path,
             format_id=format_id,
             quality=quality,
             ext=format_ext,
             bitrate=bitrate,
             merge_ext=ext,
+            merge=merge,
         )
+        transfer_args = _transfer_args(info, format_id)
+        dl_args += transfer_args
 
-        job_store.update_job(job_id, stage="Starting download...", progress=15)
+        # Fragment connections come out of the shared fetch budget
+        connections = 1
+        if "--concurrent-fragments" in transfer_args:
+            connections = int(transfer_args[transfer_args.index("--concurrent-fragments") + 1])
+        resource_budget.fetch.acquire(job_id, connections)
 
-        process = subprocess.Popen(
-            dl_args,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
-        )
+        update(stage="Starting download...", progress=15)
 
         last_progress = 15
-
-        if process.stdout:
-            for line in process.stdout:
-                line = line.rstrip()
-                # Parse progress: [download]  12.3% of ...
-                match = re.search(r'\[download\]\s+(\d+\.?\d*)%', line)
-                if match:
-                    pct = float(match.group(1))
-                    # Map 0-100% download to 15-95% overall
-                    mapped = int(15 + pct * 0.80)
-                    if mapped > last_progress:
-                        last_progress = mapped
-                        job_store.update_job(
-                            job_id,
-                            stage=f"Downloading: {int(pct)}%",
-                            progress=min(95, mapped),
-                        )
-                elif "[Merger]" in line or "Merging formats" in line:
-                    job_store.update_job(
-                        job_id,
-                        stage="Finalizing & Merging Streams...",
-                        progress=97,
-                    )
-                elif "[Fixup" in line or "Fixing" in line:
-                    job_store.update_job(
-                        job_id,
-                        stage="Fixing container metadata...",
-                        progress=98,
-                    )
-                elif "[VideoConvertor]" in line:
-                    job_store.update_job(
-                        job_id,
-                        stage="Converting video format...",
-                        progress=99,
+        # Wall time of yt-dlp's merge: from the Merger starting to the
+        # next stage (or the end of the download).  The merge swaps the
+        # job's fetch budget for a merge slot; with the in-process backend
+        # the Merger waits here for a free slot.
+        merge_started: Optional[float] = None
+        merge_seconds = 0.0
+
+        def end_merge() -> None:
+            nonlocal merge_started, merge_seconds
+            if merge_started is not None:
+                merge_seconds += time.perf_counter() - merge_started
+                merge_started = None
+                resource_budget.merge.release(job_id)
+
+        def on_event(kind: str, pct: Optional[float]) -> None:
+            nonlocal last_progress, merge_started
+            if kind != EVENT_MERGE:
+                end_merge()
+            if kind == EVENT_DOWNLOAD:
+                # Map 0-100% download to 15-95% overall
+                mapped = int(15 + pct * 0.80)
+                if mapped > last_progress:
+                    last_progress = mapped
+                    update(
+                        stage=f"Downloading: {int(pct)}%",
+                        progress=min(95, mapped),
                     )
-
-        # Drain stderr (warnings etc.)
-        stderr_out = ""
-        if process.stderr:
-            stderr_out = process.stderr.read()
-
-        process.wait()
-
-        if process.returncode != 0:
-            raise RuntimeError(
-                f"yt-dlp exited with code {process.returncode}. {stderr_out[-500:]}"
-            )
+            elif kind == EVENT_MERGE:
+                if merge_started is None:
+                    resource_budget.fetch.release(job_id)
+                    resource_budget.merge.acquire(job_id)
+                    merge_started = time.perf_counter()
+                update(
+                    stage="Finalizing & Merging Streams...",
+                    progress=97,
+                )
+            elif kind == EVENT_FIXUP:
+                update(
+                    stage="Fixing container metadata...",
+                    progress=98,
+                )
+            elif kind == EVENT_CONVERT:
+                update(
+                    stage="Converting video format...",
+                    progress=99,
+                )
+
+        try:
+            get_backend().download(url, info, dl_args, on_event)
+        except RuntimeError:
+            # The cached signed URLs may have been rejected; refetch next time
+            metadata_cache.invalidate(url)
+            raise
+        merged = merge_started is not None or merge_seconds > 0
+        end_merge()
+        resource_budget.fetch.release(job_id)
 
         # Verify file exists (yt-dlp may have changed extension after merge)
         final_path = output_path
@@ -358,18 +374,52 @@ def run_download(job_id: str, url: str,
         if not os.path.exists(final_path):
             raise RuntimeError("Downloaded file not found after yt-dlp completed")
 
-        job_store.update_job(
-            job_id,
-            status="completed",
-            progress=100,
-            stage="Ready for download",
-            file_path=final_path,
-            filename=f"{title}.{ext}",
-        )
+        merge_fields: dict = {}
+        if merge.offload and final_path != output_path:
+            update(stage="Converting audio to AAC...", progress=98)
+            resource_budget.merge.acquire(job_id)
+            try:
+                run = transcode_audio(final_path, output_path, merge.encoder)
+            except Exception:
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                raise
+            finally:
+                resource_budget.merge.release(job_id)
+                os.remove(final_path)
+            final_path = output_path
+            ext = "mp4"
+            merged = True
+            merge_seconds += run.seconds
+            merge_fields["merge_cpu_seconds"] = round(run.cpu_seconds, 3)
+        if merged:
+            merge_fields.update(merge_mode=merge.mode, merge_seconds=round(merge_seconds, 3))
+
+        filename = f"{title}.{ext}"
+        followers = media_cache.complete(key, final_path, filename)
+        leader_key = None
+        for jid in (job_id, *followers):
+            job_store.update_job(
+                jid,
+                status="completed",
+                progress=100,
+                stage="Ready for download",
+                file_path=final_path,
+                filename=filename,
+                **merge_fields,
+            )
 
     except Exception as exc:
-        job_store.update_job(
-            job_id,
-            status="failed",
-            error=str(exc),
-        )
+        failed = [job_id]
+        if leader_key is not None:
+            failed += media_cache.fail(leader_key)
+        for jid in failed:
+            job_store.update_job(
+                jid,
+                status="failed",
+                error=str(exc),
+            )
+    finally:
+        resource_budget.fetch.release(job_id)
+        resource_budget.merge.release(job_id)
+
@@ -0,0 +1,100 @@
+"""
+Push channel for download progress.
+
+Replaces polling /api/download/status/{job_id}: a subscriber registers a
+job store listener, which hands each change to the event loop through
+call_soon_threadsafe (updates come from download worker threads).  Changes
+that pile up between sends are merged, only fields whose value differs from
+what the client last saw are sent, and the stream ends once the job
+completes, fails or is deleted (expiry, a rejected submit, shutdown).  With a shared (SQLite/Redis) job store the job is
+also re-read every SHARED_POLL_INTERVAL, since another worker process may
+be running the download.
+"""
+
+import asyncio
+from typing import AsyncIterator, Optional
+
+from download.job_store import job_store
+
+
+PUBLISHED_FIELDS = ("status", "progress", "stage", "error")
+TERMINAL_STATUSES = ("completed", "failed")
+
+# Seconds without changes before a keep-alive is sent
+HEARTBEAT_INTERVAL = 15.0
+# Re-read interval when the job store is shared between processes
+SHARED_POLL_INTERVAL = 1.0
+
+
+async def job_events(job_id: str) -> AsyncIterator[Optional[dict]]:
+    """
+    Yield the job's public fields, then only the fields that changed.
+
+    The first item is the full snapshot; None marks a heartbeat.  Yields
+    nothing if the job doesn't exist.
+    """
+    loop = asyncio.get_running_loop()
+    # None from the job store means the job was deleted
+    queue: asyncio.Queue[Optional[dict]] = asyncio.Queue()
+
+    def listener(changes: Optional[dict]) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, changes)
+        except RuntimeError:
+            pass  # event loop already closed
+
+    # Registration takes the job's write lock and, with a shared backend,
+    # reads the job from SQLite/Redis, so it runs in a thread
+    snapshot = await asyncio.to_thread(job_store.add_listener, job_id, listener)
+    if snapshot is None:
+        return
+
+    try:
+        sent = {k: snapshot[k] for k in PUBLISHED_FIELDS}
+        yield {"id": job_id, **sent}
+        if sent["status"] in TERMINAL_STATUSES:
+            return
+
+        # With a shared job store the download may run in another worker
+        # process, whose updates only show up by re-reading the job
+        shared = job_store.backend.shared
+        timeout = SHARED_POLL_INTERVAL if shared else HEARTBEAT_INTERVAL
+        idle = 0.0
+
+        while True:
+            try:
+                changes = await asyncio.wait_for(queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                if not shared:
+                    yield None
+                    continue
+                job = await asyncio.to_thread(job_store.get_job, job_id)
+                if job is None:
+                    return
+                changes = {k: getattr(job, k) for k in PUBLISHED_FIELDS}
+            deleted = changes is None
+            changes = changes or {}
+            while not queue.empty():
+                more = queue.get_nowait()
+                if more is None:
+                    deleted = True
+                else:
+                    changes.update(more)
+
+            delta = {
+                k: changes[k] for k in PUBLISHED_FIELDS
+                if k in changes and changes[k] != sent[k]
+            }
+            if delta:
+                sent.update(delta)
+                idle = 0.0
+                yield delta
+            elif shared:
+                idle += timeout
+                if idle >= HEARTBEAT_INTERVAL:
+                    idle = 0.0
+                    yield None
+            if deleted or sent["status"] in TERMINAL_STATUSES:
+                return
+    finally:
+        await asyncio.to_thread(job_store.remove_listener, job_id, listener)
@@ -0,0 +1,247 @@
+"""
+Per-video format index.
+
+Built once from a yt-dlp info dict and cached alongside it in the metadata
+cache, so /api/formats doesn't rebuild and re-sort the option lists on
+every call.  It holds:
+
+  - the FormatOption list and the client's dropdown values
+  - server-side filtering and sorting of the options
+  - the concrete format pairing yt-dlp's selector chains would pick for
+    each quality tier (and for the default download), so downloads can
+    pass known format IDs instead of re-evaluating the fallback chain
+
+yt-dlp sorts `formats` from worst to best, and `bestvideo`/`bestaudio`/
+`best` pick the last format passing their filters; the pairings below
+follow the same rule.
+"""
+
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from download.schemas import FormatOption
+
+
+def _format_bitrate(bitrate: Optional[int]) -> Optional[str]:
+    if not bitrate:
+        return None
+    if bitrate >= 1_000_000:
+        return f"{bitrate / 1_000_000:.1f} Mbps"
+    if bitrate >= 1_000:
+        return f"{bitrate / 1_000:.0f} kbps"
+    return f"{bitrate} bps"
+
+
+def _extract_quality(resolution: Optional[str], note: Optional[str]) -> Optional[str]:
+    if resolution:
+        return resolution
+    if note:
+        m = re.search(r'(\d+p?)', note, re.IGNORECASE)
+        if m:
+            val = m.group(1)
+            return val.lower() if val.lower().endswith('p') else f"{val}p"
+    return None
+
+
+# ── Pairings ──────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class Pairing:
+    """Formats a selector chain resolves to: video+audio, or one muxed format."""
+    video_id: str
+    audio_id: Optional[str]
+    height: Optional[int]
+    ext: str                           # of the video format
+
+    @property
+    def selector(self) -> str:
+        return f"{self.video_id}+{self.audio_id}" if self.audio_id else self.video_id
+
+    def to_dict(self) -> dict:
+        return {
+            "formatId": self.selector,
+            "videoFormatId": self.video_id,
+            "audioFormatId": self.audio_id,
+            "height": self.height,
+            "ext": self.ext,
+        }
+
+
+def _video_only(f: dict) -> bool:
+    return f.get("vcodec") not in (None, "none") and f.get("acodec") == "none"
+
+
+def _audio_only(f: dict) -> bool:
+    return f.get("acodec") not in (None, "none") and f.get("vcodec") == "none"
+
+
+def _muxed(f: dict) -> bool:
+    return f.get("vcodec") != "none" and f.get("acodec") != "none"
+
+
+def _last(formats: list[dict], test: Callable[[dict], bool]) -> Optional[dict]:
+    return next((f for f in reversed(formats) if test(f)), None)
+
+
+def _pair(video: Optional[dict], audio: Optional[dict]) -> Optional[Pairing]:
+    if video is None or audio is None:
+        return None
+    return Pairing(video["format_id"], audio["format_id"], video.get("height"), video.get("ext") or "")
+
+
+def _single(f: Optional[dict]) -> Optional[Pairing]:
+    if f is None:
+        return None
+    return Pairing(f["format_id"], None, f.get("height"), f.get("ext") or "")
+
+
+def _under(height: int) -> Callable[[dict], bool]:
+    # A missing height fails the filter, as in yt-dlp's [height<=N]
+    return lambda f: f.get("height") is not None and f["height"] <= height
+
+
+def _quality_pairing(formats: list[dict], height: int) -> Optional[Pairing]:
+    """Mirror of the quality selector chain in downloader._format_selection."""
+    under = _under(height)
+    m4a = _last(formats, lambda f: _audio_only(f) and f.get("ext") == "m4a")
+    audio = _last(formats, _audio_only)
+    return (
+        _pair(_last(formats, lambda f: _video_only(f) and under(f)
+                    and (f.get("vcodec") or "").startswith("avc")), m4a)
+        or _pair(_last(formats, lambda f: _video_only(f) and under(f)), audio)
+        or _single(_last(formats, lambda f: _muxed(f) and under(f)))
+    )
+
+
+def _default_pairing(formats: list[dict]) -> Optional[Pairing]:
+    """Mirror of the default selector chain in downloader._format_selection."""
+    m4a = _last(formats, lambda f: _audio_only(f) and f.get("ext") == "m4a")
+    audio = _last(formats, _audio_only)
+    mp4 = lambda f: _video_only(f) and f.get("ext") == "mp4"
+    return (
+        _pair(_last(formats, lambda f: mp4(f) and (f.get("vcodec") or "").startswith("avc")), m4a)
+        or _pair(_last(formats, mp4), m4a)
+        or _pair(_last(formats, _video_only), audio)
+        or _single(_last(formats, _muxed))
+    )
+
+
+# ── Index ─────────────────────────────────────────────────
+
+class FormatIndex:
+    """Read-only view of a video's formats; safe to share between threads."""
+
+    def __init__(self, info: dict) -> None:
+        raw_formats = info.get("formats", [])
+
+        # Filter to video formats (has a video codec, not storyboards)
+        video_formats = [
+            f for f in raw_formats
+            if f.get("vcodec") and f["vcodec"] != "none" and f.get("ext")
+        ]
+
+        options: list[dict] = []
+        heights: list[Optional[int]] = []
+        for f in video_formats:
+            height = f.get("height")
+            resolution = f"{height}p" if height else None
+            quality = _extract_quality(resolution, f.get("format_note"))
+
+            # Compute bitrate in bps (yt-dlp reports tbr/vbr in kbps)
+            tbr = f.get("tbr")
+            vbr = f.get("vbr")
+            bitrate = int(tbr * 1000) if tbr else (int(vbr * 1000) if vbr else None)
+
+            has_audio = bool(f.get("acodec") and f["acodec"] != "none")
+
+            options.append(FormatOption(
+                format_id=f.get("format_id", ""),
+                ext=f.get("ext", ""),
+                resolution=resolution,
+                quality=quality,
+                bitrate=bitrate,
+                fps=f.get("fps"),
+                note=f.get("format_note"),
+                filesize=f.get("filesize") or f.get("filesize_approx"),
+                hasAudio=has_audio,
+            ).model_dump())
+            heights.append(height)
+
+        self.options = options
+        self._heights = heights
+
+        # Unique option lists for the client filter dropdowns
+        unique_qualities = sorted(
+            set(o["quality"] for o in options if o["quality"]),
+            key=lambda q: int(q.replace('p', '') or '0'),
+            reverse=True,
+        )
+        unique_bitrates_raw = sorted(
+            set(o["bitrate"] for o in options if o["bitrate"] is not None),
+            reverse=True,
+        )
+        self.available_options = {
+            "formats": sorted(set(o["ext"] for o in options if o["ext"])),
+            "qualities": unique_qualities,
+            "bitrates": [b for b in (_format_bitrate(b) for b in unique_bitrates_raw) if b],
+        }
+
+        # Best pairing per quality tier, plus the default download's
+        self._tiers = sorted({h for h in heights if h})
+        self.pairings: dict[int, Optional[Pairing]] = {
+            h: _quality_pairing(raw_formats, h) for h in self._tiers
+        }
+        self.default_pairing = _default_pairing(raw_formats)
+        best_audio = _last(raw_formats, _audio_only)
+        self.best_audio_id: Optional[str] = best_audio["format_id"] if best_audio else None
+
+    def pairing_for(self, quality: Optional[str]) -> Optional[Pairing]:
+        """Pairing the download selector would choose for `quality` (None = default)."""
+        if not quality:
+            return self.default_pairing
+        height = quality.replace("p", "")
+        if not height.isdigit():
+            return None
+        # [height<=N] sees the same formats as the highest tier at or below N;
+        # below every tier the chain ends at plain "best", left to yt-dlp
+        i = bisect_right(self._tiers, int(height))
+        return self.pairings[self._tiers[i - 1]] if i else None
+
+    def best_pairings(self) -> dict[str, dict]:
+        """Pairings by quality tier (highest first) and for the default download."""
+        result = {
+            f"{h}p": self.pairings[h].to_dict()
+            for h in reversed(self._tiers) if self.pairings[h]
+        }
+        if self.default_pairing:
+            result["default"] = self.default_pairing.to_dict()
+        return result
+
+    def query(self,
+              ext: Optional[str] = None,
+              min_height: Optional[int] = None,
+              max_height: Optional[int] = None,
+              has_audio: Optional[bool] = None,
+              sort: Optional[str] = None,
+              descending: bool = True) -> list[dict]:
+        """
+        Filter and sort the options.  Options without the sort field go
+        last; without `sort` the original (worst to best) order is kept.
+        """
+        ext = ext.lower() if ext else None
+        selected = [
+            (o, h) for o, h in zip(self.options, self._heights)
+            if (ext is None or o["ext"] == ext)
+            and (has_audio is None or o["hasAudio"] == has_audio)
+            and (min_height is None or (h is not None and h >= min_height))
+            and (max_height is None or (h is not None and h <= max_height))
+        ]
+        if sort:
+            value = (lambda item: item[1]) if sort == "height" else (lambda item: item[0][sort])
+            present = [item for item in selected if value(item) is not None]
+            missing = [item for item in selected if value(item) is None]
+            present.sort(key=value, reverse=descending)
+            selected = present + missing
+        return [o for o, _ in selected]
@@ -0,0 +1,283 @@
+"""
+Storage backends for DownloadJobStore.
+
+  - MemoryJobBackend: process-local dict (default; single worker only)
+  - SQLiteJobBackend: one SQLite file in WAL mode, shared by every worker
+    process on the host
+  - RedisJobBackend: hashes in Redis (or anything speaking RESP), shared
+    across hosts; jobs expire through Redis TTLs
+
+DownloadJob lives here so the backends can build it (import it from
+download.job_store as before).  Backends store its fields and nothing
+else — listeners and expiry stay in the job store.  `get` always returns
+a snapshot: the memory backend replaces a job's record on update instead
+of mutating it, so readers never see a half-applied update.
+"""
+
+import json
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass, field, fields, replace
+from typing import Optional
+from urllib.parse import urlparse
+
+
+@dataclass(slots=True)
+class DownloadJob:
+    id: str
+    status: str = "pending"           # pending | processing | completed | failed
+    progress: int = 0
+    stage: str = "Initializing..."
+    file_path: Optional[str] = None
+    filename: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    merge_mode: Optional[str] = None          # copy | transcode, once merged
+    merge_seconds: Optional[float] = None
+    merge_cpu_seconds: Optional[float] = None  # only for transcode pool runs
+
+
+JOB_FIELDS = tuple(f.name for f in fields(DownloadJob))
+
+
+class JobBackend:
+    """Interface shared by the job store backends."""
+
+    # True when other processes see the same jobs
+    shared = False
+
+    def insert(self, job: DownloadJob) -> None:
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Optional[DownloadJob]:
+        raise NotImplementedError
+
+    def update(self, job_id: str, changes: dict) -> None:
+        raise NotImplementedError
+
+    def delete(self, job_id: str) -> None:
+        raise NotImplementedError
+
+    def purge(self, created_before: float) -> list[str]:
+        """Delete jobs created before the timestamp; returns their IDs."""
+        raise NotImplementedError
+
+
+# ── Memory ────────────────────────────────────────────────
+
+class MemoryJobBackend(JobBackend):
+    def __init__(self) -> None:
+        self._jobs: dict[str, DownloadJob] = {}
+
+    def insert(self, job: DownloadJob) -> None:
+        self._jobs[job.id] = job
+
+    def get(self, job_id: str) -> Optional[DownloadJob]:
+        return self._jobs.get(job_id)
+
+    def update(self, job_id: str, changes: dict) -> None:
+        job = self._jobs.get(job_id)
+        if job:
+            # Copy-on-write: a single dict store publishes the new record
+            self._jobs[job_id] = replace(job, **changes)
+
+    def delete(self, job_id: str) -> None:
+        self._jobs.pop(job_id, None)
+
+    def purge(self, created_before: float) -> list[str]:
+        stale = [jid for jid, j in list(self._jobs.items()) if j.created_at < created_before]
+        for jid in stale:
+            del self._jobs[jid]
+        return stale
+
+
+# ── SQLite (WAL) ──────────────────────────────────────────
+
+class SQLiteJobBackend(JobBackend):
+    shared = True
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS download_jobs ("
+            " id TEXT PRIMARY KEY, status TEXT, progress INTEGER, stage TEXT,"
+            " file_path TEXT, filename TEXT, error TEXT, created_at REAL,"
+            " merge_mode TEXT, merge_seconds REAL, merge_cpu_seconds REAL)"
+        )
+        # Files created before a field was added get its column
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(download_jobs)")}
+        for name in JOB_FIELDS:
+            if name not in columns:
+                conn.execute(f"ALTER TABLE download_jobs ADD COLUMN {name}")
+        conn.execute("CREATE INDEX IF NOT EXISTS download_jobs_created ON download_jobs (created_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; autocommit, WAL for concurrent readers."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def insert(self, job: DownloadJob) -> None:
+        row = asdict(job)
+        self._conn().execute(
+            f"INSERT OR REPLACE INTO download_jobs ({', '.join(JOB_FIELDS)})"
+            f" VALUES ({', '.join('?' for _ in JOB_FIELDS)})",
+            [row[k] for k in JOB_FIELDS],
+        )
+
+    def get(self, job_id: str) -> Optional[DownloadJob]:
+        row = self._conn().execute(
+            f"SELECT {', '.join(JOB_FIELDS)} FROM download_jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return DownloadJob(**dict(zip(JOB_FIELDS, row))) if row else None
+
+    def update(self, job_id: str, changes: dict) -> None:
+        keys = [k for k in changes if k in JOB_FIELDS and k != "id"]
+        if not keys:
+            return
+        self._conn().execute(
+            f"UPDATE download_jobs SET {', '.join(f'{k} = ?' for k in keys)} WHERE id = ?",
+            [changes[k] for k in keys] + [job_id],
+        )
+
+    def delete(self, job_id: str) -> None:
+        self._conn().execute("DELETE FROM download_jobs WHERE id = ?", (job_id,))
+
+    def purge(self, created_before: float) -> list[str]:
+        conn = self._conn()
+        rows = conn.execute(
+            "DELETE FROM download_jobs WHERE created_at < ? RETURNING id", (created_before,)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+
+# ── Redis protocol ────────────────────────────────────────
+
+class RespError(Exception):
+    """Error reply from a RESP server."""
+
+
+class _RespConnection:
+    """Minimal RESP2 client: enough for the hash commands used below."""
+
+    def __init__(self, host: str, port: int, password: Optional[str], db: int) -> None:
+        self._sock = socket.create_connection((host, port), timeout=5.0)
+        self._file = self._sock.makefile("rb")
+        if password:
+            self.call("AUTH", password)
+        if db:
+            self.call("SELECT", str(db))
+
+    def call(self, *args: str):
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg.encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._sock.sendall(b"".join(parts))
+        return self._read()
+
+    def _read(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("RESP server closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            if size < 0:
+                return None
+            data = self._file.read(size + 2)
+            return data[:-2].decode("utf-8")
+        if kind == b"*":
+            count = int(rest)
+            return None if count < 0 else [self._read() for _ in range(count)]
+        raise RespError(f"Unexpected RESP reply: {line!r}")
+
+
+class RedisJobBackend(JobBackend):
+    """Jobs as Redis hashes (`<prefix><id>`), one JSON value per field."""
+
+    shared = True
+
+    def __init__(self, url: str, ttl: float, prefix: str = "yt-stats:job:") -> None:
+        parsed = urlparse(url)
+        self._address = (
+            parsed.hostname or "localhost",
+            parsed.port or 6379,
+            parsed.password,
+            int(parsed.path.lstrip("/") or 0),
+        )
+        self.ttl = int(ttl)
+        self.prefix = prefix
+        self._local = threading.local()
+
+    def _call(self, *args: str):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _RespConnection(*self._address)
+            self._local.conn = conn
+        try:
+            return conn.call(*args)
+        except (OSError, ConnectionError):
+            # Reconnect once, e.g. after the server closed an idle connection
+            self._local.conn = _RespConnection(*self._address)
+            return self._local.conn.call(*args)
+
+    def _key(self, job_id: str) -> str:
+        return self.prefix + job_id
+
+    def insert(self, job: DownloadJob) -> None:
+        key = self._key(job.id)
+        args: list[str] = []
+        for k, v in asdict(job).items():
+            args += [k, json.dumps(v)]
+        self._call("HSET", key, *args)
+        self._call("EXPIRE", key, str(self.ttl))
+
+    def get(self, job_id: str) -> Optional[DownloadJob]:
+        flat = self._call("HGETALL", self._key(job_id))
+        if not flat:
+            return None
+        row = {flat[i]: json.loads(flat[i + 1]) for i in range(0, len(flat), 2)}
+        return DownloadJob(**{k: row[k] for k in JOB_FIELDS if k in row})
+
+    def update(self, job_id: str, changes: dict) -> None:
+        key = self._key(job_id)
+        # Don't resurrect a job that expired or was deleted
+        if not self._call("EXISTS", key):
+            return
+        args: list[str] = []
+        for k, v in changes.items():
+            if k in JOB_FIELDS and k != "id":
+                args += [k, json.dumps(v)]
+        if args:
+            self._call("HSET", key, *args)
+
+    def delete(self, job_id: str) -> None:
+        self._call("DEL", self._key(job_id))
+
+    def purge(self, created_before: float) -> list[str]:
+        return []  # Redis expires the hashes itself
+
+
+def create_backend(kind: str, sqlite_path: str, redis_url: str, ttl: float) -> JobBackend:
+    if kind == "sqlite":
+        return SQLiteJobBackend(sqlite_path)
+    if kind == "redis":
+        return RedisJobBackend(redis_url, ttl)
+    if kind != "memory":
+        print(f"DEBUG: unknown JOB_STORE_BACKEND {kind!r}; using memory")
+    return MemoryJobBackend()
@@ -1,76 +1,192 @@
 """
-In-memory download job store.
+Download job store.
 Port of the TS progressStore.ts — tracks background download jobs.
+
+Jobs are kept by a pluggable backend (download/job_backends.py): in memory
+by default, or in SQLite / Redis when several worker processes must see
+the same jobs (JOB_STORE_BACKEND).
+
+Reads take no lock (backends return snapshots).  Writes to a job are
+serialised by one of LOCK_STRIPES locks chosen by job ID, so progress
+updates for different jobs don't contend.  Jobs expire TTL seconds after
+creation through a min-heap of deadlines served by one thread, and expiry
+hooks let owners of per-job files clean them up.
+
+Listeners registered per job are called with the fields that actually
+changed on each update (see download/events.py for the SSE side), and
+with None once the job is deleted or expires.  They only see updates made
+in this process.
 """
 
+import heapq
 import uuid
 import time
 import threading
-from typing import Optional
-from dataclasses import dataclass, field
+from typing import Callable, Optional
+from dataclasses import fields
+
+from config import settings
+from download.job_backends import DownloadJob, JobBackend, MemoryJobBackend, create_backend
 
 
-@dataclass
-class DownloadJob:
-    id: str
-    status: str = "pending"           # pending | processing | completed | failed
-    progress: int = 0
-    stage: str = "Initializing..."
-    file_path: Optional[str] = None
-    filename: Optional[str] = None
-    error: Optional[str] = None
-    created_at: float = field(default_factory=time.time)
+JobListener = Callable[[Optional[dict]], None]
+ExpiryHook = Callable[[str], None]
 
 
 class DownloadJobStore:
-    """Thread-safe in-memory job store with periodic cleanup."""
+    """Thread-safe job store with heap-driven expiry."""
 
     TTL = 30 * 60  # 30 minutes
-
-    def __init__(self) -> None:
-        self._jobs: dict[str, DownloadJob] = {}
-        self._lock = threading.Lock()
-
-        # Background cleanup every 5 minutes
-        self._timer = threading.Timer(5 * 60, self._cleanup_loop)
-        self._timer.daemon = True
-        self._timer.start()
+    LOCK_STRIPES = 64
+    # Shared backends also hold jobs created by other processes, which
+    # aren't in this process's heap; those are purged on this interval
+    PURGE_INTERVAL = 5 * 60
+
+    def __init__(self, backend: Optional[JobBackend] = None) -> None:
+        self.backend = backend or MemoryJobBackend()
+        self._listeners: dict[str, list[JobListener]] = {}
+        self._stripes = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        self._expiry: list[tuple[float, str]] = []   # (deadline, job ID)
+        self._expiry_hooks: list[ExpiryHook] = []
+        self._wakeup = threading.Condition()
+
+        self._expiry_thread = threading.Thread(
+            target=self._expiry_loop, name="job-expiry", daemon=True
+        )
+        self._expiry_thread.start()
+
+    def _lock(self, job_id: str) -> threading.Lock:
+        return self._stripes[hash(job_id) % self.LOCK_STRIPES]
 
     # ──────────────────────────────────────────────────────
 
     def create_job(self) -> str:
         job_id = str(uuid.uuid4())
-        with self._lock:
-            self._jobs[job_id] = DownloadJob(id=job_id)
+        job = DownloadJob(id=job_id)
+        self.backend.insert(job)
+        with self._wakeup:
+            heapq.heappush(self._expiry, (job.created_at + self.TTL, job_id))
+            if self._expiry[0][1] == job_id:
+                self._wakeup.notify()
         return job_id
 
     def update_job(self, job_id: str, **updates: object) -> None:
-        with self._lock:
-            job = self._jobs.get(job_id)
+        changed: dict = {}
+        with self._lock(job_id):
+            job = self.backend.get(job_id)
             if job:
                 for key, value in updates.items():
-                    if hasattr(job, key):
-                        setattr(job, key, value)
+                    if hasattr(job, key) and getattr(job, key) != value:
+                        changed[key] = value
+                if changed:
+                    self.backend.update(job_id, changed)
+            listeners = list(self._listeners.get(job_id, ())) if changed else ()
+
+        # Notify outside the lock so slow listeners can't stall the job's writers
+        for listener in listeners:
+            listener(changed)
 
     def get_job(self, job_id: str) -> Optional[DownloadJob]:
-        with self._lock:
-            return self._jobs.get(job_id)
+        return self.backend.get(job_id)
+
+    def delete_job(self, job_id: str) -> None:
+        # The heap entry stays and is skipped when it comes due
+        with self._lock(job_id):
+            self.backend.delete(job_id)
+            listeners = self._listeners.pop(job_id, ())
+        self._notify_deleted(listeners)
+
+    def add_listener(self, job_id: str, listener: JobListener) -> Optional[dict]:
+        """
+        Call `listener(changes)` after every update to the job, and
+        `listener(None)` when it is deleted or expires.  Returns a
+        snapshot of the job taken atomically with the registration, or None
+        if the job doesn't exist.
+        """
+        with self._lock(job_id):
+            job = self.backend.get(job_id)
+            if job is None:
+                return None
+            self._listeners.setdefault(job_id, []).append(listener)
+            return {f.name: getattr(job, f.name) for f in fields(job)}
+
+    def remove_listener(self, job_id: str, listener: JobListener) -> None:
+        with self._lock(job_id):
+            listeners = self._listeners.get(job_id)
+            if listeners and listener in listeners:
+                listeners.remove(listener)
+                if not listeners:
+                    del self._listeners[job_id]
+
+    def add_expiry_hook(self, hook: ExpiryHook) -> None:
+        """Call `hook(job_id)` after a job expires (from the expiry thread)."""
+        self._expiry_hooks.append(hook)
 
     # ──────────────────────────────────────────────────────
 
-    def _cleanup_loop(self) -> None:
-        self._cleanup()
-        self._timer = threading.Timer(5 * 60, self._cleanup_loop)
-        self._timer.daemon = True
-        self._timer.start()
-
-    def _cleanup(self) -> None:
+    def _expiry_loop(self) -> None:
+        next_purge = time.time() + self.PURGE_INTERVAL
+        while True:
+            with self._wakeup:
+                deadline = self._expiry[0][0] if self._expiry else float("inf")
+                if self.backend.shared:
+                    deadline = min(deadline, next_purge)
+                timeout = deadline - time.time()
+                if timeout > 0:
+                    self._wakeup.wait(min(timeout, self.PURGE_INTERVAL))
+                    continue
+            self._expire_due()
+            if self.backend.shared and time.time() >= next_purge:
+                self._purge_shared()
+                next_purge = time.time() + self.PURGE_INTERVAL
+
+    def _expire_due(self) -> None:
+        """Remove every job whose deadline has passed: O(log n) per job."""
         now = time.time()
-        with self._lock:
-            stale = [jid for jid, j in self._jobs.items() if now - j.created_at > self.TTL]
-            for jid in stale:
-                del self._jobs[jid]
+        expired: list[str] = []
+        with self._wakeup:
+            while self._expiry and self._expiry[0][0] <= now:
+                expired.append(heapq.heappop(self._expiry)[1])
+        for job_id in expired:
+            self._expire(job_id)
+
+    def _purge_shared(self) -> None:
+        try:
+            stale = self.backend.purge(time.time() - self.TTL)
+        except Exception as e:
+            print(f"DEBUG: job store purge failed: {e}")
+            return
+        for job_id in stale:
+            self._expire(job_id, deleted=True)
+
+    def _expire(self, job_id: str, deleted: bool = False) -> None:
+        with self._lock(job_id):
+            if not deleted:
+                try:
+                    self.backend.delete(job_id)
+                except Exception as e:
+                    print(f"DEBUG: failed to expire job {job_id}: {e}")
+            listeners = self._listeners.pop(job_id, ())
+        self._notify_deleted(listeners)
+        for hook in self._expiry_hooks:
+            try:
+                hook(job_id)
+            except Exception as e:
+                print(f"DEBUG: expiry hook failed for job {job_id}: {e}")
+
+    @staticmethod
+    def _notify_deleted(listeners: list[JobListener]) -> None:
+        for listener in listeners:
+            try:
+                listener(None)
+            except Exception as e:
+                print(f"DEBUG: job listener failed: {e}")
 
 
 # Singleton
-job_store = DownloadJobStore()
+job_store = DownloadJobStore(create_backend(
+    settings.JOB_STORE_BACKEND,
+    sqlite_path=settings.JOB_STORE_SQLITE_PATH,
+    redis_url=settings.JOB_STORE_REDIS_URL,
+    ttl=DownloadJobStore.TTL,
+))
@@ -0,0 +1,255 @@
+"""
+Deduplicated on-disk cache of downloaded media.
+
+Files are keyed by (canonical video ID, resolved format selector, merge
+container), so identical requests share one file:
+
+  - a finished entry completes new jobs immediately (no yt-dlp run)
+  - a job arriving while the same download is in progress attaches to it
+    and receives the leader's progress and result
+  - files are reference counted while /api/download/file serves them and
+    evicted least-recently-used once MEDIA_CACHE_MAX_BYTES is exceeded
+
+An entry that hasn't been served yet is kept for the job TTL so its
+client can still fetch it, and a served one for MEDIA_SERVE_GRACE seconds
+after its last request so dropped transfers can resume with Range
+requests; both make the byte budget a soft limit.  Eviction runs after
+each completed download and served request, and every EVICT_INTERVAL
+seconds, so files whose hold or grace period ran out are reclaimed even
+when nothing else is happening.
+When a job expires, partial or leftover files its download wrote (named
+with the job ID prefix) are removed unless they back a cache entry.
+Files live in MEDIA_CACHE_DIR, a directory owned by the cache.  The index
+is per process and isn't persisted, so on startup files older than any
+live job could reference are removed.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from config import settings
+from download.job_store import DownloadJobStore, job_store
+from download.metadata import cache_key
+
+
+def media_key(url: str, selection: list[str]) -> str:
+    """Cache key for a video URL and its yt-dlp format selection arguments."""
+    return "\x1f".join([cache_key(url), *selection])
+
+
+@dataclass
+class MediaEntry:
+    path: str
+    filename: str
+    size: int
+    created_at: float
+    refs: int = 0
+    served_at: Optional[float] = None
+
+
+class MediaCache:
+    """Thread-safe LRU of downloaded files with in-flight de-duplication."""
+
+    # Seconds between background eviction passes
+    EVICT_INTERVAL = 60
+
+    def __init__(self, directory: str, max_bytes: int,
+                 hold_unserved: float, serve_grace: float) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hold_unserved = hold_unserved
+        self.serve_grace = serve_grace
+        self._entries: OrderedDict[str, MediaEntry] = OrderedDict()
+        self._by_path: dict[str, str] = {}
+        self._inflight: dict[str, list[str]] = {}   # key -> follower job IDs
+        self._leaders: dict[str, str] = {}          # key -> downloading job ID
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.attached = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+        # Other worker processes may share the directory, so only remove
+        # files too old for any live job to reference
+        cutoff = time.time() - hold_unserved - serve_grace
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+            except OSError:
+                pass
+
+        threading.Thread(target=self._evict_loop, name="media-cache-evict", daemon=True).start()
+
+    # ── Jobs ──────────────────────────────────────────────
+
+    def claim(self, key: str, job_id: str) -> tuple[str, Optional[MediaEntry]]:
+        """
+        Decide how `job_id` gets its file:
+          ("hit", entry)     — already cached
+          ("attached", None) — identical download in progress; the leader
+                               will report to this job
+          ("leader", None)   — this job downloads; call complete() or fail()
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and os.path.exists(entry.path):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return "hit", entry
+            if entry is not None:
+                self._drop(key)
+
+            followers = self._inflight.get(key)
+            if followers is not None:
+                followers.append(job_id)
+                self.attached += 1
+                return "attached", None
+
+            self._inflight[key] = []
+            self._leaders[key] = job_id
+            self.misses += 1
+            return "leader", None
+
+    def followers(self, key: str) -> list[str]:
+        with self._lock:
+            return list(self._inflight.get(key, ()))
+
+    def complete(self, key: str, path: str, filename: str) -> list[str]:
+        """Store the leader's file; returns the follower job IDs to notify."""
+        size = os.path.getsize(path)
+        with self._lock:
+            followers = self._inflight.pop(key, [])
+            self._leaders.pop(key, None)
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = MediaEntry(path, filename, size, time.time())
+            self._by_path[path] = key
+            self._bytes += size
+            self._evict()
+        return followers
+
+    def fail(self, key: str) -> list[str]:
+        """Forget a failed download; returns the follower job IDs to notify."""
+        with self._lock:
+            self._leaders.pop(key, None)
+            return self._inflight.pop(key, [])
+
+    def discard_job_files(self, job_id: str) -> None:
+        """
+        Job store expiry hook: remove files an expired job's download left
+        behind (.part files, unmerged streams, outputs of failed runs).
+        Output names end in `_<first 8 chars of job ID>`, see run_download.
+        """
+        marker = f"_{job_id[:8]}."
+        with self._lock:
+            if job_id in self._leaders.values():
+                return  # still downloading
+            owned = set(self._by_path)
+        # Files touched recently may belong to another worker's download
+        recent = time.time() - 60
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if marker not in name or path in owned:
+                continue
+            try:
+                if os.path.getmtime(path) < recent:
+                    os.unlink(path)
+            except OSError:
+                pass
+
+    # ── Serving ───────────────────────────────────────────
+
+    def acquire(self, path: str) -> bool:
+        """Pin a cached file while it's being served; False if it's gone."""
+        with self._lock:
+            key = self._by_path.get(path)
+            if key is None or not os.path.exists(path):
+                return False
+            entry = self._entries[key]
+            entry.refs += 1
+            entry.served_at = time.time()
+            self._entries.move_to_end(key)
+            return True
+
+    def release(self, path: str) -> None:
+        with self._lock:
+            key = self._by_path.get(path)
+            if key is not None:
+                entry = self._entries[key]
+                entry.refs -= 1
+                entry.served_at = time.time()
+                self._evict()
+
+    def evict(self) -> None:
+        """Reclaim unpinned files past their hold/grace period while over budget."""
+        with self._lock:
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "attached": self.attached,
+                "misses": self.misses,
+            }
+
+    # ── Internals ─────────────────────────────────────────
+
+    def _evict_loop(self) -> None:
+        while True:
+            time.sleep(self.EVICT_INTERVAL)
+            try:
+                self.evict()
+            except Exception as e:
+                print(f"DEBUG: media cache eviction failed: {e}")
+
+    # ── Caller holds the lock ─────────────────────────────
+
+    def _evict(self) -> None:
+        """Drop least-recently-used files that aren't pinned until under budget."""
+        if self._bytes <= self.max_bytes:
+            return
+        now = time.time()
+        for key in list(self._entries):
+            if self._bytes <= self.max_bytes:
+                break
+            entry = self._entries[key]
+            if entry.refs > 0:
+                continue
+            if entry.served_at is None:
+                if now - entry.created_at < self.hold_unserved:
+                    continue
+            elif now - entry.served_at < self.serve_grace:
+                continue
+            self._drop(key)
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._by_path.pop(entry.path, None)
+        self._bytes -= entry.size
+        try:
+            os.unlink(entry.path)
+        except OSError:
+            pass
+
+
+# Singleton
+media_cache = MediaCache(
+    directory=settings.MEDIA_CACHE_DIR or os.path.join(tempfile.gettempdir(), "yt-media-cache"),
+    max_bytes=settings.MEDIA_CACHE_MAX_BYTES,
+    hold_unserved=DownloadJobStore.TTL,
+    serve_grace=settings.MEDIA_SERVE_GRACE,
+)
+job_store.add_expiry_hook(media_cache.discard_job_files)
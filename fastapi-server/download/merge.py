@@ -0,0 +1,178 @@
+"""
+Merge planning and the ffmpeg transcode pool.
+
+A video+audio download is merged by ffmpeg (through yt-dlp's Merger).
+Stream copy is enough when the audio already suits the container; only
+non-AAC audio (Opus, Vorbis) in an MP4 needs re-encoding, since many
+players can't play it.  plan_merge decides this from the `acodec` of the
+selected formats in the cached info dict.  Selectors that aren't concrete
+format IDs (fallback chains) can't be planned, so they keep the
+conservative AAC re-encode.
+
+With FFMPEG_TRANSCODE_WORKERS > 0 a transcode doesn't run inside yt-dlp:
+yt-dlp stream-copies into MKV and the audio is then re-encoded by
+`ffmpeg_pool`, which bounds how many encodes run at once and measures
+each one's wall and CPU time.  Every ffmpeg run is capped at the
+resource budget's `-threads`.
+"""
+
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from config import settings
+from download.budget import resource_budget
+from download.capabilities import ffmpeg_capabilities
+
+
+# Audio codecs stored in MP4 without re-encoding
+MP4_AUDIO_CODECS = ("mp4a", "aac")
+
+
+# ── Planning ──────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class MergePlan:
+    mode: Optional[str]                # "copy" | "transcode" | None (nothing to merge)
+    encoder: Optional[str] = None      # AAC encoder when transcoding
+    offload: bool = False              # transcode in ffmpeg_pool after a copy merge
+
+    def merger_args(self) -> list[str]:
+        """
+        yt-dlp arguments for its ffmpeg runs (stream copy is the Merger's
+        default).  yt-dlp appends the generic "ffmpeg:" args to the
+        Merger-specific ones, so the thread cap is only given once.
+        """
+        args = ["--postprocessor-args", f"ffmpeg:-threads {resource_budget.ffmpeg_threads}"]
+        if self.mode == "transcode" and not self.offload:
+            args += ["--postprocessor-args", f"Merger:-c:a {self.encoder}"]
+        return args
+
+
+def _selected_formats(info: dict, selector: Optional[str]) -> Optional[list[dict]]:
+    """Formats a concrete selector like "137+140" names, or None."""
+    if not selector or "/" in selector:
+        return None
+    by_id = {f.get("format_id"): f for f in info.get("formats", [])}
+    selected = [by_id.get(part) for part in selector.split("+")]
+    return None if None in selected else selected
+
+
+def plan_merge(info: Optional[dict], selector: Optional[str], target_ext: str) -> MergePlan:
+    """How the formats picked by `selector` are merged into `target_ext`."""
+    encoder = ffmpeg_capabilities.get().aac_encoder()
+    selected = _selected_formats(info, selector) if info else None
+
+    if selected is not None and len(selected) < 2:
+        return MergePlan(None)
+    if target_ext.lower() != "mp4" or not encoder:
+        # Without an AAC encoder the audio is left as-is rather than fail
+        return MergePlan("copy")
+    if selected is None:
+        return MergePlan("transcode", encoder)
+
+    audio = [f for f in selected if f.get("acodec") not in (None, "none")]
+    if audio and all((f.get("acodec") or "").startswith(MP4_AUDIO_CODECS) for f in audio):
+        return MergePlan("copy")
+    return MergePlan("transcode", encoder, offload=settings.FFMPEG_TRANSCODE_WORKERS > 0)
+
+
+# ── Transcode pool ────────────────────────────────────────
+
+@dataclass(frozen=True)
+class FfmpegRun:
+    seconds: float           # wall time, excluding the wait for a slot
+    cpu_seconds: float       # user + system time of the ffmpeg process
+    waited: float            # seconds spent waiting for a slot
+
+
+class FfmpegPool:
+    """Runs ffmpeg commands with at most `size` at once, measuring each."""
+
+    def __init__(self, size: int) -> None:
+        self.size = max(1, size)
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.cpu_seconds = 0.0
+
+    def run(self, cmd: list[str]) -> FfmpegRun:
+        """Run `cmd` in the calling thread once a slot is free; raises on failure."""
+        queued = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+        self._slots.acquire()
+        with self._lock:
+            self.waiting -= 1
+            self.running += 1
+        try:
+            start = time.perf_counter()
+            returncode, stderr_tail, cpu = _run_measured(cmd)
+            elapsed = time.perf_counter() - start
+        finally:
+            self._slots.release()
+            with self._lock:
+                self.running -= 1
+
+        with self._lock:
+            self.cpu_seconds += cpu
+            if returncode == 0:
+                self.completed += 1
+            else:
+                self.failed += 1
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with code {returncode}. {stderr_tail}")
+        return FfmpegRun(elapsed, cpu, start - queued)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "running": self.running,
+                "waiting": self.waiting,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cpuSeconds": round(self.cpu_seconds, 3),
+            }
+
+
+def _run_measured(cmd: list[str]) -> tuple[int, str, float]:
+    """Run a process to completion; returns (exit code, stderr tail, CPU seconds)."""
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.DEVNULL, stderr=stderr)
+        try:
+            # wait4 reports this child's own resource usage
+            _, status, usage = os.wait4(process.pid, 0)
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        process.returncode = os.waitstatus_to_exitcode(status)
+        stderr.seek(0)
+        tail = stderr.read().decode("utf-8", "replace")[-500:]
+    return process.returncode, tail, usage.ru_utime + usage.ru_stime
+
+
+def transcode_audio(source: str, target: str, encoder: str) -> FfmpegRun:
+    """Copy the video of `source` into MP4 `target`, re-encoding its audio."""
+    return ffmpeg_pool.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", source,
+        "-map", "0:v", "-map", "0:a",
+        "-c:v", "copy", "-c:a", encoder,
+        "-threads", str(resource_budget.ffmpeg_threads),
+        "-movflags", "+faststart",
+        target,
+    ])
+
+
+# Singleton
+ffmpeg_pool = FfmpegPool(settings.FFMPEG_TRANSCODE_WORKERS)
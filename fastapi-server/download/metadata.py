@@ -0,0 +1,188 @@
+"""
+Video metadata cache for yt-dlp info dicts.
+
+A normal user flow hits the same URL twice — /api/formats, then a
+download — and each used to start its own `--dump-single-json` process.
+Info dicts are cached per canonical video ID until shortly before their
+signed googlevideo URLs expire, and concurrent requests for the same video
+share one in-flight fetch (single-flight).  Values derived from an info
+dict (e.g. the format index) are cached on its entry and expire with it.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlparse
+
+from config import settings
+
+
+# ── Canonical IDs ─────────────────────────────────────────
+
+_YOUTUBE_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_PATH_ID_RE = re.compile(r"^/(?:shorts|embed|live|v)/([A-Za-z0-9_-]{11})")
+
+
+def canonical_video_id(url: str) -> Optional[str]:
+    """Extract the 11-character YouTube video ID from the usual URL shapes."""
+    try:
+        parsed = urlparse(url.strip())
+    except ValueError:
+        return None
+    host = (parsed.hostname or "").lower()
+
+    if host.endswith("youtu.be"):
+        candidate = parsed.path.lstrip("/").split("/")[0]
+        return candidate if _YOUTUBE_ID_RE.match(candidate) else None
+
+    if host.endswith("youtube.com") or host.endswith("youtube-nocookie.com"):
+        v = parse_qs(parsed.query).get("v", [""])[0]
+        if _YOUTUBE_ID_RE.match(v):
+            return v
+        m = _PATH_ID_RE.match(parsed.path)
+        if m:
+            return m.group(1)
+
+    return None
+
+
+def cache_key(url: str) -> str:
+    video_id = canonical_video_id(url)
+    return f"youtube:{video_id}" if video_id else f"url:{url.strip()}"
+
+
+# ── Expiry ────────────────────────────────────────────────
+
+def _signed_url_expiry(info: dict) -> Optional[float]:
+    """Earliest `expire=` timestamp across the info dict's format URLs."""
+    earliest: Optional[float] = None
+    for f in info.get("formats", []):
+        url = f.get("url")
+        if not url:
+            continue
+        expire = parse_qs(urlparse(url).query).get("expire")
+        if not expire:
+            m = re.search(r"/expire/(\d+)", url)
+            expire = [m.group(1)] if m else None
+        if expire:
+            try:
+                ts = float(expire[0])
+            except ValueError:
+                continue
+            earliest = ts if earliest is None else min(earliest, ts)
+    return earliest
+
+
+def _expires_at(info: dict, now: float) -> float:
+    """Cache deadline: METADATA_CACHE_TTL, cut short by signed-URL expiry."""
+    deadline = now + settings.METADATA_CACHE_TTL
+    signed = _signed_url_expiry(info)
+    if signed is not None:
+        deadline = min(deadline, signed - settings.METADATA_EXPIRY_MARGIN)
+    return deadline
+
+
+# ── Cache ─────────────────────────────────────────────────
+
+class MetadataCache:
+    """Thread-safe LRU of info dicts with single-flight fetching."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        # key -> (expires_at, info, derived values by name)
+        self._entries: OrderedDict[str, tuple[float, dict, dict]] = OrderedDict()
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_fetch(self, url: str, fetch: Callable[[str], dict]) -> dict:
+        """
+        Return the cached info dict for `url`, or run `fetch(url)` once for
+        all concurrent callers.  The returned dict is shared: don't mutate it.
+        """
+        key = cache_key(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            info = fetch(url)
+        except BaseException as exc:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(exc)
+            raise
+
+        now = time.time()
+        with self._lock:
+            del self._inflight[key]
+            expires_at = _expires_at(info, now)
+            if expires_at > now and self.max_entries > 0:
+                self._entries[key] = (expires_at, info, {})
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        future.set_result(info)
+        return info
+
+    def derive(self, url: str, info: dict,
+               name: str, build: Callable[[dict], object]) -> object:
+        """
+        `build(info)`, kept on `info`'s cache entry so it is computed once
+        per entry (uncached dicts are built every time).  Concurrent first
+        calls may both build; the values are equivalent.
+        """
+        key = cache_key(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            derived = entry[2] if entry is not None and entry[1] is info else None
+            if derived is not None and name in derived:
+                return derived[name]
+
+        value = build(info)
+        if derived is not None:
+            with self._lock:
+                derived.setdefault(name, value)
+                value = derived[name]
+        return value
+
+    def invalidate(self, url: str) -> None:
+        with self._lock:
+            self._entries.pop(cache_key(url), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
+
+
+# Singleton
+metadata_cache = MetadataCache(max_entries=settings.METADATA_CACHE_SIZE)
+
@@ -0,0 +1,115 @@
+"""
+Overall progress for one yt-dlp download.
+
+A merged download fetches its formats one after another (video, then
+audio), each reporting 0-100%.  Parallel transfers add more line shapes
+to the CLI output:
+
+  [download] Destination: /cache/title_1700000000_ab12cd34.f137.mp4
+  [download]  12.3% of ~  80.00MiB at    5.10MiB/s ETA 00:14 (frag 9/74)
+  [download]   5.00MiB at    1.00MiB/s (00:00:05) (frag 9/74)
+  [download] 100% of   80.00MiB in 00:00:15 at 5.20MiB/s
+  [#2089b0 9.6MiB/80MiB(12%) CN:8 DL:5.1MiB ETA:13s]        (aria2c readout)
+
+DownloadProgress folds these (or the in-process progress hook's values)
+into one 0-100 figure across all files, weighting each file by the
+expected size of its format from the cached metadata.
+"""
+
+import re
+from typing import Optional
+
+
+_DESTINATION_RE = re.compile(r'\[download\] Destination: (.+)$')
+_ALREADY_RE = re.compile(r'\[download\] (.+) has already been downloaded')
+_PERCENT_RE = re.compile(r'\[download\]\s+(\d+\.?\d*)%')
+_FRAGMENT_RE = re.compile(r'\(frag (\d+)/(\d+)\)')
+_ARIA2C_RE = re.compile(r'\[#\w+ [^\]]*?\((\d+)%\)')
+
+
+# ── Expected sizes ────────────────────────────────────────
+
+def _format_size(info: dict, f: dict) -> Optional[float]:
+    size = f.get("filesize") or f.get("filesize_approx")
+    if not size and f.get("tbr") and info.get("duration"):
+        # tbr is in kbit/s
+        size = f["tbr"] * 125 * info["duration"]
+    return size or None
+
+
+def expected_sizes(info: dict, selector: Optional[str]) -> list[Optional[float]]:
+    """
+    Expected bytes of each file a selector downloads, in download order.
+    Only its first alternative is considered; parts that aren't concrete
+    format IDs (e.g. "bestaudio") or have no size data give None.
+    """
+    if not selector:
+        return [None]
+    by_id = {f.get("format_id"): f for f in info.get("formats", [])}
+    sizes = []
+    for part in selector.split("/")[0].split("+"):
+        f = by_id.get(part)
+        sizes.append(_format_size(info, f) if f else None)
+    return sizes
+
+
+def selection_size(info: dict, selector: Optional[str]) -> Optional[float]:
+    """Total expected bytes for a selector, or None if any part is unknown."""
+    sizes = expected_sizes(info, selector)
+    return None if None in sizes else sum(sizes)
+
+
+# ── Aggregation ───────────────────────────────────────────
+
+class DownloadProgress:
+    """Overall percentage across the files of one download."""
+
+    def __init__(self, sizes: Optional[list[Optional[float]]] = None) -> None:
+        sizes = sizes or [None]
+        known = [s for s in sizes if s]
+        fill = sum(known) / len(known) if known else 1.0
+        self._weights = [s or fill for s in sizes]
+        self._files: list[str] = []
+        self._current = 0.0
+
+    def start_file(self, name: str) -> None:
+        if name not in self._files:
+            self._files.append(name)
+            self._current = 0.0
+
+    def update(self, pct: float, name: Optional[str] = None) -> float:
+        """Record `pct` for the current (or named) file; returns the overall %."""
+        if name is not None:
+            self.start_file(name)
+        # Concurrent fragments can report slightly out of order
+        self._current = max(self._current, min(100.0, pct))
+        return self.overall()
+
+    def overall(self) -> float:
+        count = max(len(self._files), 1)
+        weights = self._weights
+        if count > len(weights):
+            # More files than expected (e.g. a fallback selector): spread evenly
+            weights = weights + [sum(weights) / len(weights)] * (count - len(weights))
+        done = sum(weights[:count - 1]) + weights[count - 1] * self._current / 100
+        return 100.0 * done / sum(weights)
+
+    def feed(self, line: str) -> Optional[float]:
+        """Parse one CLI output line; returns the overall % if it reported progress."""
+        m = _DESTINATION_RE.search(line)
+        if m:
+            self.start_file(m.group(1).strip())
+            return None
+        m = _ALREADY_RE.search(line)
+        if m:
+            return self.update(100.0, m.group(1).strip())
+        m = _PERCENT_RE.search(line)
+        if m:
+            return self.update(float(m.group(1)))
+        m = _FRAGMENT_RE.search(line) if line.startswith("[download]") else None
+        if m and int(m.group(2)):
+            return self.update(100.0 * int(m.group(1)) / int(m.group(2)))
+        m = _ARIA2C_RE.search(line)
+        if m:
+            return self.update(float(m.group(1)))
+        return None
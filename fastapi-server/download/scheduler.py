@@ -0,0 +1,168 @@
+"""
+Bounded download scheduler.
+
+Downloads used to go straight to the event loop's default thread pool, so a
+burst started as many yt-dlp/ffmpeg runs as there were threads and starved
+everything else sharing that pool.  The scheduler owns DOWNLOAD_CONCURRENCY
+worker threads fed from a priority queue (FIFO within a priority) of at
+most DOWNLOAD_QUEUE_SIZE waiting jobs.  Waiting jobs see their queue
+position in `DownloadJob.stage`, written only when it changes and outside
+the queue lock (a shared job store write is file or network I/O); a full
+queue rejects new jobs with a Retry-After estimate.  Worker threads run at
+the lower CPU/IO priority from download/budget.py, which their child
+processes inherit.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from typing import Callable
+
+from config import settings
+from download.budget import resource_budget
+from download.job_store import job_store
+
+
+class QueueFullError(Exception):
+    """Raised by submit() when DOWNLOAD_QUEUE_SIZE jobs are already waiting."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Download queue is full")
+        self.retry_after = retry_after
+
+
+class DownloadScheduler:
+    """Fixed pool of download threads with a bounded priority queue."""
+
+    # Assumed job duration until a download has finished
+    DEFAULT_DURATION = 30.0
+
+    def __init__(self, max_concurrent: int, max_queue: int) -> None:
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self._queue: list[tuple[int, int, str, Callable, tuple]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = 0
+        self._avg_duration = self.DEFAULT_DURATION
+        self._stopped = False
+        # Last position written to each waiting job's stage
+        self._published: dict[str, int] = {}
+        self._publish_lock = threading.Lock()
+
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"download-{i}", daemon=True)
+            for i in range(self.max_concurrent)
+        ]
+        for t in self._workers:
+            t.start()
+
+    # ──────────────────────────────────────────────────────
+
+    def submit(self, job_id: str, fn: Callable, *args: object, priority: int = 0) -> int:
+        """
+        Queue `fn(*args)` for `job_id`; higher priorities run first.
+        Returns the job's queue position (0 when it starts immediately).
+        """
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                raise QueueFullError(self._retry_after())
+            heapq.heappush(self._queue, (-priority, next(self._seq), job_id, fn, args))
+            self._cond.notify()
+        self._publish_positions()
+        with self._cond:
+            return self._position(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Drop `job_id` from the queue; False if it isn't waiting (started or unknown)."""
+        with self._cond:
+            kept = [entry for entry in self._queue if entry[2] != job_id]
+            if len(kept) == len(self._queue):
+                return False
+            self._queue = kept
+            heapq.heapify(self._queue)
+        self._publish_positions()
+        return True
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "running": self._running,
+                "queued": len(self._queue),
+                "maxConcurrent": self.max_concurrent,
+                "maxQueue": self.max_queue,
+                "avgDuration": round(self._avg_duration, 1),
+            }
+
+    def shutdown(self) -> None:
+        """Stop the workers after their current job; queued jobs are dropped."""
+        with self._cond:
+            self._stopped = True
+            dropped = [entry[2] for entry in self._queue]
+            self._queue.clear()
+            self._cond.notify_all()
+        for job_id in dropped:
+            job_store.update_job(job_id, status="failed", error="Server shutting down")
+
+    # ── Internals ─────────────────────────────────────────
+
+    def _worker(self) -> None:
+        resource_budget.lower_thread_priority()
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                _, _, job_id, fn, args = heapq.heappop(self._queue)
+                self._running += 1
+            self._publish_positions()
+
+            start = time.monotonic()
+            try:
+                fn(*args)
+            except Exception as exc:
+                job_store.update_job(job_id, status="failed", error=str(exc))
+            finally:
+                elapsed = time.monotonic() - start
+                with self._cond:
+                    self._running -= 1
+                    # Exponential moving average of job duration
+                    self._avg_duration += 0.2 * (elapsed - self._avg_duration)
+
+    def _position(self, job_id: str) -> int:
+        """1-based queue position of `job_id`, or 0 if it has already started."""
+        for i, entry in enumerate(sorted(self._queue), 1):
+            if entry[2] == job_id:
+                return i
+        return 0
+
+    def _publish_positions(self) -> None:
+        """
+        Write the queue position into the stage of every waiting job whose
+        position changed.  Called without `_cond` held; `_publish_lock`
+        keeps an older snapshot from being written over a newer one.
+        """
+        with self._publish_lock:
+            with self._cond:
+                positions = {entry[2]: i for i, entry in enumerate(sorted(self._queue), 1)}
+                changed = [
+                    (job_id, i) for job_id, i in positions.items()
+                    if self._published.get(job_id) != i
+                ]
+                self._published = positions
+            for job_id, i in changed:
+                job_store.update_job(job_id, stage=f"Queued (position {i})...")
+
+    def _retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up."""
+        return max(1, math.ceil(self._avg_duration / self.max_concurrent))
+
+
+# Singleton
+download_scheduler = DownloadScheduler(
+    max_concurrent=settings.DOWNLOAD_CONCURRENCY,
+    max_queue=settings.DOWNLOAD_QUEUE_SIZE,
+)
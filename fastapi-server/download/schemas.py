@@ -3,14 +3,21 @@ Pydantic models for download & format endpoints.
 Matches the existing client-side TypeScript interfaces exactly.
 """
 
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
 
 
 # ── Requests ──────────────────────────────────────────────
 
 class FormatRequest(BaseModel):
     url: str
+    # Optional server-side filters for the returned `formats` list
+    ext: Optional[str] = None          # e.g. "mp4"
+    min_height: Optional[int] = None
+    max_height: Optional[int] = None   # e.g. 1080
+    has_audio: Optional[bool] = None
+    sort: Optional[Literal["bitrate", "height", "filesize", "fps"]] = None
+    order: Literal["asc", "desc"] = "desc"
 
 
 class DownloadRequest(BaseModel):
@@ -19,6 +26,9 @@ class DownloadRequest(BaseModel):
     format_id: Optional[str] = None    # yt-dlp format ID e.g. "137"
     quality: Optional[str] = None      # resolution string e.g. "1080p"
     bitrate: Optional[str] = None      # e.g. "1.2 Mbps" or "809 kbps"
+    # Higher runs first when queued; bounded so a client can't jump the
+    # queue with an arbitrarily large value
+    priority: int = Field(0, ge=0, le=10)
 
 
 # ── Format listing response models ───────────────────────
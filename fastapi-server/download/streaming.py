@@ -0,0 +1,288 @@
+"""
+Streaming downloads: media bytes go to the HTTP response as they are
+produced instead of through a temp file.
+
+  - single formats that already carry audio are piped by yt-dlp (`-o -`)
+  - video-only formats are merged by ffmpeg from the two media URLs into
+    fragmented MP4 (or WebM) on stdout
+
+Anything else (DASH/HLS fragments, conversions, no ffmpeg) returns no plan
+and the caller falls back to the temp-file download.  Streams run as
+download scheduler jobs, so they count against DOWNLOAD_CONCURRENCY, and
+report progress through the job store like regular downloads.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import subprocess
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+from download.backends import BASE_ARGS, _yt_dlp_cmd
+from download.budget import resource_budget
+from download.capabilities import ffmpeg_capabilities
+from download.downloader import _sanitize_filename
+from download.job_store import job_store
+
+
+CHUNK_SIZE = 256 * 1024
+BUFFER_CHUNKS = 16
+
+_STREAMABLE_PROTOCOLS = ("http", "https")
+
+
+# ── Planning ──────────────────────────────────────────────
+
+@dataclass
+class StreamPlan:
+    filename: str
+    ext: str
+    total_size: Optional[int] = None
+    format_id: Optional[str] = None     # single format piped by yt-dlp
+    video: Optional[dict] = None        # or: two formats merged by ffmpeg
+    audio: Optional[dict] = None
+    audio_codec: str = "copy"           # ffmpeg -c:a for the merge
+
+
+def _streamable(f: dict) -> bool:
+    return bool(f.get("url")) and f.get("protocol") in _STREAMABLE_PROTOCOLS
+
+
+def _is_video_only(f: dict) -> bool:
+    # Same test as run_download: unknown codecs count as present
+    return f.get("acodec") == "none" or f.get("audio_ext") == "none"
+
+
+def _is_audio_only(f: dict) -> bool:
+    return f.get("vcodec") == "none" and not _is_video_only(f)
+
+
+def _size(f: dict) -> Optional[int]:
+    return f.get("filesize") or f.get("filesize_approx")
+
+
+def _best_audio(formats: list[dict], ext: str) -> Optional[dict]:
+    candidates = [f for f in formats if _streamable(f) and _is_audio_only(f)]
+    if not candidates:
+        return None
+    # Prefer the container's native audio (m4a for mp4, webm for webm)
+    return max(candidates, key=lambda f: (f.get("ext") == ext, f.get("abr") or f.get("tbr") or 0))
+
+
+def plan_stream(info: dict,
+                format_id: Optional[str] = None,
+                quality: Optional[str] = None,
+                format_ext: Optional[str] = None) -> Optional[StreamPlan]:
+    """
+    Decide how a download request can be streamed, mirroring run_download's
+    format choice.  Returns None when it has to go through a temp file.
+    """
+    formats = info.get("formats", [])
+    title = _sanitize_filename(info.get("title", "video"))
+
+    if format_id:
+        video = next((f for f in formats if f.get("format_id") == format_id), None)
+        if not video or not _streamable(video):
+            return None
+        if not _is_video_only(video):
+            ext = (video.get("ext") or "mp4").lower()
+            return StreamPlan(filename=f"{title}.{ext}", ext=ext,
+                              total_size=_size(video), format_id=format_id)
+    else:
+        if format_ext and format_ext.lower() != "mp4":
+            return None
+        # Same first choice as the default/quality selectors: H.264 video
+        height = (quality or "").lower().rstrip("p")
+        max_height = int(height) if height.isdigit() else None
+        candidates = [
+            f for f in formats
+            if _streamable(f) and _is_video_only(f)
+            and f.get("ext") == "mp4" and (f.get("vcodec") or "").startswith("avc")
+            and (max_height is None or (f.get("height") or 0) <= max_height)
+        ]
+        if not candidates:
+            return None
+        video = max(candidates, key=lambda f: (f.get("height") or 0, f.get("tbr") or 0))
+
+    ext = (video.get("ext") or "").lower()
+    if ext not in ("mp4", "webm"):
+        return None
+    audio = _best_audio(formats, "m4a" if ext == "mp4" else "webm")
+    if audio is None or (ext == "webm" and audio.get("ext") != "webm"):
+        return None
+    caps = ffmpeg_capabilities.get()
+    if not caps.available:
+        return None
+    # Players choke on Opus in MP4, so only AAC is copied as-is; the encoder
+    # is fixed here so a re-probe can't change it before the merge starts
+    audio_codec = "copy"
+    if ext == "mp4" and not (audio.get("acodec") or "").startswith("mp4a"):
+        audio_codec = caps.aac_encoder()
+        if not audio_codec:
+            return None
+
+    sizes = [_size(video), _size(audio)]
+    return StreamPlan(
+        filename=f"{title}.{ext}",
+        ext=ext,
+        total_size=sum(sizes) if all(sizes) else None,
+        video=video,
+        audio=audio,
+        audio_codec=audio_codec,
+    )
+
+
+def _ffmpeg_merge_cmd(plan: StreamPlan) -> list[str]:
+    args = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+    for f in (plan.video, plan.audio):
+        headers = f.get("http_headers") or {}
+        if headers:
+            args += ["-headers", "".join(f"{k}: {v}\r\n" for k, v in headers.items())]
+        args += ["-i", f["url"]]
+    args += ["-map", "0:v:0", "-map", "1:a:0", "-c:v", "copy", "-c:a", plan.audio_codec,
+             "-threads", str(resource_budget.ffmpeg_threads)]
+
+    if plan.ext == "mp4":
+        # Fragmented MP4 needs no seekable output (moov up front, then fragments)
+        args += ["-movflags", "frag_keyframe+empty_moov+default_base_moof", "-f", "mp4"]
+    else:
+        args += ["-f", "webm"]
+    args.append("pipe:1")
+    return args
+
+
+# ── Producer → response hand-off ──────────────────────────
+
+_EOF = object()
+
+
+class ChunkPipe:
+    """
+    Bounded hand-off from a producer thread to an async response body.
+    The producer blocks while BUFFER_CHUNKS chunks are pending, which in
+    turn blocks yt-dlp/ffmpeg on their stdout.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_chunks: int = BUFFER_CHUNKS) -> None:
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue(max_chunks)
+        self._closed = threading.Event()
+
+    # Producer side (worker thread)
+
+    def put(self, item: object) -> bool:
+        """Queue a chunk; False once the consumer has gone away."""
+        if self._closed.is_set():
+            return False
+        try:
+            future = asyncio.run_coroutine_threadsafe(self._queue.put(item), self._loop)
+        except RuntimeError:
+            return False  # event loop closed
+        while True:
+            try:
+                future.result(timeout=0.5)
+                return True
+            except concurrent.futures.TimeoutError:
+                if self._closed.is_set():
+                    future.cancel()
+                    return False
+
+    def finish(self, error: Optional[str] = None) -> None:
+        self.put(RuntimeError(error) if error else _EOF)
+
+    # Consumer side (event loop)
+
+    def close(self) -> None:
+        self._closed.set()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    async def get(self) -> Optional[bytes]:
+        """Next chunk, None at the end; raises if the producer failed."""
+        item = await self._queue.get()
+        if item is _EOF:
+            return None
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    async def stream(self, first: bytes) -> AsyncIterator[bytes]:
+        try:
+            yield first
+            while (chunk := await self.get()) is not None:
+                yield chunk
+        finally:
+            self.close()
+
+
+# ── Producer ──────────────────────────────────────────────
+
+def run_stream_download(job_id: str, info: dict, plan: StreamPlan, pipe: ChunkPipe) -> None:
+    """Run yt-dlp or ffmpeg and feed stdout into `pipe` (scheduler worker thread)."""
+    info_path: Optional[str] = None
+    process: Optional[subprocess.Popen] = None
+    try:
+        if pipe.closed:
+            # The request gave up (startup timeout or disconnect) while queued
+            job_store.update_job(job_id, status="failed", error="Client disconnected")
+            return
+        # One connection per source, from the shared fetch budget
+        resource_budget.fetch.acquire(job_id, 2 if plan.video else 1)
+        job_store.update_job(job_id, status="processing",
+                             stage="Starting stream...", progress=15)
+
+        if plan.format_id:
+            fd, info_path = tempfile.mkstemp(prefix=f"{job_id}_", suffix=".info.json")
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(info, fh)
+            cmd = _yt_dlp_cmd() + BASE_ARGS + [
+                "-f", plan.format_id, "-o", "-", "--quiet", "--no-progress",
+                "--load-info-json", info_path,
+            ]
+        else:
+            cmd = _ffmpeg_merge_cmd(plan)
+
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+            sent = 0
+            last_progress = 15
+            while chunk := process.stdout.read1(CHUNK_SIZE):
+                if not pipe.put(chunk):
+                    process.kill()
+                    process.wait()
+                    job_store.update_job(job_id, status="failed",
+                                         error="Client disconnected")
+                    return
+                sent += len(chunk)
+                if plan.total_size:
+                    # Map 0-100% streamed to 15-99% overall
+                    mapped = min(99, int(15 + 84 * sent / plan.total_size))
+                    if mapped > last_progress:
+                        last_progress = mapped
+                        job_store.update_job(job_id, stage="Streaming...", progress=mapped)
+
+            process.wait()
+            if process.returncode != 0:
+                stderr.seek(0)
+                tail = stderr.read().decode("utf-8", "replace")[-500:]
+                raise RuntimeError(f"{cmd[0]} exited with code {process.returncode}. {tail}")
+
+        pipe.finish()
+        job_store.update_job(job_id, status="completed", progress=100,
+                             stage="Streamed to client", filename=plan.filename)
+
+    except Exception as exc:
+        if process is not None and process.poll() is None:
+            process.kill()
+        pipe.finish(str(exc))
+        job_store.update_job(job_id, status="failed", error=str(exc))
+    finally:
+        resource_budget.fetch.release(job_id)
+        if info_path and os.path.exists(info_path):
+            os.remove(info_path)
@@ -2,38 +2,84 @@
 YouTube Stats Service — FastAPI Microservice
 
 Handles:
-  - ML endpoints: sentiment analysis, predictive analytics, earnings
+  - ML endpoints: sentiment analysis, predictive analytics, earnings,
+    and all three for many videos at once (batch analytics, bulk scores)
   - Download endpoints: format listing, video downloads (via yt-dlp)
 
 The TS server on Vercel handles URL parsing and YouTube API stats.
 """
 
 import asyncio
+import functools
+import json
 import os
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from starlette.background import BackgroundTask
-from datetime import datetime
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from datetime import date, datetime
+from urllib.parse import quote
 
 from config import settings
-from ml.sentiment import analyze_sentiment_and_topics
+from ml.executor import (
+    analyze_sentiment_async,
+    analyze_sentiment_stream,
+    run_ml_task,
+    warm_ml_pool,
+    shutdown_ml_pool,
+)
 from ml.prediction import run_predictive_analytics
 from ml.earnings import calculate_earnings_data
+from ml.vectorized import score_columns
 from models.schemas import (
     SentimentRequest,
     PredictionRequest,
     EarningsRequest,
+    BatchVideo,
+    BatchAnalyticsRequest,
+    BulkScoreRequest,
+)
+from utils.result_cache import (
+    result_cache,
+    make_key,
+    make_etag,
+    etag_matches,
+    parse_cache_control,
 )
 from download.schemas import FormatRequest, DownloadRequest
 from download.job_store import job_store
-from download.downloader import list_formats, run_download
+from download.backends import warm_backend
+from download.budget import resource_budget
+from download.capabilities import ffmpeg_capabilities
+from download.merge import ffmpeg_pool
+from download.downloader import get_video_info, list_formats, run_download
+from download.events import job_events
+from download.scheduler import download_scheduler, QueueFullError
+from download.streaming import ChunkPipe, plan_stream, run_stream_download
+from download.media_cache import media_cache
+from download.metadata import metadata_cache
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Spin up the ML worker processes, load yt-dlp and probe ffmpeg before
+    # serving traffic
+    await asyncio.to_thread(warm_ml_pool)
+    await asyncio.to_thread(warm_backend)
+    await asyncio.to_thread(ffmpeg_capabilities.start)
+    yield
+    ffmpeg_capabilities.stop()
+    await asyncio.to_thread(result_cache.flush)
+    download_scheduler.shutdown()
+    shutdown_ml_pool()
+
 
 app = FastAPI(
     title="YouTube Stats Service — API",
     version="2.0.0",
     description="Python microservice for ML analytics and video downloads.",
+    lifespan=lifespan,
 )
 
 # ── CORS ──────────────────────────────────────────────────
@@ -62,60 +108,351 @@ async def root():
 
 @app.get("/api/health")
 async def health():
-    return {"status": "ok", "message": "Server is running"}
+    return {
+        "status": "ok",
+        "message": "Server is running",
+        "ffmpeg": ffmpeg_capabilities.get().to_dict(),
+    }
 
 
 # ── Sentiment Analysis ───────────────────────────────────
 
 @app.post("/api/analyze-sentiment")
-async def analyze_sentiment(request: SentimentRequest):
+async def analyze_sentiment(
+    request: SentimentRequest,
+    response: Response,
+    cache_control: Optional[str] = Header(None),
+):
     if not request.comments or len(request.comments) == 0:
         raise HTTPException(status_code=400, detail="No comments provided for analysis")
 
+    key = make_key("sentiment", request.videoId, request.comments)
+    read_cache, write_cache = parse_cache_control(cache_control)
+    cached = await result_cache.get_async(key) if read_cache else None
+    if cached is not None:
+        response.headers["X-Cache"] = "HIT"
+        # Same shape as a miss: nothing scored, the whole result came from cache
+        scoring = {"computed": 0, "memoized": len(request.comments)}
+        return {"status": "success", "data": cached, "scoring": scoring}
+
     try:
-        analysis = analyze_sentiment_and_topics(request.comments)
-        return {"status": "success", "data": analysis}
+        analysis, scoring = await analyze_sentiment_async(request.comments)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sentiment analysis failed: {str(e)}")
 
+    if write_cache:
+        result_cache.set(key, analysis)
+    response.headers["X-Cache"] = "MISS"
+    return {"status": "success", "data": analysis, "scoring": scoring}
+
+
+# ── Sentiment Analysis: Streaming ────────────────────────
+
+def _comments_from_ndjson_line(line: bytes) -> list[str]:
+    """A line is a JSON string, an array of strings, or {"comments": [...]}."""
+    item = json.loads(line)
+    if isinstance(item, str):
+        return [item]
+    if isinstance(item, dict):
+        item = item.get("comments", [])
+    if isinstance(item, list) and all(isinstance(c, str) for c in item):
+        return item
+    raise ValueError("each line must be a comment string or a list of comment strings")
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that doesn't listen for disconnects while streaming.
+
+    The stock listener consumes `receive()` messages, which would swallow
+    the request body we're still reading; a client disconnect surfaces as
+    ClientDisconnect from request.stream() instead.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+
+
+async def _ndjson_comment_batches(request: Request, batch_size: int):
+    """Read the request body incrementally and yield batches of comments."""
+    buffer = b""
+    batch: list[str] = []
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                batch.extend(_comments_from_ndjson_line(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if buffer.strip():
+        batch.extend(_comments_from_ndjson_line(buffer))
+    if batch:
+        yield batch
+
+
+@app.post("/api/analyze-sentiment/stream")
+async def analyze_sentiment_ndjson(request: Request):
+    """
+    Streaming variant of /api/analyze-sentiment.
+
+    Accepts an NDJSON body (one comment string, or an array of comment
+    strings, per line) and responds with NDJSON frames: running aggregates
+    after each batch, then a final "result" frame in the SentimentData shape.
+    """
+
+    async def frames():
+        batches = _ndjson_comment_batches(request, settings.SENTIMENT_STREAM_BATCH_SIZE)
+        try:
+            async for frame in analyze_sentiment_stream(batches):
+                if frame["type"] == "result" and frame["data"]["total"] == 0:
+                    frame = {"type": "error", "message": "No comments provided for analysis"}
+                yield json.dumps(frame) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "message": f"Sentiment analysis failed: {str(e)}"}) + "\n"
+
+    return _DuplexStreamingResponse(frames(), media_type="application/x-ndjson")
+
 
 # ── Predictive Analytics ─────────────────────────────────
 
 @app.post("/api/predict/{video_id}")
-async def predict(video_id: str, request: PredictionRequest):
+async def predict(
+    video_id: str,
+    request: PredictionRequest,
+    response: Response,
+    cache_control: Optional[str] = Header(None),
+):
     if not video_id:
         raise HTTPException(status_code=400, detail="Video ID is required")
 
-    try:
-        stats_dict = request.stats.model_dump()
-        prediction = run_predictive_analytics(
-            stats=stats_dict,
-            sentiment=request.sentiment,
-            comments=request.comments,
-            timestamp=datetime.now().isoformat(),
-        )
-        return {"status": "success", "data": prediction}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+    stats_dict = request.stats.model_dump()
+    # The growth chart runs up to today, so cached entries change daily
+    key_parts = [stats_dict, request.sentiment, request.comments, date.today().isoformat()]
+    if request.dailyChart:
+        key_parts.append("daily")
+    key = make_key("predict", video_id, *key_parts)
+    read_cache, write_cache = parse_cache_control(cache_control)
+    prediction = await result_cache.get_async(key) if read_cache else None
+    response.headers["X-Cache"] = "MISS" if prediction is None else "HIT"
+
+    if prediction is None:
+        try:
+            prediction = await run_ml_task(
+                run_predictive_analytics,
+                stats=stats_dict,
+                sentiment=request.sentiment,
+                comments=request.comments,
+                daily_chart=request.dailyChart,
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+        if write_cache:
+            result_cache.set(key, prediction)
+
+    # Stamped per response, not cached with the result
+    prediction["analysis_timestamp"] = datetime.now().isoformat()
+    return {"status": "success", "data": prediction}
 
 
 # ── Earnings Prediction ──────────────────────────────────
 
 @app.post("/api/earnings/{video_id}")
-async def earnings(video_id: str, request: EarningsRequest):
+async def earnings(
+    video_id: str,
+    request: EarningsRequest,
+    response: Response,
+    cache_control: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Earnings estimate.  The response is deterministic for a given input
+    and day, so it carries an ETag and answers If-None-Match with 304.
+    """
     if not video_id:
         raise HTTPException(status_code=400, detail="Video ID is required")
 
-    try:
-        stats_dict = request.stats.model_dump()
-        earnings_data = calculate_earnings_data(
-            stats=stats_dict,
-            sentiment=request.sentiment,
-            comments=request.comments,
+    stats_dict = request.stats.model_dump()
+    # History charts change daily, so cached entries do too
+    key = make_key("earnings", video_id, stats_dict, request.sentiment, request.comments,
+                   date.today().isoformat())
+    read_cache, write_cache = parse_cache_control(cache_control)
+    earnings_data = await result_cache.get_async(key) if read_cache else None
+    response.headers["X-Cache"] = "MISS" if earnings_data is None else "HIT"
+
+    if earnings_data is None:
+        try:
+            earnings_data = await run_ml_task(
+                calculate_earnings_data,
+                stats=stats_dict,
+                sentiment=request.sentiment,
+                comments=request.comments,
+                video_id=video_id,
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Earnings prediction failed: {str(e)}")
+
+        if write_cache:
+            result_cache.set(key, earnings_data)
+
+    etag = make_etag(earnings_data)
+    response.headers["ETag"] = etag
+    # Let browsers keep the response but revalidate it on every visit
+    response.headers["Cache-Control"] = "no-cache"
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=dict(response.headers))
+    return {"status": "success", "data": earnings_data}
+
+
+# ── Batch Analytics ──────────────────────────────────────
+
+async def _cached_ml(key: str, read_cache: bool, write_cache: bool, compute: Callable):
+    """Result cache lookup shared with the single-video endpoints."""
+    cached = await result_cache.get_async(key) if read_cache else None
+    if cached is not None:
+        return cached
+    result = await compute()
+    if write_cache:
+        result_cache.set(key, result)
+    return result
+
+
+async def _batch_item(video: BatchVideo, timestamp: str,
+                      read_cache: bool, write_cache: bool) -> dict:
+    """Sentiment first (predict/earnings use it), then predict and earnings together."""
+    stats_dict = video.stats.model_dump()
+
+    sentiment = video.sentiment
+    if sentiment is None and video.comments:
+        async def compute_sentiment():
+            analysis, _ = await analyze_sentiment_async(video.comments)
+            return analysis
+
+        try:
+            sentiment = await _cached_ml(
+                make_key("sentiment", video.videoId, video.comments),
+                read_cache, write_cache, compute_sentiment,
+            )
+        except Exception as e:
+            raise RuntimeError(f"Sentiment analysis failed: {str(e)}")
+
+    async def stage(name: str, fn: Callable, extra_key: tuple = (), **kwargs):
+        try:
+            return await _cached_ml(
+                make_key(name, video.videoId, stats_dict, sentiment, video.commentData, *extra_key),
+                read_cache, write_cache,
+                lambda: run_ml_task(fn, stats=stats_dict, sentiment=sentiment,
+                                    comments=video.commentData, **kwargs),
+            )
+        except Exception as e:
+            label = "Prediction" if name == "predict" else "Earnings prediction"
+            raise RuntimeError(f"{label} failed: {str(e)}")
+
+    today = date.today().isoformat()
+    prediction, earnings_data = await asyncio.gather(
+        stage("predict", run_predictive_analytics, extra_key=(today,)),
+        stage("earnings", calculate_earnings_data, extra_key=(today,), video_id=video.videoId),
+    )
+    prediction["analysis_timestamp"] = timestamp
+    return {"sentiment": sentiment, "prediction": prediction, "earnings": earnings_data}
+
+
+@app.post("/api/batch/analytics")
+async def batch_analytics(
+    request: BatchAnalyticsRequest,
+    cache_control: Optional[str] = Header(None),
+):
+    """
+    Sentiment, prediction and earnings for many videos in one request.
+
+    Responds with NDJSON: one {"type": "result"} or {"type": "error"} frame
+    per video, in completion order and tagged with its index in the request,
+    then a {"type": "done"} frame with the counts.  A failing video only
+    produces its own error frame.
+    """
+    if not request.videos:
+        raise HTTPException(status_code=400, detail="No videos provided for analysis")
+    if len(request.videos) > settings.BATCH_MAX_VIDEOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BATCH_MAX_VIDEOS} videos per batch",
         )
-        return {"status": "success", "data": earnings_data}
+
+    read_cache, write_cache = parse_cache_control(cache_control)
+    timestamp = datetime.now().isoformat()
+
+    async def run(index: int, video: BatchVideo) -> dict:
+        frame = {"index": index, "videoId": video.videoId}
+        try:
+            data = await _batch_item(video, timestamp, read_cache, write_cache)
+            return {"type": "result", **frame, "data": data}
+        except Exception as e:
+            return {"type": "error", **frame, "message": str(e)}
+
+    async def frames():
+        tasks = [asyncio.create_task(run(i, v)) for i, v in enumerate(request.videos)]
+        failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                frame = await next_done
+                failed += frame["type"] == "error"
+                yield json.dumps(frame) + "\n"
+            yield json.dumps({
+                "type": "done",
+                "succeeded": len(tasks) - failed,
+                "failed": failed,
+            }) + "\n"
+        finally:
+            # Client went away: don't keep computing for it
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(frames(), media_type="application/x-ndjson")
+
+
+# ── Bulk Scoring ─────────────────────────────────────────
+
+@app.post("/api/bulk/scores")
+async def bulk_scores(request: BulkScoreRequest):
+    """
+    Virality, CPM/RPM, total earnings and forecasts for thousands of videos
+    in one vectorised pass.  Takes and returns one list per field; values
+    match /api/predict and /api/earnings for the same video.
+    """
+    columns = {
+        "views": request.viewCount,
+        "likes": request.likeCount,
+        "comments": request.commentCount,
+        "positive": request.positive,
+        "negative": request.negative,
+        "sentiment_total": request.sentimentTotal,
+        "published_at": request.publishedAt,
+    }
+    n = len(request.viewCount)
+    if n == 0:
+        raise HTTPException(status_code=400, detail="No videos provided for scoring")
+    if any(v is not None and len(v) != n for v in columns.values()):
+        raise HTTPException(status_code=400, detail="All field lists must have the same length")
+
+    try:
+        data = await run_ml_task(score_columns, **columns)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Earnings prediction failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Bulk scoring failed: {str(e)}")
+    return {"status": "success", "data": data}
+
+
+# ── Result Cache ──────────────────────────────────────────
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    return {
+        "status": "ok",
+        "cache": result_cache.stats(),
+        "metadata": metadata_cache.stats(),
+        "media": media_cache.stats(),
+    }
 
 
 # ── Format Listing ────────────────────────────────────────
@@ -126,12 +463,30 @@ async def get_formats(request: FormatRequest):
         raise HTTPException(status_code=400, detail="URL is required")
 
     try:
-        result = await asyncio.to_thread(list_formats, request.url)
+        result = await asyncio.to_thread(
+            list_formats,
+            request.url,
+            ext=request.ext,
+            min_height=request.min_height,
+            max_height=request.max_height,
+            has_audio=request.has_audio,
+            sort=request.sort,
+            order=request.order,
+        )
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list formats: {str(e)}")
 
 
+MEDIA_TYPES = {
+    "mp4": "video/mp4",
+    "webm": "video/webm",
+    "3gp": "video/3gpp",
+    "m4a": "audio/mp4",
+    "mp3": "audio/mpeg",
+}
+
+
 # ── Download: Initiate ────────────────────────────────────
 
 @app.post("/api/download/init")
@@ -139,28 +494,129 @@ async def initiate_download(request: DownloadRequest):
     if not request.url:
         raise HTTPException(status_code=400, detail="URL is required")
 
-    job_id = job_store.create_job()
-
-    # Launch download in background thread (non-blocking)
-    asyncio.get_event_loop().run_in_executor(
-        None,
-        run_download,
-        job_id,
-        request.url,
-        request.format,
-        request.format_id,
-        request.quality,
-        request.bitrate,
+    job_id = await asyncio.to_thread(job_store.create_job)
+    position = await _schedule_download(job_id, request.priority, *_download_args(job_id, request))
+    return {"status": "ok", "jobId": job_id, "queuePosition": position}
+
+
+def _download_args(job_id: str, request: DownloadRequest) -> tuple:
+    return (run_download, job_id, request.url, request.format,
+            request.format_id, request.quality, request.bitrate)
+
+
+async def _schedule_download(job_id: str, priority: int, fn, *args: object) -> int:
+    """
+    Queue `fn(*args)` on the bounded download scheduler.  Job store calls
+    run in a thread: with a shared backend they are file or network I/O.
+    """
+    try:
+        return await asyncio.to_thread(
+            download_scheduler.submit, job_id, fn, *args, priority=priority
+        )
+    except QueueFullError as e:
+        await asyncio.to_thread(job_store.delete_job, job_id)
+        raise HTTPException(
+            status_code=429,
+            detail="Download queue is full, try again later",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+# ── Download: Stream ──────────────────────────────────────
+
+class _PipeStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that closes its ChunkPipe however the response ends.
+    The body generator's own `finally` never runs if sending fails before
+    iteration starts, which would leave the producer blocked in put().
+    """
+
+    def __init__(self, pipe: ChunkPipe, first: bytes, **kwargs) -> None:
+        super().__init__(pipe.stream(first), **kwargs)
+        self._pipe = pipe
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._pipe.close()
+
+
+@app.post("/api/download/stream")
+async def stream_download(request: DownloadRequest):
+    """
+    Download and send the media in one request, without a temp file.
+
+    Streamable selections come back as the response body while yt-dlp or
+    ffmpeg produce them (X-Job-Id names the job for /api/download/events).
+    Anything else is queued as a regular download and answered with 202
+    and a jobId for the usual status/file flow.
+    """
+    if not request.url:
+        raise HTTPException(status_code=400, detail="URL is required")
+
+    try:
+        info = await asyncio.to_thread(get_video_info, request.url)
+        plan = await asyncio.to_thread(
+            plan_stream, info, request.format_id, request.quality, request.format
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch video info: {str(e)}")
+
+    job_id = await asyncio.to_thread(job_store.create_job)
+
+    if plan is None:
+        position = await _schedule_download(job_id, request.priority, *_download_args(job_id, request))
+        return JSONResponse(
+            status_code=202,
+            content={"status": "ok", "jobId": job_id, "queuePosition": position, "streamed": False},
+        )
+
+    pipe = ChunkPipe(asyncio.get_running_loop())
+    await _schedule_download(job_id, request.priority, run_stream_download, job_id, info, plan, pipe)
+
+    # Wait for the first bytes so startup failures still get a proper status
+    timeout = settings.DOWNLOAD_STREAM_START_TIMEOUT
+    try:
+        first = await asyncio.wait_for(pipe.get(), timeout=timeout)
+    except asyncio.TimeoutError:
+        # Free the queue slot if it never started; a running producer stops
+        # at its next chunk once the pipe is closed
+        pipe.close()
+        await asyncio.to_thread(_abandon_stream, job_id, f"No data within {timeout} s")
+        raise HTTPException(status_code=504, detail=f"Streaming did not start within {timeout} s")
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=f"Streaming failed: {str(e)}")
+    except asyncio.CancelledError:
+        pipe.close()
+        raise
+    if first is None:
+        raise HTTPException(status_code=500, detail="Streaming failed: no data produced")
+
+    headers = {"X-Job-Id": job_id}
+    quoted = quote(plan.filename)
+    if quoted != plan.filename:
+        headers["Content-Disposition"] = f"attachment; filename*=utf-8''{quoted}"
+    else:
+        headers["Content-Disposition"] = f'attachment; filename="{plan.filename}"'
+
+    return _PipeStreamingResponse(
+        pipe, first,
+        media_type=MEDIA_TYPES.get(plan.ext, "application/octet-stream"),
+        headers=headers,
     )
 
-    return {"status": "ok", "jobId": job_id}
+
+def _abandon_stream(job_id: str, reason: str) -> None:
+    download_scheduler.cancel(job_id)
+    job_store.update_job(job_id, status="failed", error=reason)
 
 
 # ── Download: Poll Status ─────────────────────────────────
 
 @app.get("/api/download/status/{job_id}")
 async def download_status(job_id: str):
-    job = job_store.get_job(job_id)
+    job = await asyncio.to_thread(job_store.get_job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
@@ -172,45 +628,113 @@ async def download_status(job_id: str):
             "progress": job.progress,
             "stage": job.stage,
             "error": job.error,
+            "merge": {
+                "mode": job.merge_mode,
+                "seconds": job.merge_seconds,
+                "cpuSeconds": job.merge_cpu_seconds,
+            } if job.merge_mode else None,
         },
     }
 
 
+# ── Download: Progress Events (SSE) ──────────────────────
+
+@app.get("/api/download/events/{job_id}")
+async def download_events(job_id: str):
+    """
+    Server-Sent Events alternative to polling /api/download/status: one
+    `progress` event with the full job, then only changed fields, closing
+    once the job completes or fails.
+    """
+    if not await asyncio.to_thread(job_store.get_job, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        async for change in job_events(job_id):
+            if change is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: progress\ndata: {json.dumps(change)}\n\n"
+        yield "event: end\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ── Download: Queue ───────────────────────────────────────
+
+@app.get("/api/download/queue")
+async def download_queue():
+    return {"status": "ok", "queue": download_scheduler.stats(), "ffmpeg": ffmpeg_pool.stats()}
+
+
+# ── Admin: Resource Budgets ───────────────────────────────
+
+@app.get("/api/admin/resources")
+async def admin_resources():
+    """CPU/IO budget limits for downloads and what each job currently holds."""
+    return {
+        "status": "ok",
+        "budget": resource_budget.stats(),
+        "ffmpeg": ffmpeg_pool.stats(),
+        "queue": download_scheduler.stats(),
+    }
+
+
 # ── Download: Serve File ──────────────────────────────────
 
-@app.get("/api/download/file/{job_id}")
+class _MediaFileResponse(FileResponse):
+    """
+    FileResponse with Range/If-Range (206, 416, multipart) and ETag handling
+    from Starlette, and larger reads for multi-GB media.  Servers offering
+    the ASGI pathsend extension get the file path for zero-copy sending.
+    """
+
+    chunk_size = 1024 * 1024
+
+    def __init__(self, *args, on_close: Callable[[], None], **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        # Unlike `background`, this also runs for 416/400 range errors and
+        # aborted transfers
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._on_close()
+
+
+@app.api_route("/api/download/file/{job_id}", methods=["GET", "HEAD"])
 async def download_file(job_id: str):
-    job = job_store.get_job(job_id)
+    """
+    Serve a finished download.  Supports HEAD and byte ranges, so clients
+    can resume a dropped transfer or fetch chunks in parallel while the
+    file is within its grace period in the media cache.
+    """
+    job = await asyncio.to_thread(job_store.get_job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     if job.status != "completed" or not job.file_path:
         raise HTTPException(status_code=400, detail="Download not ready")
-    if not os.path.exists(job.file_path):
+    # Pin the cached file while it's sent; eviction is the cache's job.
+    # With a shared job store the file may belong to another worker's
+    # cache (release is then a no-op), served as long as it still exists.
+    if not media_cache.acquire(job.file_path) and not os.path.exists(job.file_path):
         raise HTTPException(status_code=500, detail="File expired or deleted")
 
     ext = os.path.splitext(job.filename or "video")[1].lstrip(".")
-    media_types = {
-        "mp4": "video/mp4",
-        "webm": "video/webm",
-        "3gp": "video/3gpp",
-        "m4a": "audio/mp4",
-        "mp3": "audio/mpeg",
-    }
-    media_type = media_types.get(ext, "application/octet-stream")
-
-    file_path = job.file_path
-
-    def cleanup() -> None:
-        try:
-            os.unlink(file_path)
-        except OSError:
-            pass
+    media_type = MEDIA_TYPES.get(ext, "application/octet-stream")
 
-    return FileResponse(
-        path=file_path,
+    return _MediaFileResponse(
+        path=job.file_path,
         filename=job.filename or f"video.{ext}",
         media_type=media_type,
-        background=BackgroundTask(cleanup),
+        headers={"Accept-Ranges": "bytes"},
+        on_close=functools.partial(media_cache.release, job.file_path),
     )
 
 
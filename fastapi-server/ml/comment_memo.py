@@ -0,0 +1,59 @@
+"""
+Per-comment sentiment memo.
+
+When a video gets new comments the next /api/analyze-sentiment request is
+the previous list plus a few new ones.  The memo keeps each comment's
+CommentScore (polarity, subjectivity, emotion flags, spam/sarcasm bits and
+topic tokens) keyed by a digest of the comment text, so only unseen
+comments are scored and the totals are rebuilt from cached parts.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from config import settings
+from ml.sentiment import CommentScore
+
+
+def _digest(comment: str) -> bytes:
+    return hashlib.blake2b(comment.encode("utf-8"), digest_size=16).digest()
+
+
+class CommentMemo:
+    """Thread-safe LRU of comment digest -> CommentScore, bounded by entry count."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[bytes, CommentScore] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, comments: list[str]) -> list[Optional[CommentScore]]:
+        keys = [_digest(c) for c in comments]
+        found: list[Optional[CommentScore]] = []
+        with self._lock:
+            for key in keys:
+                score = self._entries.get(key)
+                if score is not None:
+                    self._entries.move_to_end(key)
+                found.append(score)
+        return found
+
+    def put_many(self, comments: list[str], scores: list[CommentScore]) -> None:
+        if self.max_entries <= 0:
+            return
+        keys = [_digest(c) for c in comments]
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._entries[key] = score
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Singleton
+comment_memo = CommentMemo(max_entries=settings.COMMENT_MEMO_SIZE)
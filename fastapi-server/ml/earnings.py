@@ -3,12 +3,26 @@ Earnings Prediction — ported from server/src/ml/earnings_prediction.py
 
 Estimates CPM/RPM, total earnings, forecasts, and generates
 historical earnings chart data based on engagement metrics.
+
+The history charts are deterministic: their random variance is seeded
+from (video ID, date), so the same inputs give the same response all day
+and the earnings endpoint can serve ETags.  Date labels and trend factors
+only change once a day and are computed once per day.
 """
 
-import random
-from datetime import datetime, timedelta
+import functools
+import hashlib
+from datetime import date, datetime, timedelta
 from typing import Optional
 
+import numpy as np
+
+from ml.vectorized import round_like_python
+
+
+# (days, points) per chart; the 1-year chart has one point per 30 days
+_HISTORY_SHAPES = {"history_7d": (7, 7), "history_30d": (30, 30), "history_1y": (365, 12)}
+
 
 def calculate_cpm_estimate(stats: dict, sentiment: Optional[dict] = None) -> float:
     """
@@ -41,14 +55,73 @@ def calculate_cpm_estimate(stats: dict, sentiment: Optional[dict] = None) -> flo
     return round(max(2.0, min(15.0, estimated_cpm)), 2)
 
 
+@functools.lru_cache(maxsize=2)
+def _history_axes(today: date) -> dict[str, tuple[tuple[str, ...], np.ndarray]]:
+    """Date labels and growth trend factors per chart, computed once per day."""
+    axes = {}
+    for name, (days, points_count) in _HISTORY_SHAPES.items():
+        labels = []
+        for i in range(points_count - 1, -1, -1):
+            if days == 365:
+                # Monthly points for year view
+                labels.append((today - timedelta(days=i * 30)).strftime('%Y-%m'))
+            else:
+                # Daily points
+                labels.append((today - timedelta(days=i)).strftime('%m-%d'))
+        # Slight growth trend for recent data
+        progress = np.arange(1, points_count + 1) / points_count
+        axes[name] = (tuple(labels), 0.95 + (0.1 * progress))
+    return axes
+
+
+def _history_seed(video_id: str, today: date) -> int:
+    digest = hashlib.sha256(f"{video_id}|{today.isoformat()}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def generate_history(daily_est_revenue: float, rpm: float, video_id: str,
+                     today: date) -> dict[str, list[dict]]:
+    """
+    Earnings history charts (7 days, 30 days, 12 months).
+
+    Each point is the estimated daily (or, for the year chart, monthly)
+    revenue with +/-20% variance and a slight upward trend.  The variance
+    for all charts is drawn in one vector from a generator seeded with
+    (video ID, date), so repeat requests on the same day get the same
+    history.
+    """
+    axes = _history_axes(today)
+    rng = np.random.default_rng(_history_seed(video_id, today))
+    variance = rng.uniform(0.8, 1.2, sum(points for _, points in _HISTORY_SHAPES.values()))
+
+    charts = {}
+    offset = 0
+    for name, (days, points_count) in _HISTORY_SHAPES.items():
+        labels, trend = axes[name]
+        # Base value for each point depends on the period type
+        base_val = daily_est_revenue * 30 if days == 365 else daily_est_revenue
+        val = base_val * variance[offset:offset + points_count] * trend
+        offset += points_count
+
+        earnings = round_like_python(val, 2).tolist()
+        views = np.trunc((val / (rpm if rpm > 0 else 1)) * 1000).astype(np.int64).tolist()
+        charts[name] = [
+            {"date": label, "earnings": e, "views": v}
+            for label, e, v in zip(labels, earnings, views)
+        ]
+    return charts
+
+
 def calculate_earnings_data(
     stats: dict,
     sentiment: Optional[dict] = None,
     comments: Optional[list] = None,
+    video_id: Optional[str] = None,
 ) -> dict:
     """
     Calculate full earnings data including CPM, RPM, forecasts, and history.
     Returns a dict matching the TS server's response shape.
+    `video_id` seeds the history charts' variance.
     """
     if comments is None:
         comments = []
@@ -73,43 +146,7 @@ def calculate_earnings_data(
 
     daily_est_revenue = (views_per_day / 1000) * rpm
 
-    def generate_history(days: int, points_count: int, period_type: str = "daily") -> list[dict]:
-        history_data: list[dict] = []
-        now = datetime.now()
-
-        # Base value for each point depends on the period type
-        if period_type == "monthly":
-            base_val = daily_est_revenue * 30
-        else:
-            base_val = daily_est_revenue
-
-        for i in range(points_count - 1, -1, -1):
-            if days == 365:
-                # Monthly points for year view
-                date = (now - timedelta(days=i * 30)).strftime('%Y-%m')
-            else:
-                # Daily points
-                date = (now - timedelta(days=i)).strftime('%m-%d')
-
-            # Add some randomness and a slight trend
-            variance = random.uniform(0.8, 1.2)
-
-            # Slight growth trend for recent data
-            progress = (points_count - i) / points_count
-            trend = 0.95 + (0.1 * progress)
-
-            val = base_val * variance * trend
-
-            history_data.append({
-                "date": date,
-                "earnings": round(val, 2),
-                "views": int((val / (rpm if rpm > 0 else 1)) * 1000)
-            })
-        return history_data
-
-    history_7d = generate_history(7, 7, "daily")
-    history_30d = generate_history(30, 30, "daily")
-    history_1y = generate_history(365, 12, "monthly")
+    history = generate_history(daily_est_revenue, rpm, video_id or "", date.today())
 
     return {
         "estimated_cpm": cpm,
@@ -120,9 +157,9 @@ def calculate_earnings_data(
             "weekly": round(forecast_7d, 2),
             "monthly": round(forecast_30d, 2)
         },
-        "history_7d": history_7d,
-        "history_30d": history_30d,
-        "history_1y": history_1y,
+        "history_7d": history["history_7d"],
+        "history_30d": history["history_30d"],
+        "history_1y": history["history_1y"],
         "currency": "USD",
         "confidence_score": 85 if len(comments) > 10 else 60
     }
@@ -0,0 +1,165 @@
+"""
+CPU-bound execution layer for the ML endpoints.
+
+Sentiment scoring is pure-Python lexicon work, so running it inline in an
+`async def` endpoint blocks the event loop for the whole request.  This
+module owns a bounded ProcessPoolExecutor whose workers load the sentiment
+lexicon once, looks comments up in the per-comment memo, splits the unseen
+ones into chunks across the workers, and aggregates everything back into
+the usual response shape.  Lighter in-process ML work (aggregation,
+predict, earnings) runs on a dedicated thread pool rather than the loop's
+default executor, so it never queues behind downloads or format listing.
+"""
+
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Optional, TypeVar
+
+from config import settings
+from ml.comment_memo import comment_memo
+from ml.sentiment import CommentScore, SentimentAccumulator, score_comments, aggregate_scores
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_threads: Optional[ThreadPoolExecutor] = None
+
+T = TypeVar("T")
+
+
+def _init_worker() -> None:
+    """Load the sentiment lexicon and compiled matchers once per worker process."""
+    from ml.sentiment import analyze_comment
+
+    analyze_comment("warm up the pattern analyzer")
+
+
+def _noop() -> None:
+    return None
+
+
+def get_ml_pool() -> ProcessPoolExecutor:
+    """Return the shared ML process pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        # "spawn" keeps workers free of the parent's threads (job store
+        # timers, executor threads) — they only need the ml package.
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.ML_POOL_SIZE,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+    return _pool
+
+
+def warm_ml_pool() -> None:
+    """Start every worker up front so the first request doesn't pay for it."""
+    pool = get_ml_pool()
+    futures = [pool.submit(_noop) for _ in range(settings.ML_POOL_SIZE)]
+    for f in futures:
+        f.result()
+
+
+def get_ml_threads() -> ThreadPoolExecutor:
+    """Return the ML thread pool, creating it on first use."""
+    global _threads
+    if _threads is None:
+        _threads = ThreadPoolExecutor(
+            max_workers=settings.ML_THREAD_POOL_SIZE,
+            thread_name_prefix="ml",
+        )
+    return _threads
+
+
+async def run_ml_task(fn: Callable[..., T], *args: object, **kwargs: object) -> T:
+    """Run a blocking ML function on the ML thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_ml_threads(), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_ml_pool() -> None:
+    global _pool, _threads
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+    if _threads is not None:
+        _threads.shutdown(wait=False, cancel_futures=True)
+        _threads = None
+
+
+def _chunk(comments: list[str], size: int) -> list[list[str]]:
+    return [comments[i:i + size] for i in range(0, len(comments), size)]
+
+
+async def _score_with_memo(comments: list[str]) -> tuple[list[CommentScore], int]:
+    """
+    Score comments through the memo and the ML pool.
+
+    Returns the per-comment scores and how many comments had to be
+    computed.  Unseen comments are de-duplicated, split into
+    SENTIMENT_CHUNK_SIZE chunks scored in parallel, and stored in the memo.
+    """
+    scores: list[Optional[CommentScore]] = comment_memo.get_many(comments)
+
+    # Unseen comment text -> positions in the request
+    pending: dict[str, list[int]] = {}
+    for i, score in enumerate(scores):
+        if score is None:
+            pending.setdefault(comments[i], []).append(i)
+
+    if pending:
+        loop = asyncio.get_running_loop()
+        pool = get_ml_pool()
+        texts = list(pending)
+        size = max(1, settings.SENTIMENT_CHUNK_SIZE)
+        chunks = await asyncio.gather(*(
+            loop.run_in_executor(pool, score_comments, chunk)
+            for chunk in _chunk(texts, size)
+        ))
+        fresh = [score for chunk in chunks for score in chunk]
+        comment_memo.put_many(texts, fresh)
+        for text, score in zip(texts, fresh):
+            for i in pending[text]:
+                scores[i] = score
+
+    computed = sum(len(positions) for positions in pending.values())
+    return scores, computed
+
+
+async def analyze_sentiment_async(comments: list[str]) -> tuple[dict, dict]:
+    """
+    Run sentiment analysis off the event loop.
+
+    Returns (analysis, scoring) where scoring reports how many comments were
+    computed and how many came from the comment memo.
+    """
+    scores, computed = await _score_with_memo(comments)
+    analysis = await run_ml_task(aggregate_scores, comments, scores)
+    return analysis, {"computed": computed, "memoized": len(comments) - computed}
+
+
+async def analyze_sentiment_stream(batches: AsyncIterator[list[str]]) -> AsyncIterator[dict]:
+    """
+    Score comment batches as they arrive and yield running aggregates.
+
+    Yields one {"type": "progress", ...} frame per batch and a final
+    {"type": "result", ...} frame whose data matches SentimentData.  Only
+    the running totals are kept between batches.
+    """
+    acc = SentimentAccumulator()
+    computed = 0
+
+    async for batch in batches:
+        if not batch:
+            continue
+        scores, batch_computed = await _score_with_memo(batch)
+        computed += batch_computed
+        acc.add_many(batch, scores)
+        yield {"type": "progress", "processed": acc.total, "data": acc.result()}
+
+    yield {
+        "type": "result",
+        "data": acc.result(),
+        "scoring": {"computed": computed, "memoized": acc.total - computed},
+    }
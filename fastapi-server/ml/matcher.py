@@ -0,0 +1,69 @@
+"""
+Single-pass keyword matcher used by the sentiment engine.
+
+All keyword lists are folded into one trie, and the trie is compiled into
+a regular expression so the scan runs inside the C regex engine instead of
+a Python loop.  One `finditer` over a comment reports every keyword label
+(emotion, sarcasm cue, ...) it contains, with the same substring semantics
+as `keyword in text`.
+"""
+
+import re
+from typing import Iterable
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Compile a set of words into a trie-shaped regex that prefers the longest match."""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # Greedy optional: try the longer keyword first, fall back to this one
+            body = "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Find which labelled keyword groups occur anywhere in a string.
+
+    `groups` maps a label to its keywords.  A keyword may belong to several
+    labels (e.g. "great" is both a joy keyword and a sarcasm cue).
+    """
+
+    def __init__(self, groups: dict[str, Iterable[str]]) -> None:
+        labels: dict[str, set[str]] = {}
+        for label, keywords in groups.items():
+            for keyword in keywords:
+                labels.setdefault(keyword, set()).add(label)
+
+        # The regex reports only the longest keyword starting at each
+        # position; every shorter keyword matching there is a prefix of it,
+        # so fold the prefixes' labels into the longer keyword.
+        self._labels: dict[str, frozenset[str]] = {
+            kw: frozenset().union(*(labels[p] for p in labels if kw.startswith(p)))
+            for kw in labels
+        }
+        self._all = frozenset().union(*self._labels.values())
+        # Zero-width lookahead so overlapping keywords are all visited
+        self._regex = re.compile(f"(?=({_trie_pattern(labels)}))")
+
+    def find(self, text: str) -> frozenset[str]:
+        """Return the set of labels with at least one keyword in `text`."""
+        found: set[str] = set()
+        for m in self._regex.finditer(text):
+            found |= self._labels[m.group(1)]
+            if len(found) == len(self._all):
+                break
+        return frozenset(found)
@@ -0,0 +1,185 @@
+"""
+Batch polarity / subjectivity scorer.
+
+A compact re-implementation of TextBlob's PatternAnalyzer for plain
+strings.  The pattern lexicon is flattened once into a dict of
+word -> (polarity, subjectivity, intensity, is_modifier), the tokenizer
+only takes the slow punctuation/abbreviation path for tokens that are not
+purely alphanumeric, and the modifier ("very good"), negation ("not
+good"), exclamation, "(!)" and emoticon rules are applied in one loop per
+comment.  Scores match `TextBlob(text).sentiment` (see
+benchmarks/bench_polarity.py).
+"""
+
+import re
+from functools import lru_cache
+from typing import Optional
+
+from textblob.en import sentiment as pattern_sentiment
+from textblob._text import (
+    ABBREVIATIONS,
+    EMOTICONS,
+    PUNCTUATION,
+    RE_ABBR1,
+    RE_ABBR2,
+    RE_ABBR3,
+    RE_EMOTICONS,
+    RE_SARCASM,
+)
+
+
+NEGATIONS = frozenset(pattern_sentiment.negations)
+
+_LEADING_PUNCT = tuple(PUNCTUATION.replace(".", ""))
+_TRAILING_PUNCT = _LEADING_PUNCT + (".",)
+
+_CONTRACTION_RE = re.compile(r"'(?:d|m|s|ll|re|ve)|n't")
+_LINEBREAK_RE = re.compile(r"\n{2,}")
+_QUOTE_PAD = {ord(q): f" {q} " for q in "“”‘’'\""}
+
+# Lowercased emoticon -> polarity; first group in EMOTICONS order wins.
+# Only faces the analyzer would actually look up (non-alphabetic, <= 5
+# chars, not a punctuation run) are kept, so a plain .get() is enough.
+_EMOTICON_POLARITY: dict[str, float] = {}
+for (_, _polarity), _faces in EMOTICONS.items():
+    for _face in _faces:
+        _face = _face.lower()
+        if not _face.isalpha() and len(_face) <= 5 and _face not in PUNCTUATION:
+            _EMOTICON_POLARITY.setdefault(_face, _polarity)
+
+# Unknown words that can change the score on their own
+_ACTIONABLE = NEGATIONS | {"!", "(!)"} | _EMOTICON_POLARITY.keys()
+
+_lexicon: Optional[dict[str, tuple[float, float, float, bool]]] = None
+
+
+def load_lexicon() -> dict[str, tuple[float, float, float, bool]]:
+    """Flatten the pattern sentiment lexicon (loaded once per process)."""
+    global _lexicon
+    if _lexicon is None:
+        len(pattern_sentiment)  # forces the lazy XML load
+        modifiers = pattern_sentiment.modifiers
+        _lexicon = {
+            word: (*(float(v) for v in tags[None]), any(m in tags for m in modifiers))
+            for word, tags in dict.items(pattern_sentiment)
+        }
+    return _lexicon
+
+
+@lru_cache(maxsize=65536)
+def _split_punctuation(t: str) -> tuple[str, ...]:
+    """Split leading/trailing punctuation off a token, as pattern's find_tokens does."""
+    out: list[str] = []
+    while t.startswith(_LEADING_PUNCT):
+        out.append(t[0])
+        t = t[1:]
+    tail: list[str] = []
+    while t.endswith(_TRAILING_PUNCT):
+        if t.endswith(_LEADING_PUNCT):
+            tail.append(t[-1])
+            t = t[:-1]
+        if t.endswith("..."):
+            tail.append("...")
+            t = t[:-3].rstrip(".")
+        if t.endswith("."):
+            if (
+                t in ABBREVIATIONS
+                or RE_ABBR1.match(t) is not None
+                or RE_ABBR2.match(t) is not None
+                or RE_ABBR3.match(t) is not None
+            ):
+                break
+            tail.append(t[-1])
+            t = t[:-1]
+    if t:
+        out.append(t)
+    out.extend(reversed(tail))
+    return tuple(out)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased token stream the pattern analyzer would score for `text`."""
+    text = _CONTRACTION_RE.sub(r" \g<0>", text).translate(_QUOTE_PAD)
+    if "\n" in text:
+        text = _LINEBREAK_RE.sub(" ", text.replace("\r\n", "\n"))
+
+    tokens: list[str] = []
+    simple = True
+    for t in text.split():
+        if t.isalnum():
+            tokens.append(t)
+        else:
+            simple = False
+            tokens.extend(_split_punctuation(t))
+
+    joined = " ".join(tokens)
+    if not simple:
+        joined = RE_SARCASM.sub("(!)", joined)
+        joined = RE_EMOTICONS.sub(lambda m: m.group(1).replace(" ", "") + m.group(2), joined)
+    return joined.lower().split()
+
+
+def score_tokens(tokens: list[str], lexicon: Optional[dict] = None) -> tuple[float, float]:
+    """Return (polarity, subjectivity) for a token stream from `tokenize`."""
+    lex = lexicon if lexicon is not None else load_lexicon()
+    a: list[list] = []          # [polarity, subjectivity, intensity, negated]
+    m: Optional[str] = None     # preceding modifier ("very good")
+    n: Optional[str] = None     # preceding negation ("not good")
+
+    for w in tokens:
+        entry = lex.get(w)
+        if entry is None and m is None and n is None and w not in _ACTIONABLE:
+            continue  # plain unknown word, no pending modifier/negation
+        if entry is not None:
+            p, s, i, is_modifier = entry
+            if m is None:
+                a.append([p, s, i, False])
+            else:
+                last = a[-1]
+                last[0] = max(-1.0, min(p * last[2], +1.0))
+                last[1] = max(-1.0, min(s * last[2], +1.0))
+                last[2] = i
+            if n is not None:
+                a[-1][2] = 1.0 / a[-1][2]
+                a[-1][3] = True
+            m = w if is_modifier else None
+            n = w if w in NEGATIONS else None
+        else:
+            if w in NEGATIONS:
+                n = w
+            elif n and len(w.strip("'")) > 1:
+                n = None
+            if n is not None and m is not None and m.endswith("ly"):
+                a[-1][3] = True
+                n = None
+            elif m and len(w) > 2:
+                m = None
+            if w == "!" and a:
+                a[-1][0] = max(-1.0, min(a[-1][0] * 1.25, +1.0))
+            if w == "(!)":
+                a.append([0.0, 1.0, 1.0, False])
+            face = _EMOTICON_POLARITY.get(w)
+            if face is not None:
+                a.append([face, 1.0, 1.0, False])
+
+    if not a:
+        return 0.0, 0.0
+
+    # "not good" = slightly bad, "not bad" = slightly good
+    polarity = 0
+    subjectivity = 0
+    for p, s, _, negated in a:
+        polarity += p * -0.5 if negated else p
+        subjectivity += s
+    return polarity / float(len(a)), subjectivity / float(len(a))
+
+
+def score_text(text: str) -> tuple[float, float]:
+    """Return (polarity, subjectivity) for one string."""
+    return score_tokens(tokenize(text))
+
+
+def score_batch(texts: list[str]) -> list[tuple[float, float]]:
+    """Score a list of strings against a single lexicon lookup table."""
+    lex = load_lexicon()
+    return [score_tokens(tokenize(t), lex) for t in texts]
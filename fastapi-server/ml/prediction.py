@@ -5,8 +5,12 @@ Calculates virality score, growth forecasting, historical view estimation,
 and content recommendations based on video stats and sentiment data.
 """
 
+import bisect
 import math
+from collections import Counter
 from datetime import datetime, timedelta
+from itertools import accumulate
+from operator import attrgetter
 from typing import Optional
 
 
@@ -34,10 +38,59 @@ def calculate_linear_regression(data_points: list[list]) -> list:
     return [slope, intercept]
 
 
-def estimate_historical_growth(stats: dict, comments: Optional[list], published_at: Optional[str]) -> list[dict]:
+# Comments parsed per map() call; a bad date re-parses only its own chunk
+_PARSE_CHUNK = 1024
+
+
+def _comment_day_counts(comments: Optional[list], start_date: datetime) -> tuple[list[int], list[int]]:
+    """
+    Cumulative comment counts by whole days since publishing.
+
+    Returns (days, totals): the distinct day offsets in ascending order and
+    how many comments fall on or before each.  Dates are parsed in chunks
+    with a C-level map (Python 3.11's fromisoformat reads the API's trailing
+    "Z" itself); only a chunk containing a bad date is re-parsed one by one.
+    Comments the per-comment loop used to skip (missing or malformed dates,
+    naive vs aware mismatch with the publish date) are skipped here too.
+    """
+    date_strs = []
+    for c in (comments or []):
+        date_str = c.get('publishedAt') if isinstance(c, dict) else None
+        if date_str:
+            date_strs.append(date_str)
+
+    dates: list[datetime] = []
+    for i in range(0, len(date_strs), _PARSE_CHUNK):
+        chunk = date_strs[i:i + _PARSE_CHUNK]
+        try:
+            dates += list(map(datetime.fromisoformat, chunk))
+        except Exception:
+            for date_str in chunk:
+                try:
+                    dates.append(datetime.fromisoformat(date_str.replace('Z', '+00:00')))
+                except Exception:
+                    continue
+
+    # Naive and aware datetimes can't be subtracted from each other
+    aware = start_date.tzinfo is not None
+    if any((d.tzinfo is not None) != aware for d in dates):
+        dates = [d for d in dates if (d.tzinfo is not None) == aware]
+
+    per_day = Counter(map(attrgetter('days'), map(start_date.__rsub__, dates)))
+    days = sorted(per_day)
+    totals = list(accumulate(per_day[d] for d in days))
+    return days, totals
+
+
+def estimate_historical_growth(stats: dict, comments: Optional[list], published_at: Optional[str],
+                               daily: bool = False) -> list[dict]:
     """
     Estimates historical view growth based on comment frequency.
     This is a proxy since we don't have actual daily view stats.
+
+    Samples about 10-15 points across the video's life, or every day with
+    `daily=True`.  Each point looks up the comments up to that day with a
+    binary search over cumulative per-day counts.
     """
     total_views = int(stats.get('viewCount', 0))
     if not published_at:
@@ -50,24 +103,14 @@ def estimate_historical_growth(stats: dict, comments: Optional[list], published_
     if total_days <= 0:
         return []
 
-    # Sort comments by date
-    comment_dates: list[int] = []
-    for c in (comments or []):
-        try:
-            date_str = c.get('publishedAt')
-            if date_str:
-                date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                comment_dates.append((date - start_date).days)
-        except Exception:
-            continue
-
-    comment_dates.sort()
+    comment_days, comment_totals = _comment_day_counts(comments, start_date)
 
     # Create daily data points
-    if not comment_dates:
+    if not comment_days:
         # If no comments, assume linear growth
         data_points = []
-        for d in range(0, total_days + 1, max(1, total_days // 10)):
+        step = 1 if daily else max(1, total_days // 10)
+        for d in range(0, total_days + 1, step):
             data_points.append({
                 "date": (start_date + timedelta(days=d)).strftime('%Y-%m-%d'),
                 "views": int((total_views / total_days) * d),
@@ -76,7 +119,7 @@ def estimate_historical_growth(stats: dict, comments: Optional[list], published_
     else:
         # Use comment distribution combined with a linear base growth
         data_points = []
-        total_comments = len(comment_dates)
+        total_comments = comment_totals[-1]
 
         # We split views into:
         # 20% Organic Linear Growth (background views)
@@ -84,12 +127,14 @@ def estimate_historical_growth(stats: dict, comments: Optional[list], published_
         ORGANIC_WEIGHT = 0.2
         VIRAL_WEIGHT = 0.8
 
-        for d in range(0, total_days + 1, max(1, total_days // 15)):
+        step = 1 if daily else max(1, total_days // 15)
+        for d in range(0, total_days + 1, step):
             # Organic part: simple linear progress
             organic_part = (d / total_days) * ORGANIC_WEIGHT
 
             # Viral part: based on comment density
-            comments_before = len([cd for cd in comment_dates if cd <= d])
+            i = bisect.bisect_right(comment_days, d)
+            comments_before = comment_totals[i - 1] if i else 0
             viral_part = (comments_before / total_comments) * VIRAL_WEIGHT
 
             combined_weight = organic_part + viral_part
@@ -184,17 +229,19 @@ def run_predictive_analytics(
     sentiment: Optional[dict] = None,
     comments: Optional[list] = None,
     timestamp: Optional[str] = None,
+    daily_chart: bool = False,
 ) -> dict:
     """
     Main entry point — runs all predictive analytics and returns
     the combined result matching the TS server's response shape.
+    `daily_chart` samples chart_data every day instead of ~15 points.
     """
     published_at = stats.get('publishedAt')
 
     virality = calculate_virality_score(stats, sentiment)
     forecast = generate_forecast(stats)
     recommendations = get_recommendations(virality, sentiment)
-    chart_data = estimate_historical_growth(stats, comments, published_at)
+    chart_data = estimate_historical_growth(stats, comments, published_at, daily=daily_chart)
 
     return {
         "virality_score": virality,
@@ -4,12 +4,23 @@ Sentiment Analysis — ported from server/src/ml/sentiment_analysis.py
 Analyzes YouTube comments for sentiment (positive/negative/neutral),
 emotion detection, spam detection, sarcasm detection, and topic extraction.
 Uses TextBlob for NLP.
+
+`analyze_comment` is the compiled hot path: one combined spam regex, one
+trie-regex pass for every emotion and sarcasm keyword, and the flattened
+pattern lexicon scorer from ml.polarity instead of a TextBlob object.
+The `detect_*` helpers are the original per-check implementations and are
+kept as the reference behaviour.
 """
 
 import re
-from textblob import TextBlob
+from typing import NamedTuple, Optional
 from collections import Counter
 
+from config import settings
+from ml.matcher import KeywordMatcher
+from ml.polarity import score_text
+from ml.topics import TopicSketch
+
 # Basic stop words to filter out from keywords
 STOP_WORDS = {
     'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', 'your', 'yours',
@@ -59,6 +70,27 @@ SPAM_PATTERNS = [
     r'nobody:',
 ]
 
+# Sarcasm cue words
+SARCASM_POSITIVE_WORDS = ['great', 'amazing', 'wonderful', 'love', 'best', 'perfect', 'awesome']
+SARCASM_NEGATIVE_INDICATORS = ['not', 'but', 'however', 'yet', 'though', '...', 'sure', 'right', 'yeah right']
+
+
+# ── Compiled matchers ─────────────────────────────────────
+
+_SPAM_RE = re.compile('|'.join(f'(?:{p})' for p in SPAM_PATTERNS), re.IGNORECASE)
+_REPEAT_RE = re.compile(r'(.)\1{5,}')
+_SARCASM_TAIL_RE = re.compile(r'\.\.\.|lol|lmao|sure|right$')
+_NON_ALPHA_RE = re.compile(r'[^a-zA-Z\s]')
+
+_SARCASM_POSITIVE = 'sarcasm_positive'
+_SARCASM_NEGATIVE = 'sarcasm_negative'
+
+_KEYWORDS = KeywordMatcher({
+    **EMOTION_KEYWORDS,
+    _SARCASM_POSITIVE: SARCASM_POSITIVE_WORDS,
+    _SARCASM_NEGATIVE: SARCASM_NEGATIVE_INDICATORS,
+})
+
 
 def detect_emotions(comment_lower: str) -> dict[str, int]:
     """Detect emotions in a comment based on keyword matching."""
@@ -98,11 +130,8 @@ def detect_sarcasm(comment_lower: str, polarity: float, subjectivity: float) ->
     Simple sarcasm detection based on mixed signals.
     High subjectivity + contradicting polarity indicators.
     """
-    positive_words = ['great', 'amazing', 'wonderful', 'love', 'best', 'perfect', 'awesome']
-    negative_indicators = ['not', 'but', 'however', 'yet', 'though', '...', 'sure', 'right', 'yeah right']
-
-    has_positive = any(word in comment_lower for word in positive_words)
-    has_negative_indicator = any(indicator in comment_lower for indicator in negative_indicators)
+    has_positive = any(word in comment_lower for word in SARCASM_POSITIVE_WORDS)
+    has_negative_indicator = any(indicator in comment_lower for indicator in SARCASM_NEGATIVE_INDICATORS)
 
     # If has positive words but also negative indicators and is highly subjective
     if has_positive and has_negative_indicator and subjectivity > 0.5:
@@ -115,17 +144,13 @@ def detect_sarcasm(comment_lower: str, polarity: float, subjectivity: float) ->
     return False
 
 
-def analyze_sentiment_and_topics(comments: list[str]) -> dict:
-    """
-    Analyze a list of comment strings for sentiment, emotions, spam, sarcasm, and topics.
-    Returns a dict matching the shape expected by the frontend.
-    """
-    results = {
+def _empty_results(total: int = 0) -> dict:
+    return {
         "positive": 0,
         "negative": 0,
         "neutral": 0,
         "average_polarity": 0,
-        "total": len(comments),
+        "total": total,
         "topics": [],
         "emotions": {
             "joy": 0,
@@ -140,51 +165,185 @@ def analyze_sentiment_and_topics(comments: list[str]) -> dict:
         "sarcasm_detected": 0
     }
 
-    if not comments:
-        return results
 
-    total_polarity = 0.0
-    words: list[str] = []
+class CommentScore(NamedTuple):
+    """Everything the aggregator needs from a single comment."""
+    polarity: float
+    subjectivity: float
+    emotions: frozenset[str]
+    is_spam: bool
+    is_sarcastic: bool
+    tokens: list[str]
+
+
+def analyze_comment(comment: str) -> CommentScore:
+    """
+    Score one comment with the compiled matchers.
+
+    Produces the same polarity, emotions, spam, sarcasm and topic tokens
+    as running TextBlob, `detect_emotions`, `detect_spam`, `detect_sarcasm`
+    and the topic tokenizer separately.
+    """
+    comment_lower = comment.lower()
+
+    polarity, subjectivity = score_text(comment)
+
+    labels = _KEYWORDS.find(comment_lower)
+    emotions = labels - {_SARCASM_POSITIVE, _SARCASM_NEGATIVE}
+
+    is_spam = bool(_SPAM_RE.search(comment_lower))
+    if not is_spam and len(comment) > 10:
+        upper_count = sum(1 for c in comment if c.isupper())
+        is_spam = upper_count / len(comment) > 0.7
+    if not is_spam:
+        is_spam = bool(_REPEAT_RE.search(comment))
+
+    is_sarcastic = (
+        (_SARCASM_POSITIVE in labels and _SARCASM_NEGATIVE in labels and subjectivity > 0.5)
+        or (polarity > 0.3 and bool(_SARCASM_TAIL_RE.search(comment_lower)))
+    )
+
+    tokens = [
+        w for w in _NON_ALPHA_RE.sub('', comment_lower).split()
+        if len(w) > 3 and w not in STOP_WORDS
+    ]
+
+    return CommentScore(polarity, subjectivity, emotions, is_spam, is_sarcastic, tokens)
+
+
+def score_comments(comments: list[str]) -> list[CommentScore]:
+    """Score a chunk of comments (the unit of work sent to ML pool workers)."""
+    return [analyze_comment(comment) for comment in comments]
+
 
-    for comment in comments:
-        comment_lower = comment.lower()
+class SentimentAccumulator:
+    """
+    Running sentiment totals over comments fed in order.
 
-        # Sentiment Analysis
-        analysis = TextBlob(comment)
-        polarity = analysis.sentiment.polarity
-        subjectivity = analysis.sentiment.subjectivity
-        total_polarity += polarity
+    Only counters, the first five spam examples and bounded TopicSketch
+    summaries are kept, so memory stays flat in the number of comments.
+    Topic tokens are counted exactly per slice of TOPIC_FLUSH_EVERY
+    comments and then folded into the sketch.
+    """
 
-        if polarity > 0.05:
-            results["positive"] += 1
-        elif polarity < -0.05:
-            results["negative"] += 1
-        else:
-            results["neutral"] += 1
+    TOPIC_FLUSH_EVERY = 1000
+
+    def __init__(self, topic_capacity: Optional[int] = None, bigrams: Optional[bool] = None) -> None:
+        self.total = 0
+        self.positive = 0
+        self.negative = 0
+        self.neutral = 0
+        self.spam_count = 0
+        self.sarcasm_detected = 0
+        self.total_polarity = 0.0
+        self.emotions = {emotion: 0 for emotion in EMOTION_KEYWORDS}
+        self.spam_comments: list[str] = []
+
+        capacity = topic_capacity if topic_capacity is not None else settings.TOPIC_SKETCH_CAPACITY
+        self.bigrams = settings.TOPIC_BIGRAMS if bigrams is None else bigrams
+        self.topics = TopicSketch(capacity)
+        self.bigram_topics = TopicSketch(capacity) if self.bigrams else None
+
+    def add_many(self, comments: list[str], scores: list[CommentScore]) -> None:
+        positive = negative = neutral = spam_count = sarcasm = 0
+        total_polarity = self.total_polarity
+        emotion_counts = self.emotions
+        spam_comments = self.spam_comments
+        counts: Counter = Counter()
+        pair_counts: Counter = Counter()
+
+        for n, (comment, score) in enumerate(zip(comments, scores), 1):
+            polarity = score.polarity
+            total_polarity += polarity
+
+            if polarity > 0.05:
+                positive += 1
+            elif polarity < -0.05:
+                negative += 1
+            else:
+                neutral += 1
+
+            for emotion in score.emotions:
+                emotion_counts[emotion] += 1
+
+            if score.is_spam:
+                spam_count += 1
+                if len(spam_comments) < 5:  # Keep only first 5 examples
+                    spam_comments.append(comment[:100])  # Truncate long comments
+
+            if score.is_sarcastic:
+                sarcasm += 1
+
+            tokens = score.tokens
+            counts.update(tokens)
+            if self.bigram_topics is not None:
+                pair_counts.update(zip(tokens, tokens[1:]))
+
+            if n % self.TOPIC_FLUSH_EVERY == 0:
+                self._flush_topics(counts, pair_counts)
+                counts, pair_counts = Counter(), Counter()
+
+        self._flush_topics(counts, pair_counts)
+
+        self.total += len(comments)
+        self.positive += positive
+        self.negative += negative
+        self.neutral += neutral
+        self.spam_count += spam_count
+        self.sarcasm_detected += sarcasm
+        self.total_polarity = total_polarity
+
+    def result(self) -> dict:
+        """Current totals in the SentimentData response shape."""
+        results = _empty_results(self.total)
+        if not self.total:
+            return results
+
+        results.update(
+            positive=self.positive,
+            negative=self.negative,
+            neutral=self.neutral,
+            spam_count=self.spam_count,
+            spam_comments=list(self.spam_comments),
+            sarcasm_detected=self.sarcasm_detected,
+            average_polarity=self.total_polarity / self.total,
+            emotions=dict(self.emotions),
+        )
+
+        # Keyword Extraction
+        results["topics"] = [
+            {"name": name, "count": count} for name, count in self.topics.most_common(10)
+        ]
+        if self.bigram_topics is not None:
+            results["bigram_topics"] = [
+                {"name": " ".join(pair), "count": count}
+                for pair, count in self.bigram_topics.most_common(10)
+            ]
 
-        # Emotion Detection
-        emotions = detect_emotions(comment_lower)
-        for emotion, count in emotions.items():
-            results["emotions"][emotion] += count
+        return results
 
-        # Spam Detection
-        if detect_spam(comment, comment_lower):
-            results["spam_count"] += 1
-            if len(results["spam_comments"]) < 5:  # Keep only first 5 examples
-                results["spam_comments"].append(comment[:100])  # Truncate long comments
+    def _flush_topics(self, counts: Counter, pair_counts: Counter) -> None:
+        if counts:
+            self.topics.update(counts)
+        if pair_counts and self.bigram_topics is not None:
+            self.bigram_topics.update(pair_counts)
 
-        # Sarcasm Detection
-        if detect_sarcasm(comment_lower, polarity, subjectivity):
-            results["sarcasm_detected"] += 1
 
-        # Tokenize for topics
-        clean_text = re.sub(r'[^a-zA-Z\s]', '', comment_lower)
-        words.extend([w for w in clean_text.split() if w not in STOP_WORDS and len(w) > 3])
+def aggregate_scores(comments: list[str], scores: list[CommentScore]) -> dict:
+    """
+    Build the response shape from per-comment scores, in comment order.
 
-    results["average_polarity"] = total_polarity / len(comments)
+    Scores may come from any mix of fresh computation and the comment memo;
+    the totals are always rebuilt from the full list.
+    """
+    acc = SentimentAccumulator()
+    acc.add_many(comments, scores)
+    return acc.result()
 
-    # Keyword Extraction
-    counts = Counter(words)
-    results["topics"] = [{"name": name, "count": count} for name, count in counts.most_common(10)]
 
-    return results
+def analyze_sentiment_and_topics(comments: list[str]) -> dict:
+    """
+    Analyze a list of comment strings for sentiment, emotions, spam, sarcasm, and topics.
+    Returns a dict matching the shape expected by the frontend.
+    """
+    return aggregate_scores(comments, score_comments(comments))
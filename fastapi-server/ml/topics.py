@@ -0,0 +1,69 @@
+"""
+Bounded heavy-hitters summary for topic extraction.
+
+A Misra-Gries ("Frequent") summary, the mergeable twin of Space-Saving:
+exact batch counts are folded in, and once more than 2 x `capacity` words
+are tracked (or before reading results) every eviction counter is lowered
+by the (capacity+1)-th largest one and words that reach zero are dropped.
+Reported counts are the occurrences seen since a word was last
+(re)admitted.  With N words seen:
+
+  - reported count <= true count <= reported count + error_bound
+  - error_bound <= N / (capacity + 1)
+  - any word seen more than N / (capacity + 1) times is still tracked
+
+While fewer than `capacity` distinct words have been seen the summary is
+exact, and `most_common` breaks ties by first appearance like Counter.
+"""
+
+import heapq
+import math
+from collections import Counter
+from operator import itemgetter
+from typing import Hashable, Optional
+
+
+class TopicSketch:
+    """Misra-Gries summary with a fixed number of counters."""
+
+    def __init__(self, capacity: Optional[int] = None, epsilon: Optional[float] = None) -> None:
+        """
+        Size the summary either directly (`capacity` counters) or from a
+        relative error bound `epsilon` (count error <= epsilon * N).
+        """
+        if capacity is None:
+            if not epsilon or epsilon <= 0:
+                raise ValueError("TopicSketch needs a capacity or a positive epsilon")
+            capacity = math.ceil(1 / epsilon)
+        self.capacity = max(1, capacity)
+        self.total = 0
+        self.error_bound = 0
+        self._counters: dict[Hashable, int] = {}   # Misra-Gries eviction counters
+        self._seen: dict[Hashable, int] = {}       # occurrences since admission
+
+    def update(self, counts: Counter) -> None:
+        """Fold in a batch of exact counts (iterated in first-seen order)."""
+        counters = self._counters
+        seen = self._seen
+        for key, weight in counts.items():
+            counters[key] = counters.get(key, 0) + weight
+            seen[key] = seen.get(key, 0) + weight
+        self.total += sum(counts.values())
+        # Prune lazily so the O(n log capacity) selection is amortised
+        if len(counters) > 2 * self.capacity:
+            self._prune()
+
+    def most_common(self, n: int) -> list[tuple[Hashable, int]]:
+        if len(self._counters) > self.capacity:
+            self._prune()
+        return heapq.nlargest(n, self._seen.items(), key=itemgetter(1))
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def _prune(self) -> None:
+        # Lower every counter by the (capacity+1)-th largest and drop the zeros
+        cut = heapq.nlargest(self.capacity + 1, self._counters.values())[-1]
+        self.error_bound += cut
+        self._counters = {k: c - cut for k, c in self._counters.items() if c > cut}
+        self._seen = {k: self._seen[k] for k in self._counters}
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
+from datetime import datetime
 from typing import Optional
 
 
@@ -30,6 +31,7 @@ class SentimentData(BaseModel):
     average_polarity: float = 0.0
     total: int = 0
     topics: list[Topic] = []
+    bigram_topics: Optional[list[Topic]] = None
     emotions: EmotionBreakdown = EmotionBreakdown()
     spam_count: int = 0
     spam_comments: list[str] = []
@@ -49,6 +51,8 @@ class PredictionRequest(BaseModel):
     stats: VideoStats
     sentiment: Optional[dict] = None
     comments: Optional[list[dict]] = None
+    # One chart_data point per day instead of ~15 samples
+    dailyChart: bool = False
 
 
 class Forecast(BaseModel):
@@ -106,6 +110,46 @@ class EarningsData(BaseModel):
     confidence_score: int = 60
 
 
+# ── Batch Analytics ────────────────────────────────────────
+
+class BatchVideo(BaseModel):
+    videoId: str
+    stats: VideoStats
+    # Comment texts for sentiment analysis (skipped when `sentiment` is given)
+    comments: list[str] = []
+    # Comment objects for predict/earnings, as in PredictionRequest.comments
+    commentData: Optional[list[dict]] = None
+    sentiment: Optional[dict] = None
+
+
+class BatchAnalyticsRequest(BaseModel):
+    videos: list[BatchVideo]
+
+
+class BulkScoreRequest(BaseModel):
+    """One list per field, index i across all lists describing video i."""
+    viewCount: list[int]
+    likeCount: list[int]
+    commentCount: list[int]
+    # Sentiment counts; a total of 0 means no sentiment for that video
+    positive: Optional[list[int]] = None
+    negative: Optional[list[int]] = None
+    sentimentTotal: Optional[list[int]] = None
+    publishedAt: Optional[list[Optional[str]]] = None
+
+    @field_validator("publishedAt")
+    @classmethod
+    def _iso_dates(cls, values: Optional[list[Optional[str]]]) -> Optional[list[Optional[str]]]:
+        # Reject bad dates here (422) rather than fail the scoring pass (500)
+        for i, value in enumerate(values or ()):
+            if value:
+                try:
+                    datetime.fromisoformat(value.replace('Z', '+00:00'))
+                except ValueError:
+                    raise ValueError(f"publishedAt[{i}] is not an ISO 8601 date: {value!r}")
+        return values
+
+
 # ── Generic API Envelope ───────────────────────────────────
 
 class ApiResponse(BaseModel):
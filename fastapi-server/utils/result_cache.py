@@ -0,0 +1,276 @@
+"""
+Content-addressed cache for ML endpoint results.
+
+Keys are SHA-256 digests of the endpoint name plus the canonical JSON of
+its inputs (video ID, comment list, stats payload), so an identical
+request — e.g. the TS server resending a video's comments on page reload
+— maps to the same entry.  Comments are hashed exactly as sent, in order:
+whitespace runs and ordering both affect spam detection and topic ties.
+
+Two tiers:
+  - in-memory LRU bounded by a byte budget, with a TTL per entry
+  - optional SQLite file that survives restarts (RESULT_CACHE_SQLITE_PATH),
+    in WAL mode and bounded to RESULT_CACHE_SQLITE_MAX_ENTRIES rows
+"""
+
+import asyncio
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from config import settings
+
+
+def make_key(namespace: str, *parts: Any) -> str:
+    """Hash the namespace and JSON-serialisable parts into a cache key."""
+    payload = json.dumps([namespace, *parts], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def parse_cache_control(header: Optional[str]) -> tuple[bool, bool]:
+    """
+    Map a request Cache-Control header to (read_cache, write_cache).
+
+      no-cache  → recompute, but store the fresh result
+      no-store  → recompute and don't store it
+    """
+    if not header:
+        return True, True
+    directives = {d.strip().lower() for d in header.split(",")}
+    if "no-store" in directives:
+        return False, False
+    if "no-cache" in directives or "max-age=0" in directives:
+        return False, True
+    return True, True
+
+
+def make_etag(data: Any) -> str:
+    """Strong ETag for a JSON-serialisable response body."""
+    payload = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return '"' + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 specifies for it)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return etag in candidates
+
+
+class ResultCache:
+    """
+    Thread-safe LRU + TTL result cache with an optional SQLite tier.
+
+    Memory lookups never block.  Disk lookups are blocking (get_async runs
+    them in a thread), and disk writes go through one writer thread that
+    commits them in batches, so set() never waits for an fsync.  The
+    writer also drops expired rows and trims the table to
+    `max_disk_entries`, oldest first.
+    """
+
+    # Seconds between sweeps of expired rows from the SQLite tier
+    PURGE_INTERVAL = 5 * 60
+
+    def __init__(self, max_bytes: int, ttl: float, sqlite_path: Optional[str] = None,
+                 max_disk_entries: int = 100_000) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._pending: queue.Queue[tuple[str, bytes, float]] = queue.Queue()
+        self._disk_rows = 0
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, timeout=5.0, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_expires ON results (expires_at)")
+            self._purge_disk()
+            threading.Thread(target=self._write_loop, name="result-cache-writer", daemon=True).start()
+
+    # ──────────────────────────────────────────────────────
+
+    def get(self, key: str) -> Optional[dict]:
+        """Memory, then SQLite.  Blocks on the disk lookup; see get_async."""
+        value = self._get_memory(key)
+        if value is None and self._db is not None:
+            value = self._get_disk(key)
+        if value is None:
+            self._count_miss()
+        return value
+
+    async def get_async(self, key: str) -> Optional[dict]:
+        """get() for async endpoints: the SQLite lookup runs in a thread."""
+        value = self._get_memory(key)
+        if value is None and self._db is not None:
+            value = await asyncio.to_thread(self._get_disk, key)
+        if value is None:
+            self._count_miss()
+        return value
+
+    def set(self, key: str, value: dict) -> None:
+        """Store in memory now; the SQLite write is queued for the writer."""
+        blob = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store_memory(key, blob, expires_at)
+        if self._db is not None:
+            self._pending.put((key, blob, expires_at))
+
+    def flush(self) -> None:
+        """Wait until queued SQLite writes are committed."""
+        if self._db is not None:
+            self._pending.join()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self._db is not None:
+            self.flush()
+            with self._db_lock:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+                self._disk_rows = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "diskHits": self._disk_hits,
+                "misses": self._misses,
+                "hitRate": round((self._hits + self._disk_hits) / lookups, 4) if lookups else 0.0,
+                "persistent": self._db is not None,
+                "diskEntries": self._disk_rows,
+                "maxDiskEntries": self.max_disk_entries,
+                "pendingWrites": self._pending.qsize(),
+            }
+
+    # ── Lookups ───────────────────────────────────────────
+
+    def _get_memory(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, blob = entry
+            if expires_at <= time.time():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        return json.loads(blob)
+
+    def _get_disk(self, key: str) -> Optional[dict]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        if not row or row[1] <= time.time():
+            return None
+        with self._lock:
+            self._store_memory(key, row[0], row[1])
+            self._disk_hits += 1
+        return json.loads(row[0])
+
+    def _count_miss(self) -> None:
+        with self._lock:
+            self._misses += 1
+
+    # ── SQLite writer ─────────────────────────────────────
+
+    def _write_loop(self) -> None:
+        next_purge = time.time() + self.PURGE_INTERVAL
+        while True:
+            try:
+                batch = [self._pending.get(timeout=max(0.0, next_purge - time.time()))]
+            except queue.Empty:
+                batch = []
+            while True:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    with self._db_lock:
+                        self._db.executemany(
+                            "INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)",
+                            batch,
+                        )
+                        self._db.commit()
+                        # Upper bound: replaced keys are counted again until the next purge
+                        self._disk_rows += len(batch)
+                if time.time() >= next_purge or self._disk_rows > self.max_disk_entries:
+                    self._purge_disk()
+                    next_purge = time.time() + self.PURGE_INTERVAL
+            except sqlite3.Error as e:
+                print(f"DEBUG: result cache write failed: {e}")
+            finally:
+                for _ in batch:
+                    self._pending.task_done()
+
+    def _purge_disk(self) -> None:
+        """Delete expired rows, then the soonest-expiring ones over the limit."""
+        with self._db_lock:
+            self._db.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+            rows = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            if rows > self.max_disk_entries:
+                self._db.execute(
+                    "DELETE FROM results WHERE key IN"
+                    " (SELECT key FROM results ORDER BY expires_at LIMIT ?)",
+                    (rows - self.max_disk_entries,),
+                )
+                rows = self.max_disk_entries
+            self._db.commit()
+            self._disk_rows = rows
+
+    # ── Memory tier (caller holds the lock) ───────────────
+
+    def _store_memory(self, key: str, blob: bytes, expires_at: float) -> None:
+        if len(blob) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (expires_at, blob)
+        self._bytes += len(blob)
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def _drop(self, key: str) -> None:
+        _, blob = self._entries.pop(key)
+        self._bytes -= len(blob)
+
+
+# Singleton
+result_cache = ResultCache(
+    max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+    ttl=settings.RESULT_CACHE_TTL,
+    sqlite_path=settings.RESULT_CACHE_SQLITE_PATH or None,
+    max_disk_entries=settings.RESULT_CACHE_SQLITE_MAX_ENTRIES,
+)